@@ -6,22 +6,49 @@ Loads REAL construction material suppliers from web scraping or suppliers.json
 
 import os
 import sys
+import time
 import json
-from datetime import datetime
+import re
+import heapq
+import math
+import hashlib
+import hmac
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict
+from functools import lru_cache, wraps
+from datetime import datetime, timezone
 import random
 
 try:
-    from flask import Flask, jsonify, request, send_from_directory
+    from flask import Flask, Response, g, has_request_context, jsonify, request, send_from_directory
     from flask_cors import CORS
+    from werkzeug.middleware.proxy_fix import ProxyFix
 except ImportError as e:
     print(f"ERROR: Missing Flask dependency: {e}")
     print("Run: pip install Flask Flask-CORS")
     sys.exit(1)
 
-print("\n" + "="*70)
-print("WALMART SUPPLIER PORTAL - REAL DATA BACKEND")
-print("Serving actual construction material suppliers from USA")
-print("="*70)
+from gazetteer import geocode, geocode_supplier, haversine_miles, miles_to_chord, to_unit_vector
+from normalize import NORMALIZE_VERSION, normalize_supplier, normalize_suppliers, to_timestamp
+
+# NumPy is only needed once data is loaded, so it is imported by load_numpy()
+# on the loading path instead of at import time
+np = None
+
+def load_numpy():
+    """Import NumPy on first use"""
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError as e:
+            print(f"ERROR: Missing NumPy dependency: {e}")
+            print("Run: pip install numpy")
+            raise
+        np = numpy
+    return np
 
 # Initialize Flask
 app = Flask(__name__, static_folder='.', static_url_path='')
@@ -34,34 +61,107 @@ CORS(app)
 PORT = int(os.environ.get('PORT', 3000))
 HOST = os.environ.get('HOST', '0.0.0.0')
 NODE_ENV = os.environ.get('NODE_ENV', 'development')
-
-print(f"Environment: {NODE_ENV}")
-print(f"Host: {HOST}:{PORT}")
-print()
+SSE_MAX_PENDING = int(os.environ.get('SSE_MAX_PENDING', 500))
+SSE_HEARTBEAT_SECONDS = int(os.environ.get('SSE_HEARTBEAT_SECONDS', 15))
+CHANGE_LOG_MAX = int(os.environ.get('CHANGE_LOG_MAX', 10000))
+RANK_CACHE_DEPTH = int(os.environ.get('RANK_CACHE_DEPTH', 100))
+RESULT_CACHE_MAX_BYTES = int(os.environ.get('RESULT_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+RESULT_CACHE_SHARED_PATH = os.environ.get('RESULT_CACHE_SHARED_PATH')
+RESULT_CACHE_SHARED_MAX_BYTES = int(os.environ.get('RESULT_CACHE_SHARED_MAX_BYTES', 256 * 1024 * 1024))
+DATA_FILE = os.environ.get('DATA_FILE', 'suppliers.json')
+# When set, the loaded dataset is written once to a segment file here and
+# mmapped read-only by every worker process on the host
+SHARED_DATASET_DIR = os.environ.get('SHARED_DATASET_DIR')
+FALLBACK_DATA = os.environ.get('FALLBACK_DATA', '').lower() in ('1', 'true', 'yes')
+LOADING_RETRY_AFTER = int(os.environ.get('LOADING_RETRY_AFTER', 5))
+JOURNAL_FILE = os.environ.get('JOURNAL_FILE', 'suppliers.journal')
+STATE_SNAPSHOT_FILE = os.environ.get('STATE_SNAPSHOT_FILE', 'suppliers.snapshot')
+JOURNAL_COMPACT_BYTES = int(os.environ.get('JOURNAL_COMPACT_BYTES', 64 * 1024 * 1024))
+JOURNAL_COMPACT_INTERVAL = int(os.environ.get('JOURNAL_COMPACT_INTERVAL', 60))
+# Seconds between a worker's looks at the journal: followers apply the owner's
+# new entries, the owner picks up writes other workers forwarded to it
+JOURNAL_FOLLOW_INTERVAL = float(os.environ.get('JOURNAL_FOLLOW_INTERVAL', 0.2))
+# Seconds a worker waits for a forwarded write to come back through the journal
+JOURNAL_FORWARD_TIMEOUT = float(os.environ.get('JOURNAL_FORWARD_TIMEOUT', 5))
+BULK_MAX_RECORDS = int(os.environ.get('BULK_MAX_RECORDS', 50000))
+# Bearer token for bulk writes, stock updates and admin actions; unset disables those routes
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+LOW_STOCK_THRESHOLD = int(os.environ.get('LOW_STOCK_THRESHOLD', 1000))
+# Time allowed for verifying fuzzy candidates per query; past it the best found so far is returned
+FUZZY_BUDGET_MS = float(os.environ.get('FUZZY_BUDGET_MS', 50))
+FUZZY_MAX_CANDIDATES = int(os.environ.get('FUZZY_MAX_CANDIDATES', 2000))
+FUZZY_MAX_EXPANSIONS = int(os.environ.get('FUZZY_MAX_EXPANSIONS', 50))
+FUZZY_MAX_TERMS = 8
+# Requests slower than this many ms are stack-sampled (0 = off until enabled via /api/admin/profile)
+PROFILE_SLOW_MS = float(os.environ.get('PROFILE_SLOW_MS', 0))
+PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', 5))
+# Comma separated 'METHOD /rule' routes (or '*') measured with tracemalloc from startup
+ALLOC_TRACK_ROUTES = os.environ.get('ALLOC_TRACK_ROUTES', '')
+ALLOC_TRACE_FRAMES = int(os.environ.get('ALLOC_TRACE_FRAMES', 1))
+# auto uses orjson when installed, else the stdlib encoder
+JSON_BACKEND = os.environ.get('JSON_BACKEND', 'auto').lower()
+# Token bucket per client: refill rate per second (0 = no limit) and bucket size
+RATE_LIMIT_PER_SECOND = float(os.environ.get('RATE_LIMIT_PER_SECOND', 20))
+RATE_LIMIT_BURST = float(os.environ.get('RATE_LIMIT_BURST', 200))
+# SQLite file holding the buckets so every worker on the host shares them
+RATE_LIMIT_SHARED_PATH = os.environ.get('RATE_LIMIT_SHARED_PATH')
+RATE_LIMIT_ROWS_PER_TOKEN = int(os.environ.get('RATE_LIMIT_ROWS_PER_TOKEN', 100))
+RATE_LIMIT_BYTES_PER_TOKEN = int(os.environ.get('RATE_LIMIT_BYTES_PER_TOKEN', 64 * 1024))
+# Unindexed work is charged per catalog row scanned
+RATE_LIMIT_SCAN_ROWS_PER_TOKEN = int(os.environ.get('RATE_LIMIT_SCAN_ROWS_PER_TOKEN', 10000))
+RATE_LIMIT_PREFIXES = ('/api/suppliers', '/api/auth')
+# Reverse proxies in front of the app whose X-Forwarded-For/-Proto are trusted (0 = none)
+TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS', 0))
+# Per-route time budget overrides, 'METHOD /rule=ms' comma separated
+ROUTE_BUDGETS = os.environ.get('ROUTE_BUDGETS', '')
+# Processes used to normalize large data files on load (0 = one per CPU, 1 = in process)
+NORMALIZE_WORKERS = int(os.environ.get('NORMALIZE_WORKERS', 0))
 
 # ==================== LOAD REAL SUPPLIER DATA ====================
 
-print("[1/3] Loading supplier data...")
+# Report from the last normalize_records() run, served by /api/admin/data-quality
+DATA_QUALITY = None
 
-ALL_SUPPLIERS = []
+def normalize_records(records, source):
+    """
+    Run the data-quality pass over freshly loaded records and keep its report
+    Scraper output, expand_suppliers.py and fallback data disagree on which
+    fields exist and their types; everything after this sees one schema
+    """
+    global DATA_QUALITY
+    records, report = normalize_suppliers(records, NORMALIZE_WORKERS)
+    DATA_QUALITY = {'source': source, **report}
+    print(f"[OK] Normalized {report['records']} suppliers from {source} in {report['ms']} ms "
+          f"({report['workers']} workers): {report['fixed_records']} fixed, {report['rejected']} rejected")
+    for rejection in report['rejections'][:5]:
+        print(f"[WARNING] Rejected record {rejection['index']} (id {rejection['id']}): {rejection['error']}")
+    return records
 
 def load_suppliers_from_file(filename='suppliers.json'):
     """
-    Load suppliers from suppliers.json file
+    Load suppliers from suppliers.json file, normalized by normalize_records()
     """
     try:
         if os.path.exists(filename):
             with open(filename, 'r') as f:
                 data = json.load(f)
-                print(f"[OK] Loaded {len(data)} suppliers from {filename}")
-                return data
+            if not isinstance(data, list):
+                raise ValueError('expected a JSON array of suppliers')
+            print(f"[OK] Loaded {len(data)} suppliers from {filename}")
+            return normalize_records(data, filename)
         else:
-            print(f"[WARNING] {filename} not found - will use fallback")
+            print(f"[WARNING] {filename} not found")
             return None
     except Exception as e:
         print(f"[ERROR] Failed to load {filename}: {e}")
         return None
 
+def file_fingerprint(filename):
+    """Identify a data file by path, size and mtime so workers loading the same file agree"""
+    stat = os.stat(filename)
+    raw = f"{os.path.abspath(filename)}:{stat.st_size}:{stat.st_mtime_ns}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
 def generate_fallback_suppliers(count=150):
     """
     Generate fallback suppliers if suppliers.json doesn't exist
@@ -98,39 +198,1452 @@ def generate_fallback_suppliers(count=150):
     
     return suppliers
 
-# Load suppliers from suppliers.json first
-print("[2/3] Initializing supplier database...")
-ALL_SUPPLIERS = load_suppliers_from_file('suppliers.json')
+# ==================== SUPPLIER STORE ====================
+
+# Calendar days per unit; a business day is 7/5 of a calendar day on average
+DURATION_UNITS = {'hour': 1 / 24, 'business day': 7 / 5, 'day': 1, 'week': 7, 'month': 30}
+DURATION_PATTERN = re.compile(
+    r'(\d+(?:\.\d+)?)(?:\s*(?:-|to)\s*(\d+(?:\.\d+)?))?\s*(hour|business day|day|week|month)s?',
+    re.I
+)
+
+def parse_duration_days(text):
+    """Parse "1-2 weeks" / "24 hours" / "2 business days" into (min_days, max_days), or None"""
+    if not isinstance(text, str):
+        return None
+    return _parse_duration(text)
+
+@lru_cache(maxsize=4096)
+def _parse_duration(text):
+    match = DURATION_PATTERN.search(text)
+    if not match:
+        return None
+    low = float(match.group(1))
+    high = float(match.group(2) or low)
+    unit = DURATION_UNITS[' '.join(match.group(3).lower().split())]
+    return low * unit, high * unit
+
+def duration_column(field, bound):
+    """Extractor for the min (bound=0) or max (bound=1) days of a duration field"""
+    def extract(supplier):
+        parsed = parse_duration_days(supplier.get(field))
+        return parsed[bound] if parsed else np.nan
+    return extract
+
+def timestamp_column(field):
+    """Extractor for an ISO timestamp field as UTC epoch seconds (NaN when missing or invalid)"""
+    def extract(supplier):
+        value = supplier.get(field)
+        if not isinstance(value, str):
+            return np.nan
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            return np.nan
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp()
+    return extract
+
+@lru_cache(maxsize=65536)
+def _geocode_fields(location, state, region):
+    return geocode_supplier({'location': location, 'state': state, 'region': region})
+
+def coordinate_column(axis):
+    """Extractor for the geocoded latitude (axis=0) or longitude (axis=1)"""
+    def extract(supplier):
+        geo = _geocode_fields(supplier.get('location'), supplier.get('state'), supplier.get('region'))
+        return geo[axis] if geo else np.nan
+    return extract
+
+# column name -> (dtype, extractor)
+NUMERIC_COLUMNS = {
+    'id': ('int64', lambda s: s['id']),
+    'rating': ('float64', lambda s: s.get('rating') or 0.0),
+    'reviews': ('int64', lambda s: s.get('reviews') or 0),
+    'stockLevel': ('int64', lambda s: s.get('stockLevel') or 0),
+    'inStock': ('bool', lambda s: bool(s.get('inStock'))),
+    'walmartVerified': ('bool', lambda s: bool(s.get('walmartVerified'))),
+    'certifications': ('int32', lambda s: len(s.get('certifications') or [])),
+    'leadTimeMinDays': ('float64', duration_column('leadTime', 0)),
+    'leadTimeMaxDays': ('float64', duration_column('leadTime', 1)),
+    'responseTimeMinDays': ('float64', duration_column('responseTime', 0)),
+    'responseTimeMaxDays': ('float64', duration_column('responseTime', 1)),
+    'lat': ('float64', coordinate_column(0)),
+    'lon': ('float64', coordinate_column(1)),
+    'lastStockCheck': ('float64', timestamp_column('lastStockCheck')),
+}
+CATEGORICAL_COLUMNS = ('category', 'region', 'state')
+# Columns whose sorted index is built into the snapshot rather than per worker
+UNSORTED_COLUMNS = ('id', 'lat', 'lon')
+SEARCH_FIELDS = ('name', 'location', 'state', 'category')
+
+SEGMENT_MAGIC = b'SUPSEG01'
+SEGMENT_ALIGN = 64
+
+def encode_record(supplier):
+    """Canonical JSON bytes (UTF-8, not escaped) of a record; equal records encode identically"""
+    return json.dumps(supplier, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode()
+
+def search_text(supplier):
+    """Lowercased searchable fields, separated so a match never spans two fields"""
+    return '\x1f'.join(str(supplier.get(f) or '').lower() for f in SEARCH_FIELDS).encode() + b'\x1e'
+
+def write_segment(out, arrays, meta):
+    """
+    Lay arrays out as: magic, header length, JSON header, then every array
+    aligned to SEGMENT_ALIGN bytes. Header offsets are relative to the data start.
+    """
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        offset = -(-offset // SEGMENT_ALIGN) * SEGMENT_ALIGN
+        layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += array.nbytes
+    header = json.dumps({'meta': meta, 'arrays': layout}).encode()
+    out.write(SEGMENT_MAGIC + len(header).to_bytes(8, 'little') + header)
+    position = len(SEGMENT_MAGIC) + 8 + len(header)
+    start = -(-position // SEGMENT_ALIGN) * SEGMENT_ALIGN
+    for name, array in arrays.items():
+        target = start + layout[name]['offset']
+        out.write(b'\0' * (target - position))
+        out.write(np.ascontiguousarray(array).tobytes())
+        position = target + array.nbytes
+
+class DatasetSnapshot:
+    """
+    Immutable flat form of a loaded catalog: named NumPy arrays over one
+    buffer plus a small JSON meta dict. Records are a single blob of canonical
+    JSON with an offsets array, so a snapshot holds no per-record Python objects.
+
+    The buffer is either private bytes or a read-only mmap of a segment file
+    in SHARED_DATASET_DIR; in the latter case every worker on the host maps
+    the same pages, so the catalog is resident once however many workers run.
+    """
+    def __init__(self, buffer, path=None):
+        load_numpy()
+        if buffer[:len(SEGMENT_MAGIC)] != SEGMENT_MAGIC:
+            raise ValueError('Not a supplier dataset segment')
+        header_end = len(SEGMENT_MAGIC) + 8 + int.from_bytes(buffer[len(SEGMENT_MAGIC):len(SEGMENT_MAGIC) + 8], 'little')
+        header = json.loads(buffer[len(SEGMENT_MAGIC) + 8:header_end])
+        self.buffer = buffer
+        self.path = path
+        self.meta = header['meta']
+        self.base = -(-header_end // SEGMENT_ALIGN) * SEGMENT_ALIGN
+        self.layout = header['arrays']
+        self.arrays = {}
+        for name, spec in self.layout.items():
+            count = int(np.prod(spec['shape'], dtype=np.int64))
+            array = np.frombuffer(buffer, dtype=spec['dtype'], count=count, offset=self.base + spec['offset'])
+            self.arrays[name] = array.reshape(spec['shape'])
+        self.size = self.meta['size']
+
+    @staticmethod
+    def pack(records, dataset_id=None):
+        """Flatten records into (arrays, meta) ready for write_segment"""
+        load_numpy()
+        arrays = {}
+        for name, (dtype, extract) in NUMERIC_COLUMNS.items():
+            arrays['col:' + name] = np.array([extract(s) for s in records], dtype=dtype)
+        labels = {}
+        for field in CATEGORICAL_COLUMNS:
+            lookup = {}
+            codes = [lookup.setdefault(s.get(field), len(lookup)) for s in records]
+            labels[field] = list(lookup)
+            arrays['code:' + field] = np.array(codes, dtype=np.int32)
+            order = np.argsort(arrays['code:' + field], kind='stable')
+            arrays['codeorder:' + field] = order
+            arrays['codestart:' + field] = np.searchsorted(arrays['code:' + field][order], np.arange(len(lookup) + 1))
+        for name in NUMERIC_COLUMNS:
+            if name not in UNSORTED_COLUMNS:
+                order = np.argsort(arrays['col:' + name], kind='stable')
+                arrays['sorted:' + name] = order
+                arrays['sortedvals:' + name] = arrays['col:' + name][order]
+        order = np.argsort(arrays['col:id'], kind='stable')
+        arrays['ids:order'] = order
+        arrays['ids:sorted'] = arrays['col:id'][order]
+
+        for kind, encode in (('records', encode_record), ('text', search_text)):
+            chunks = [encode(s) for s in records]
+            offsets = np.zeros(len(chunks) + 1, dtype=np.int64)
+            np.cumsum([len(c) for c in chunks], out=offsets[1:])
+            arrays[kind + ':blob'] = np.frombuffer(b''.join(chunks), dtype=np.uint8)
+            arrays[kind + ':offsets'] = offsets
+
+        groups = []
+        for group, tree in build_geo_trees(arrays['col:lat'], arrays['col:lon'], arrays['code:category']).items():
+            key = 'all' if group is None else str(group)
+            groups.append(key)
+            arrays.update(tree.arrays(f"geo:{key}:"))
+        meta = {'size': len(records), 'dataset_id': dataset_id, 'labels': labels, 'geo': groups,
+                'normalized': NORMALIZE_VERSION, 'quality': DATA_QUALITY, 'records': 'utf-8'}
+        return arrays, meta
+
+    @classmethod
+    def from_records(cls, records, dataset_id=None):
+        """Private snapshot for this process only"""
+        import io
+        out = io.BytesIO()
+        write_segment(out, *cls.pack(records, dataset_id))
+        return cls(out.getvalue())
+
+    @classmethod
+    def attach(cls, path):
+        """Map an existing segment file read-only"""
+        import mmap
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(buffer, path)
+
+    @property
+    def nbytes(self):
+        return len(self.buffer)
+
+    @property
+    def outdated(self):
+        """True for segments written before a column was added to NUMERIC_COLUMNS, normalization changed
+        or records were stored unescaped"""
+        return (self.meta.get('normalized') != NORMALIZE_VERSION or self.meta.get('records') != 'utf-8'
+                or any('col:' + name not in self.arrays for name in NUMERIC_COLUMNS))
+
+    def rebuilt(self):
+        """Private snapshot of the same records (normalized again) and meta in the current layout"""
+        import io
+        records = [json.loads(self.blob('records', p)) for p in range(self.size)]
+        records = normalize_records(records, self.path or 'snapshot')
+        arrays, meta = self.pack(records, self.meta.get('dataset_id'))
+        out = io.BytesIO()
+        write_segment(out, arrays, {**self.meta, **meta})
+        return DatasetSnapshot(out.getvalue())
+
+    def blob(self, kind, position):
+        """Raw bytes of record position from the records or text blob"""
+        offsets = self.arrays[kind + ':offsets']
+        start = self.base + self.layout[kind + ':blob']['offset']
+        return self.buffer[start + int(offsets[position]):start + int(offsets[position + 1])]
+
+    def position(self, supplier_id):
+        """Position of a supplier id by binary search, last one wins like a dict"""
+        ids = self.arrays['ids:sorted']
+        try:
+            i = int(np.searchsorted(ids, supplier_id, 'right')) - 1
+        except (TypeError, ValueError):
+            return None
+        if i < 0 or ids[i] != supplier_id:
+            return None
+        return int(self.arrays['ids:order'][i])
+
+    def positions(self, supplier_ids):
+        """Vectorized position(): an int64 array with -1 for unknown ids"""
+        ids = self.arrays['ids:sorted']
+        wanted = np.asarray(supplier_ids, dtype=np.int64)
+        if not len(ids):
+            return np.full(len(wanted), -1, dtype=np.int64)
+        found = np.clip(np.searchsorted(ids, wanted, 'right') - 1, 0, None)
+        return np.where(ids[found] == wanted, self.arrays['ids:order'][found], -1)
+
+    def search(self, needle, limit, skip=(), stop=None):
+        """
+        Positions whose search text contains needle (lowercased bytes), in
+        catalog order, found by scanning the text blob; stops after limit hits,
+        or when stop() (asked every 64 hits) returns true
+        """
+        offsets = self.arrays['text:offsets']
+        start = self.base + self.layout['text:blob']['offset']
+        end = start + int(offsets[-1])
+        results = []
+        cursor = start
+        hits = 0
+        while len(results) < limit:
+            hit = self.buffer.find(needle, cursor, end)
+            if hit < 0:
+                break
+            position = int(np.searchsorted(offsets, hit - start, 'right')) - 1
+            if position not in skip:
+                results.append(position)
+            cursor = start + int(offsets[position + 1])
+            hits += 1
+            if stop is not None and hits % 64 == 0 and stop():
+                break
+        return results
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, segments stay private
+    fcntl = None
+
+def shared_snapshot(dataset_id, load_records):
+    """
+    Attach the segment for dataset_id in SHARED_DATASET_DIR, writing it first
+    if no worker has yet. load_records() is only called by the worker that
+    writes it, so the others never parse the source file. Returns None when
+    sharing is off or the records could not be loaded.
+    """
+    if not SHARED_DATASET_DIR or fcntl is None or not dataset_id:
+        return None
+    os.makedirs(SHARED_DATASET_DIR, exist_ok=True)
+    path = os.path.join(SHARED_DATASET_DIR, f"suppliers-{dataset_id}.seg")
+    with open(os.path.join(SHARED_DATASET_DIR, 'suppliers.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if not os.path.exists(path) or DatasetSnapshot.attach(path).outdated:
+            records = load_records()
+            if not records:
+                return None
+            temp = f"{path}.{os.getpid()}.tmp"
+            with open(temp, 'wb') as out:
+                write_segment(out, *DatasetSnapshot.pack(records, dataset_id))
+            os.replace(temp, path)
+            # Workers still mapping an older segment keep it until they reload
+            for name in os.listdir(SHARED_DATASET_DIR):
+                if name.startswith('suppliers-') and name.endswith('.seg') and name != os.path.basename(path):
+                    os.unlink(os.path.join(SHARED_DATASET_DIR, name))
+            print(f"[OK] Wrote shared dataset segment {path}")
+    return DatasetSnapshot.attach(path)
+
+def build_snapshot(records, dataset_id=None):
+    """Shared snapshot when the records come from a fingerprinted file, private otherwise"""
+    return shared_snapshot(dataset_id, lambda: records) or DatasetSnapshot.from_records(records, dataset_id)
+
+class RecordView:
+    """
+    Read-only sequence of supplier dicts decoded on demand from a snapshot.
+    Records changed in this process live in overlay, keyed by position;
+    records appended after the snapshot only exist there.
+    """
+    def __init__(self, snapshot=None):
+        self.snapshot = snapshot
+        self.size = snapshot.size if snapshot else 0
+        # position -> dict for records changed or appended in this process
+        self.overlay = {}
+
+    def __len__(self):
+        return self.size
+
+    def raw(self, position):
+        if position in self.overlay:
+            return encode_record(self.overlay[position])
+        return self.snapshot.blob('records', position)
+
+    def encoded(self, positions):
+        """RawRecords for positions, sliced from the snapshot blob without decoding"""
+        positions = np.asarray(positions, dtype=np.int64)
+        if not len(positions):
+            return RawRecords()
+        snapshot = self.snapshot
+        offsets = snapshot.arrays['records:offsets']
+        base = snapshot.base + snapshot.layout['records:blob']['offset']
+        buffer = snapshot.buffer
+        overlay = self.overlay
+        starts = (offsets[np.minimum(positions, snapshot.size - 1)] + base).tolist()
+        ends = (offsets[np.minimum(positions, snapshot.size - 1) + 1] + base).tolist()
+        return RawRecords(
+            encode_record(overlay[p]) if p in overlay else buffer[start:end]
+            for p, start, end in zip(positions.tolist(), starts, ends)
+        )
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        position = int(index)
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError('supplier position out of range')
+        record = self.overlay.get(position)
+        return record if record is not None else json.loads(self.snapshot.blob('records', position))
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield self[position]
+
+class SupplierColumns:
+    """
+    Columnar NumPy view of the catalog: row i describes STORE.records[i].
+    Categorical fields are dictionary encoded; labels[field][code] is the value.
+    Arrays start out as read-only views into the snapshot; the first local
+    change to a column copies it, so only mutated columns cost per-worker memory.
+    """
+    def __init__(self, snapshot):
+        load_numpy()
+        arrays = snapshot.arrays
+        self.size = snapshot.size
+        self.numeric = {name: arrays['col:' + name] for name in NUMERIC_COLUMNS}
+        self.codes = {field: arrays['code:' + field] for field in CATEGORICAL_COLUMNS}
+        self.labels = {field: list(snapshot.meta['labels'][field]) for field in CATEGORICAL_COLUMNS}
+        self.lookup = {field: {v: i for i, v in enumerate(labels)} for field, labels in self.labels.items()}
+        self.sorted = {
+            name: (arrays['sorted:' + name], arrays['sortedvals:' + name])
+            for name in NUMERIC_COLUMNS if 'sorted:' + name in arrays
+        }
+        self.code_index = {
+            field: (arrays['codeorder:' + field], arrays['codestart:' + field])
+            for field in CATEGORICAL_COLUMNS
+        }
+        # None until the first delete, then a mask of rows still in the catalog
+        self.live = None
+        self.copied = set()
+
+    def _encode(self, field, value):
+        lookup = self.lookup[field]
+        code = lookup.get(value)
+        if code is None:
+            code = lookup[value] = len(self.labels[field])
+            self.labels[field].append(value)
+        return code
+
+    def _writable(self, table, name):
+        if (id(table), name) not in self.copied:
+            table[name] = table[name].copy()
+            self.copied.add((id(table), name))
+        return table[name]
+
+    def is_shared(self, name):
+        """True while a column still reads straight from the snapshot"""
+        table = self.numeric if name in self.numeric else self.codes
+        return (id(table), name) not in self.copied
+
+    def __getitem__(self, name):
+        return self.numeric[name]
+
+    def code(self, field, value):
+        """Code for a categorical value, or -1 if it never occurs"""
+        return self.lookup[field].get(value, -1)
+
+    def code_positions(self, field, value):
+        """Ascending positions where a categorical field equals value"""
+        code = self.code(field, value)
+        if code < 0:
+            return np.empty(0, dtype=np.int64)
+        index = self.code_index.get(field)
+        if index is None:
+            order = np.argsort(self.codes[field], kind='stable')
+            starts = np.searchsorted(self.codes[field][order], np.arange(len(self.labels[field]) + 1))
+            index = self.code_index[field] = (order, starts)
+        order, starts = index
+        if code + 1 >= len(starts):
+            return np.empty(0, dtype=np.int64)
+        return order[starts[code]:starts[code + 1]]
+
+    def sorted_index(self, name):
+        """(positions, values) of a numeric column in ascending order, NaN last"""
+        index = self.sorted.get(name)
+        if index is None:
+            order = np.argsort(self.numeric[name], kind='stable')
+            index = self.sorted[name] = (order, self.numeric[name][order])
+        return index
+
+    def range(self, name, low=None, high=None):
+        """Positions whose value lies in [low, high], found by binary search; NaN (unknown) never matches"""
+        order, values = self.sorted_index(name)
+        start = 0 if low is None else np.searchsorted(values, low, 'left')
+        # NaN sorts last, so an open upper bound stops at +inf rather than the end
+        stop = np.searchsorted(values, np.inf if high is None else high, 'right')
+        return order[start:stop]
+
+    def _extract(self, records):
+        numeric = {
+            name: np.array([extract(s) for s in records], dtype=self.numeric[name].dtype)
+            for name, (_, extract) in NUMERIC_COLUMNS.items()
+        }
+        codes = {
+            field: np.array([self._encode(field, s.get(field)) for s in records], dtype=np.int32)
+            for field in CATEGORICAL_COLUMNS
+        }
+        return numeric, codes
+
+    def _reindex_rows(self, name, positions, moved=True):
+        """
+        Re-slot positions in the sorted index of name after their values
+        changed (moved) or were appended: O(n) memmoves, no full re-sort
+        """
+        index = self.sorted.get(name)
+        if index is None:
+            return
+        order, values = index
+        if moved:
+            keep = ~np.isin(order, positions)
+            order, values = order[keep], values[keep]
+        new_values = self.numeric[name][positions]
+        by_value = np.argsort(new_values, kind='stable')
+        new_values = new_values[by_value]
+        slots = np.searchsorted(values, new_values, 'right')
+        self.sorted[name] = (np.insert(order, slots, positions[by_value]), np.insert(values, slots, new_values))
+
+    def update_rows(self, positions, records):
+        """Apply changed records at positions to every column and index"""
+        positions = np.asarray(positions, dtype=np.int64)
+        numeric, codes = self._extract(records)
+        for name, values in numeric.items():
+            current = self.numeric[name][positions]
+            changed = (current != values) & ~(np.isnan(current) & np.isnan(values)) \
+                if values.dtype.kind == 'f' else current != values
+            if changed.any():
+                self._writable(self.numeric, name)[positions[changed]] = values[changed]
+                self._reindex_rows(name, positions[changed])
+        for field, values in codes.items():
+            changed = self.codes[field][positions] != values
+            if changed.any():
+                self._writable(self.codes, field)[positions[changed]] = values[changed]
+                self.code_index.pop(field, None)
+
+    def append_rows(self, records):
+        """Add records as new rows after the current ones, returning their positions"""
+        positions = np.arange(self.size, self.size + len(records), dtype=np.int64)
+        numeric, codes = self._extract(records)
+        for table, extra in ((self.numeric, numeric), (self.codes, codes)):
+            for name, values in extra.items():
+                table[name] = np.concatenate((table[name], values))
+                self.copied.add((id(table), name))
+        if self.live is not None:
+            self.live = np.concatenate((self.live, np.ones(len(records), dtype=bool)))
+        self.size += len(records)
+        for name in list(self.sorted):
+            self._reindex_rows(name, positions, moved=False)
+        for field in CATEGORICAL_COLUMNS:
+            self.code_index.pop(field, None)
+        return positions
+
+    def delete_rows(self, positions):
+        """Tombstone rows; they stay in the arrays but drop out of every query"""
+        if self.live is None:
+            self.live = np.ones(self.size, dtype=bool)
+        self.live[np.asarray(positions, dtype=np.int64)] = False
+
+    def live_positions(self, positions=None):
+        """positions (default: every row) without deleted rows"""
+        if positions is None:
+            return np.arange(self.size) if self.live is None else np.flatnonzero(self.live)
+        return positions if self.live is None else positions[self.live[positions]]
+
+    def set_row(self, position, supplier):
+        self.update_rows([position], [supplier])
+
+class SupplierStore:
+    """
+    In-memory supplier catalog with a versioned change log.
+    snapshot holds the loaded catalog in flat arrays (see DatasetSnapshot),
+    records a sequence of dicts decoded from it, columns a NumPy view of it.
+
+    Every mutation and every reload bumps a monotonically increasing version.
+    The change log keeps only the latest change per supplier id (compaction),
+    so changes_since() is proportional to what actually changed. When the log
+    exceeds max_changes the oldest entries are dropped and min_version rises;
+    clients older than min_version must refetch the full list.
+    """
+    def __init__(self, max_changes=CHANGE_LOG_MAX):
+        self.snapshot = None
+        self.records = RecordView()
+        self.columns = None
+        # supplier id -> position for suppliers added since the snapshot
+        self.appended = {}
+        self.loaded_at = None
+        self.dataset_id = None
+        # Fingerprint of the data file the catalog came from; unlike dataset_id it survives mutations
+        self.source_id = None
+        self.version = 0
+        self.min_version = 0
+        self.max_changes = max_changes
+        self.changes = OrderedDict()
+        self.listeners = []
+        self.lock = threading.RLock()
+
+    def position_of(self, supplier_id):
+        if not self.snapshot:
+            return None
+        position = self.appended.get(supplier_id)
+        if position is None:
+            position = self.snapshot.position(supplier_id)
+        live = self.columns.live
+        return None if position is None or (live is not None and not live[position]) else position
+
+    def positions_of(self, supplier_ids):
+        """Vectorized position_of(): an int64 array with -1 for unknown or deleted ids"""
+        if not self.snapshot:
+            return np.full(len(supplier_ids), -1, dtype=np.int64)
+        positions = self.snapshot.positions(supplier_ids)
+        if self.appended:
+            appended = np.array([self.appended.get(i, -1) for i in supplier_ids], dtype=np.int64)
+            positions = np.where(appended >= 0, appended, positions)
+        live = self.columns.live
+        if live is not None and len(positions):
+            positions[(positions >= 0) & ~live[np.maximum(positions, 0)]] = -1
+        return positions
+
+    def live_positions(self):
+        """Positions of every supplier currently in the catalog, ascending"""
+        return self.columns.live_positions() if self.columns else np.empty(0, dtype=np.int64)
+
+    @property
+    def size(self):
+        """Number of suppliers currently in the catalog"""
+        if not self.columns:
+            return 0
+        return self.columns.size if self.columns.live is None else int(self.columns.live.sum())
+
+    def find(self, supplier_id):
+        position = self.position_of(supplier_id)
+        return self.records[position] if position is not None else None
+
+    @property
+    def cache_token(self):
+        """
+        Changes whenever the data does. Workers that loaded the same file and
+        have not mutated since share a token; any local mutation makes it unique.
+        """
+        return f"{self.dataset_id}:{self.version}"
+
+    def _record_change(self, supplier_id, op, old, new):
+        """Log one change; the caller gives the store a new dataset_id once per mutation"""
+        self.version += 1
+        self.changes[supplier_id] = (self.version, op)
+        self.changes.move_to_end(supplier_id)
+        while len(self.changes) > self.max_changes:
+            _, (dropped_version, _) = self.changes.popitem(last=False)
+            self.min_version = dropped_version
+        for listener in self.listeners:
+            listener(old, new, self.version)
+
+    def load(self, records, dataset_id=None):
+        """
+        Replace the catalog, logging a change for every record that differs
+        dataset_id identifies the source (see file_fingerprint) for shared caches
+        """
+        self.load_snapshot(build_snapshot(records, dataset_id))
+
+    def load_snapshot(self, snapshot):
+        """Replace the catalog with an already built or attached snapshot"""
+        with self.lock:
+            previous, old_records = self.snapshot, self.records
+            new_ids = snapshot.arrays['col:id']
+            if previous is not None:
+                old_positions = self.positions_of(new_ids).tolist()
+                old_live = self.live_positions()
+                old_ids = self.columns['id'][old_live]
+            self.snapshot = snapshot
+            self.records = RecordView(snapshot)
+            self.columns = SupplierColumns(snapshot)
+            self.appended = {}
+            self.loaded_at = datetime.utcnow().isoformat()
+            self.source_id = snapshot.meta.get('source', snapshot.meta.get('dataset_id'))
+            dataset_id = snapshot.meta.get('dataset_id') or uuid.uuid4().hex
+            if previous is None:
+                self.version += 1
+                self.min_version = self.version
+                self.dataset_id = dataset_id
+                return
+            # Compare canonical bytes so only changed records are ever decoded
+            for position, (supplier_id, old_position) in enumerate(zip(new_ids.tolist(), old_positions)):
+                raw = snapshot.blob('records', position)
+                if old_position < 0 or old_records.raw(old_position) != raw:
+                    old = old_records[old_position] if old_position >= 0 else None
+                    self._record_change(supplier_id, 'upsert', old, json.loads(raw))
+            for old_position in old_live[~np.isin(old_ids, new_ids)].tolist():
+                old = old_records[old_position]
+                self._record_change(old['id'], 'delete', old, None)
+            self.dataset_id = dataset_id
+
+    def update(self, supplier_id, updates):
+        """Apply field updates to one supplier, returning the new record or None"""
+        with self.lock:
+            position = self.position_of(supplier_id)
+            if position is None:
+                return None
+            old = self.records[position]
+            new = {**old, **updates, 'lastUpdated': datetime.utcnow().isoformat()}
+            self.records.overlay[position] = new
+            self.columns.set_row(position, new)
+            self.dataset_id = uuid.uuid4().hex
+            self._record_change(supplier_id, 'upsert', old, new)
+            return new
+
+    def apply_batch(self, upserts=(), deletes=(), stamp=None):
+        """
+        Upsert whole records and delete ids in one step. Changed rows are
+        written into the columns and their sorted indexes in place, new ones
+        appended and deleted ones tombstoned; nothing is rebuilt.
+        stamp, if given, becomes lastUpdated of every upserted record.
+        Returns counts per outcome plus the ids that were not found to delete.
+        """
+        with self.lock:
+            upserts = list({s['id']: s for s in upserts}.values())
+            deletes = list(dict.fromkeys(deletes))
+            changes = []
+            updated = []
+            added = []
+            unchanged = 0
+            for supplier, position in zip(upserts, self.positions_of([s['id'] for s in upserts]).tolist()):
+                new = {**supplier, 'lastUpdated': stamp} if stamp else supplier
+                if position < 0:
+                    added.append(new)
+                    changes.append((supplier['id'], 'upsert', None, new))
+                    continue
+                old = self.records[position]
+                if {**old, 'lastUpdated': new.get('lastUpdated')} == new:
+                    unchanged += 1
+                    continue
+                self.records.overlay[position] = new
+                updated.append((position, new))
+                changes.append((supplier['id'], 'upsert', old, new))
+            if updated:
+                self.columns.update_rows([p for p, _ in updated], [s for _, s in updated])
+            if added:
+                for position, supplier in zip(self.columns.append_rows(added).tolist(), added):
+                    self.records.overlay[position] = supplier
+                    self.appended[supplier['id']] = position
+                self.records.size = self.columns.size
+
+            positions = self.positions_of(deletes)
+            missing = [i for i, p in zip(deletes, positions.tolist()) if p < 0]
+            positions = positions[positions >= 0]
+            if len(positions):
+                self.columns.delete_rows(positions)
+                for position in positions.tolist():
+                    old = self.records[position]
+                    changes.append((old['id'], 'delete', old, None))
+
+            if changes:
+                self.dataset_id = uuid.uuid4().hex
+            for change in changes:
+                self._record_change(*change)
+            return {
+                'inserted': len(added),
+                'updated': len(updated),
+                'unchanged': unchanged,
+                'deleted': len(positions),
+                'missing': missing
+            }
+
+    def _text_sources(self):
+        """(positions the snapshot text must skip, live overlay records to check instead)"""
+        overlay = dict(self.records.overlay)
+        live = self.columns.live
+        skip = set(overlay)
+        if live is not None:
+            skip.update(np.flatnonzero(~live).tolist())
+            overlay = {p: s for p, s in overlay.items() if live[p]}
+        return skip, overlay
+
+    def search(self, query, limit, deadline=None):
+        """
+        Positions of records whose name, location, state or category contains query, in catalog order
+        With a deadline, the scan stops when it runs out and returns what it found (marked partial)
+        """
+        needle = query.encode()
+        if not self.snapshot or b'\x1f' in needle or b'\x1e' in needle:
+            return []
+        skip, overlay = self._text_sources()
+        stop = (lambda: deadline.cut('search scan')) if deadline else None
+        positions = self.snapshot.search(needle, limit, skip=skip, stop=stop)
+        positions += [p for p, s in overlay.items() if needle in search_text(s)]
+        return sorted(positions)[:limit]
+
+    def text_positions(self, query, positions=None, deadline=None):
+        """
+        Ascending positions whose search text contains query. With positions,
+        only those records are probed; otherwise the whole text blob is scanned.
+        A deadline that runs out aborts either with DeadlineExceeded.
+        """
+        needle = query.encode()
+        if not self.snapshot or b'\x1f' in needle or b'\x1e' in needle:
+            return np.empty(0, dtype=np.int64)
+        if positions is None:
+            skip, overlay = self._text_sources()
+            stop = (lambda: deadline.check('text scan')) if deadline else None
+            matches = self.snapshot.search(needle, self.snapshot.size, skip=skip, stop=stop)
+            matches += [p for p, s in overlay.items() if needle in search_text(s)]
+        else:
+            overlay = self.records.overlay
+            matches = []
+            for chunk in range(0, len(positions), 4096):
+                if deadline:
+                    deadline.check('text probe')
+                matches += [p for p in positions[chunk:chunk + 4096].tolist() if needle in (
+                    search_text(overlay[p]) if p in overlay else self.snapshot.blob('text', p))]
+        return np.array(sorted(matches), dtype=np.int64)
+
+    def changes_since(self, since):
+        """
+        Return (changes, reset) for everything after version since.
+        reset is True when since predates the compacted log.
+        """
+        with self.lock:
+            if since < self.min_version:
+                return [], True
+            changed = []
+            for supplier_id, (version, op) in reversed(self.changes.items()):
+                if version <= since:
+                    break
+                changed.append((supplier_id, version, op))
+            changed.reverse()
+            return [{
+                'id': supplier_id,
+                'version': version,
+                'op': op,
+                'data': self.find(supplier_id) if op == 'upsert' else None
+            } for supplier_id, version, op in changed], False
+
+STORE = SupplierStore()
+
+# ==================== JOURNAL ====================
+
+def journal_entry(op, **fields):
+    """Encode one journal line (the sequence number is added by Journal.write)"""
+    return json.dumps({'op': op, **fields}, separators=(',', ':')).encode()
+
+class Journal:
+    """
+    Write-ahead log of supplier and user mutations, one JSON object per line.
+
+    write() numbers entries and buffers them in commit order; call it under
+    STORE.lock together with the mutation so log order matches apply order.
+    sync() then waits, outside the lock, until those entries are fsynced.
+    Concurrent writers share fsyncs (group commit): whichever thread syncs
+    first writes out everything buffered so far, and the others usually
+    find their entries already durable.
+
+    Only one process may own the journal (flock on <path>.lock). Other
+    workers follow it and answer writes with 503 (see require_journal),
+    except new accounts, which they forward to the owner (see JournalWatcher).
+    """
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.lock_file = None
+        self.cond = threading.Condition()
+        self.buffer = []
+        self.seq = 0
+        self.durable_seq = 0
+        self.syncing = False
+        self.entries = 0
+        self.syncs = 0
+        # Upserts skipped by the startup replay because normalization rejects them
+        self.replay_rejected = 0
+
+    @property
+    def owner(self):
+        return self.file is not None
+
+    def files(self):
+        """Journal files oldest first: closed ones awaiting compaction, then the active one"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        prefix = os.path.basename(self.path) + '.'
+        closed = []
+        for name in os.listdir(directory) if os.path.isdir(directory) else []:
+            if name.startswith(prefix) and name.endswith('.compacting'):
+                closed.append((int(name[len(prefix):-len('.compacting')]), os.path.join(directory, name)))
+        active = [self.path] if os.path.exists(self.path) else []
+        return [path for _, path in sorted(closed)] + active
+
+    def lock(self):
+        """Try to take ownership (flock on <path>.lock) before replay; True if this process holds it"""
+        if self.lock_file is not None or fcntl is None:
+            return True
+        lock_file = open(self.path + '.lock', 'w')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self.lock_file = lock_file
+        return True
+
+    def open(self, seq):
+        """Start appending after replay, with the lock held; seq is the last sequence number on disk"""
+        self.seq = self.durable_seq = seq
+        self.file = open(self.path, 'ab')
+
+    def write(self, entries):
+        """Buffer encoded entries and return the ticket to pass to sync()"""
+        with self.cond:
+            for entry in entries:
+                self.seq += 1
+                self.buffer.append(b'{"seq":%d,%s\n' % (self.seq, entry[1:]))
+            return self.seq
+
+    def sync(self, ticket):
+        """Block until every entry up to ticket is on disk"""
+        with self.cond:
+            while self.owner and self.durable_seq < ticket:
+                if self.syncing:
+                    self.cond.wait()
+                    continue
+                self.syncing = True
+                data, upto, count = b''.join(self.buffer), self.seq, len(self.buffer)
+                self.buffer = []
+                synced = False
+                self.cond.release()
+                try:
+                    self.file.write(data)
+                    self.file.flush()
+                    os.fsync(self.file.fileno())
+                    synced = True
+                finally:
+                    self.cond.acquire()
+                    self.syncing = False
+                    if synced:
+                        self.durable_seq = upto
+                        self.entries += count
+                        self.syncs += 1
+                    self.cond.notify_all()
+
+    def append(self, entries):
+        self.sync(self.write(entries))
+
+    def rotate(self):
+        """
+        Close the active file as <path>.<seq>.compacting and start a new one.
+        Call with STORE.lock held so seq is a consistent cut. Returns seq.
+        """
+        self.sync(self.seq)
+        with self.cond:
+            if self.owner:
+                self.file.close()
+                os.replace(self.path, f"{self.path}.{self.seq}.compacting")
+                self.file = open(self.path, 'ab')
+            return self.seq
+
+    def size(self):
+        return sum(os.path.getsize(path) for path in self.files())
+
+    def report(self):
+        return {
+            'path': self.path,
+            'owner': self.owner,
+            'seq': self.seq,
+            'durable_seq': self.durable_seq,
+            'entries': self.entries,
+            'syncs': self.syncs,
+            'entries_per_sync': round(self.entries / self.syncs, 2) if self.syncs else None,
+            'replay_rejected': self.replay_rejected,
+            'bytes': self.size()
+        }
+
+JOURNAL = Journal(JOURNAL_FILE)
+
+def replay_journal(after=0, suppliers=True, truncate=False, offsets=None):
+    """
+    Re-apply journaled mutations with seq > after, oldest file first.
+    Consecutive supplier writes are applied as one batch; with suppliers=False
+    only user entries are. Upserts that normalization now rejects are skipped.
+    A torn final line is cut off only with truncate, which the owner passes
+    once it holds the lock (it is a crash mid-write); anyone else stops
+    before it, as the owner may still be appending it. With offsets
+    ({(path, inode): bytes read}, kept by a follower) each file is read on
+    from where the previous call stopped. Returns (last seq seen, entries
+    applied, entries rejected).
+    """
+    last = after
+    applied = 0
+    rejected = 0
+    upserts, deletes = [], []
+
+    def flush():
+        if upserts or deletes:
+            STORE.apply_batch(upserts=upserts, deletes=deletes)
+            upserts.clear()
+            deletes.clear()
+
+    files = JOURNAL.files()
+    seen = set()
+    for path in files:
+        try:
+            f = open(path, 'rb+' if truncate else 'rb')
+        except FileNotFoundError:
+            continue  # compacted away since it was listed
+        with f:
+            stat = os.fstat(f.fileno())
+            key = (path, stat.st_ino)
+            seen.add(key)
+            good = offsets.get(key, 0) if offsets is not None else 0
+            if good > stat.st_size:
+                good = 0
+            f.seek(good)
+            for line in f:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError('incomplete line')
+                    entry = json.loads(line)
+                except ValueError:
+                    if path != files[-1] or f.read(1):
+                        raise RuntimeError(f"{path} is corrupt at byte {good}")
+                    if truncate:
+                        print(f"[WARNING] Dropping torn last entry of {path}")
+                        f.truncate(good)
+                    break
+                good += len(line)
+                last = max(last, entry['seq'])
+                if entry['seq'] <= after or (not suppliers and entry['op'] != 'user'):
+                    continue
+                if entry['op'] == 'upsert':
+                    # Entries journaled before normalization changed are brought up to date
+                    data, _, error = normalize_supplier(entry['data'])
+                    if error:
+                        print(f"[WARNING] Skipping journal entry {entry['seq']}: {error}")
+                        rejected += 1
+                        continue
+                    applied += 1
+                    if deletes:
+                        flush()
+                    upserts.append({**data, 'lastUpdated': entry['ts']} if 'ts' in entry else data)
+                elif entry['op'] == 'delete':
+                    applied += 1
+                    if upserts:
+                        flush()
+                    deletes.append(entry['id'])
+                elif entry['op'] == 'user':
+                    applied += 1
+                    USERS_DB[entry['data']['id']] = entry['data']
+            if offsets is not None:
+                offsets[key] = good
+    if offsets is not None:
+        for key in set(offsets) - seen:
+            del offsets[key]
+    flush()
+    return last, applied, rejected
+
+class Compactor:
+    """
+    Folds the journal into a fresh state snapshot (a dataset segment with
+    USERS_DB in its meta) so startup replays only a short tail. Runs on a
+    daemon thread whenever the journal passes JOURNAL_COMPACT_BYTES.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.thread = None
+        self.runs = 0
+        self.last_run = None
+        self.last_ms = None
+
+    def start(self):
+        def run():
+            while True:
+                time.sleep(JOURNAL_COMPACT_INTERVAL)
+                try:
+                    if JOURNAL.owner and JOURNAL.size() >= JOURNAL_COMPACT_BYTES:
+                        self.compact()
+                except Exception as e:
+                    print(f"[ERROR] Journal compaction failed: {e}")
+
+        if self.thread is None:
+            self.thread = threading.Thread(target=run, name='journal-compactor', daemon=True)
+            self.thread.start()
+
+    def compact(self):
+        """Snapshot the current state and drop the journal files it covers"""
+        with self.lock:
+            started = time.perf_counter()
+            with STORE.lock:
+                snapshot, overlay = STORE.snapshot, dict(STORE.records.overlay)
+                positions = STORE.live_positions()
+                users = json.loads(json.dumps(USERS_DB))
+                dataset_id, source_id = STORE.dataset_id, STORE.source_id
+                seq = JOURNAL.rotate()
+            if not JOURNAL.owner:
+                return None
+            records = [overlay[p] if p in overlay else json.loads(snapshot.blob('records', p))
+                       for p in positions.tolist()]
+            arrays, meta = DatasetSnapshot.pack(records, dataset_id)
+            meta.update(journal_seq=seq, users=users, source=source_id)
+            temp = f"{self.path}.{os.getpid()}.tmp"
+            with open(temp, 'wb') as out:
+                write_segment(out, arrays, meta)
+                out.flush()
+                os.fsync(out.fileno())
+            os.replace(temp, self.path)
+            for path in JOURNAL.files():
+                if path.endswith('.compacting') and int(path.rsplit('.', 2)[1]) <= seq:
+                    os.unlink(path)
+            self.runs += 1
+            self.last_run = datetime.utcnow().isoformat()
+            self.last_ms = round((time.perf_counter() - started) * 1000)
+            print(f"[OK] Compacted journal into {self.path}: {len(records)} suppliers at seq {seq} in {self.last_ms} ms")
+            return seq
+
+COMPACTOR = Compactor(STATE_SNAPSHOT_FILE)
+
+class JournalWatcher:
+    """
+    One daemon thread per worker, waking every JOURNAL_FOLLOW_INTERVAL:
+    the owner journals writes other workers forwarded through
+    <journal>.forward; any other worker takes the journal over once the
+    owner's lock is free, else applies the entries appended since its last
+    look (complete lines only, never truncating) and re-attaches the state
+    snapshot whenever a compaction or reload replaces it.
+    """
+    def __init__(self, journal, snapshot_path):
+        self.journal = journal
+        self.snapshot_path = snapshot_path
+        self.forward_path = journal.path + '.forward'
+        self.offsets = {}
+        self.snapshot_id = None
+        self.thread = None
+        self.followed = 0
+        self.forwarded = 0
+        self.resyncs = 0
+
+    def start(self, snapshot_id):
+        """snapshot_id: the state snapshot as it was before the load read it"""
+        self.snapshot_id = snapshot_id
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name='journal-watcher', daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(JOURNAL_FOLLOW_INTERVAL)
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"[ERROR] Journal watcher failed: {e}")
+
+    def current_snapshot_id(self):
+        try:
+            stat = os.stat(self.snapshot_path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def poll(self):
+        if self.journal.owner:
+            self.drain_forwarded()
+        elif self.journal.lock():
+            # The owner is gone: catch up, cutting off its torn last entry, and take over
+            self.follow(truncate=True)
+            self.journal.open(self.journal.seq)
+            COMPACTOR.start()
+            print(f"[OK] Took over {self.journal.path} at seq {self.journal.seq}")
+        else:
+            self.follow()
+
+    def follow(self, truncate=False):
+        """Apply what the owner appended since the last look"""
+        last, applied, _ = replay_journal(self.journal.seq, truncate=truncate, offsets=self.offsets)
+        self.journal.seq = self.journal.durable_seq = last
+        self.followed += applied
+        snapshot_id = self.current_snapshot_id()
+        if snapshot_id != self.snapshot_id:
+            self.snapshot_id = snapshot_id
+            if snapshot_id is not None:
+                self.resync(truncate)
+
+    def resync(self, truncate=False):
+        """Re-attach the state snapshot the owner wrote and replay the journal after it"""
+        state = DatasetSnapshot.attach(self.snapshot_path)
+        STORE.load_snapshot(state)
+        with STORE.lock:
+            USERS_DB.update(state.meta['users'])
+        self.offsets.clear()
+        after = state.meta['journal_seq']
+        last, _, _ = replay_journal(after, truncate=truncate, offsets=self.offsets)
+        self.journal.seq = self.journal.durable_seq = last
+        RANKER.warm()
+        GEO_INDEX.ensure_built()
+        FUZZY_INDEX.ensure_built()
+        SUGGEST_INDEX.ensure_built()
+        self.resyncs += 1
+        print(f"[OK] Re-attached {self.snapshot_path} ({state.size} suppliers, seq {after} -> {last})")
 
-if not ALL_SUPPLIERS:
-    print("[WARNING] suppliers.json not found - generating fallback data")
-    ALL_SUPPLIERS = generate_fallback_suppliers(150)
-    print(f"[OK] Generated {len(ALL_SUPPLIERS)} fallback suppliers")
-else:
-    print(f"[OK] Loaded {len(ALL_SUPPLIERS)} suppliers from suppliers.json")
+    def forward(self, entries):
+        """From a worker that doesn't own the journal: hand entries to the owner, durably"""
+        with open(self.forward_path, 'ab') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            f.write(b''.join(entry + b'\n' for entry in entries))
+            f.flush()
+            os.fsync(f.fileno())
 
-print(f"[OK] Total suppliers loaded: {len(ALL_SUPPLIERS)}")
-print(f"[OK] Source: {'suppliers.json' if len(ALL_SUPPLIERS) > 150 else 'Fallback Demo'}")
+    def drain_forwarded(self):
+        """Owner side: journal every forwarded entry, then empty the spool"""
+        try:
+            if not os.path.getsize(self.forward_path):
+                return
+        except OSError:
+            return
+        with open(self.forward_path, 'rb+') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    print(f"[WARNING] Skipping unreadable line in {self.forward_path}")
+                    continue
+                if entry.get('op') == 'user':
+                    create_user(entry['data'])
+                    self.forwarded += 1
+            # Emptied only once journaled; replaying it after a crash is harmless (first email wins)
+            f.truncate(0)
+            f.flush()
+            os.fsync(f.fileno())
 
-print("[3/3] Starting API server...")
-print()
+    def report(self):
+        return {
+            'followed': self.followed,
+            'forwarded': self.forwarded,
+            'resyncs': self.resyncs,
+            'interval_s': JOURNAL_FOLLOW_INTERVAL
+        }
+
+JOURNAL_WATCHER = JournalWatcher(JOURNAL, STATE_SNAPSHOT_FILE)
 
 # ==================== USERS DATABASE ====================
 
 USERS_DB = {}
 
+# session_id -> user_id for sessions issued by /api/auth/login in this process,
+# oldest dropped first beyond MAX_SESSIONS
+SESSIONS = OrderedDict()
+MAX_SESSIONS = 100000
+
 def generate_session_id():
     """Generate a unique session ID"""
-    import uuid
     return str(uuid.uuid4())
 
+def start_session(user_id):
+    """Issue a session for user_id and remember it"""
+    session_id = generate_session_id()
+    with STORE.lock:
+        SESSIONS[session_id] = user_id
+        while len(SESSIONS) > MAX_SESSIONS:
+            SESSIONS.popitem(last=False)
+    return session_id
+
 def get_user_by_email(email):
     """Get user from database by email"""
-    for user_id, user_data in USERS_DB.items():
+    for user_id, user_data in list(USERS_DB.items()):
         if user_data.get('email') == email:
             return user_id, user_data
     return None, None
 
+def create_user(user):
+    """
+    Add and journal a new account (owner only) unless its email is taken,
+    e.g. by a racing login on another worker; returns the id of the account
+    with that email
+    """
+    with STORE.lock:
+        user_id, _ = get_user_by_email(user['email'])
+        if user_id:
+            return user_id
+        USERS_DB[user['id']] = user
+        ticket = JOURNAL.write([journal_entry('user', data=user)])
+    JOURNAL.sync(ticket)
+    return user['id']
+
+def forward_user(user):
+    """
+    From a worker that doesn't own the journal: have the owner create the
+    account and wait until it comes back through this worker's follower.
+    Returns its id, or None after JOURNAL_FORWARD_TIMEOUT
+    """
+    JOURNAL_WATCHER.forward([journal_entry('user', data=user)])
+    deadline = time.monotonic() + JOURNAL_FORWARD_TIMEOUT
+    while time.monotonic() < deadline:
+        user_id, _ = get_user_by_email(user['email'])
+        if user_id:
+            return user_id
+        time.sleep(0.05)
+    return None
+
+# ==================== JSON SERIALIZATION ====================
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from flask.json.provider import DefaultJSONProvider
+
+class RawRecords(list):
+    """
+    Already-encoded JSON values (bytes), e.g. records straight from the
+    snapshot blob. As a top-level value of a response payload they are
+    spliced into the body as an array without being decoded.
+    """
+
+class JSONSerializer:
+    """
+    Encodes response payloads to bytes with orjson when it is installed
+    (JSON_BACKEND=auto|orjson|stdlib). Both sort keys, use compact separators
+    and write non-ASCII as UTF-8, so they decode to the same JSON; the bytes
+    can still differ (orjson writes 1e16 where the stdlib writes 1e+16).
+    """
+    def __init__(self, backend=JSON_BACKEND):
+        if backend == 'orjson' and orjson is None:
+            raise RuntimeError('JSON_BACKEND=orjson but orjson is not installed (pip install orjson)')
+        self.name = 'orjson' if backend in ('auto', 'orjson') and orjson is not None else 'stdlib'
+        self.default = DefaultJSONProvider.default
+
+    def dumps(self, obj):
+        if self.name == 'orjson':
+            try:
+                # datetimes go through default, as with the stdlib, so both format them alike
+                return orjson.dumps(obj, default=self.default, option=orjson.OPT_SORT_KEYS
+                                    | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+                                    | orjson.OPT_PASSTHROUGH_DATETIME)
+            except TypeError:
+                pass  # e.g. integers beyond 64 bits; the stdlib handles them
+        return json.dumps(obj, default=self.default, sort_keys=True, separators=(',', ':'),
+                          ensure_ascii=False).encode()
+
+    def encode(self, payload):
+        """dumps(), except RawRecords values of a top-level dict are spliced in as arrays"""
+        if not isinstance(payload, dict) or not any(isinstance(v, RawRecords) for v in payload.values()):
+            return self.dumps(payload)
+        parts = []
+        for key in sorted(payload):
+            value = payload[key]
+            if isinstance(value, RawRecords):
+                parts.append(self.dumps(key) + b':[' + b','.join(value) + b']')
+            else:
+                parts.append(self.dumps({key: value})[1:-1])
+        return b'{' + b','.join(parts) + b'}'
+
+SERIALIZER = JSONSerializer()
+
+class SerializerJSONProvider(DefaultJSONProvider):
+    """Routes jsonify() through SERIALIZER, handing the bytes straight to the response"""
+    def dumps(self, obj, **kwargs):
+        return SERIALIZER.dumps(obj).decode()
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(SERIALIZER.encode(obj) + b'\n', mimetype=self.mimetype)
+
+app.json = SerializerJSONProvider(app)
+
+# ==================== RESULT CACHE ====================
+
+class ResultCache:
+    """
+    Two-level cache of encoded JSON response bodies for search and filter.
+
+    L1 is a per-process LRU bounded by total body bytes. L2 is an optional
+    SQLite file (RESULT_CACHE_SHARED_PATH) that every worker on the host
+    reads and writes. Keys embed STORE.cache_token, so a mutation or reload
+    invalidates everything without any explicit purge, and SERIALIZER.name,
+    so workers on different JSON backends never serve each other's bodies.
+    """
+    def __init__(self, max_bytes=RESULT_CACHE_MAX_BYTES, shared_path=RESULT_CACHE_SHARED_PATH,
+                 shared_max_bytes=RESULT_CACHE_SHARED_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.shared_path = shared_path
+        self.shared_max_bytes = shared_max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.token = None
+        self.stats = {'l1_hits': 0, 'l2_hits': 0, 'misses': 0, 'evictions': 0}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def key(self, route, query):
+        raw = json.dumps([route, query], sort_keys=True, separators=(',', ':'))
+        return f"{STORE.cache_token}:{SERIALIZER.name}:{hashlib.sha1(raw.encode()).hexdigest()}"
+
+    def _shared(self):
+        """Per-thread SQLite connection to the shared tier, or None"""
+        if not self.shared_path:
+            return None
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.shared_path, timeout=1, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS results '
+                '(key TEXT PRIMARY KEY, token TEXT, body BLOB, size INTEGER, created REAL)'
+            )
+            self.local.conn = conn
+        return conn
+
+    def _put_local(self, key, body):
+        if len(body) > self.max_bytes:
+            return
+        with self.lock:
+            if STORE.cache_token != self.token:
+                self.entries.clear()
+                self.bytes = 0
+                self.token = STORE.cache_token
+            if key in self.entries:
+                return
+            self.entries[key] = body
+            self.bytes += len(body)
+            while self.bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.bytes -= len(evicted)
+                self.stats['evictions'] += 1
+
+    def get(self, key):
+        with self.lock:
+            body = self.entries.get(key)
+            if body is not None:
+                self.entries.move_to_end(key)
+                self.stats['l1_hits'] += 1
+                return body
+
+        try:
+            conn = self._shared()
+            row = conn.execute('SELECT body FROM results WHERE key = ?', (key,)).fetchone() if conn else None
+        except sqlite3.Error as e:
+            print(f"[WARNING] Shared result cache read failed: {e}")
+            row = None
+        if row:
+            self.stats['l2_hits'] += 1
+            self._put_local(key, row[0])
+            return row[0]
+
+        self.stats['misses'] += 1
+        return None
+
+    def put(self, key, body):
+        self._put_local(key, body)
+        try:
+            conn = self._shared()
+            if conn and len(body) <= self.shared_max_bytes:
+                token = STORE.cache_token
+                conn.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)',
+                             (key, token, body, len(body), time.time()))
+                conn.execute('DELETE FROM results WHERE token != ? AND created < ?', (token, time.time() - 60))
+                total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+                if total > self.shared_max_bytes:
+                    conn.execute(
+                        'DELETE FROM results WHERE key IN '
+                        '(SELECT key FROM results ORDER BY created LIMIT (SELECT COUNT(*) / 4 + 1 FROM results))'
+                    )
+        except sqlite3.Error as e:
+            print(f"[WARNING] Shared result cache write failed: {e}")
+
+    def report(self):
+        lookups = self.stats['l1_hits'] + self.stats['l2_hits'] + self.stats['misses']
+        return {
+            **self.stats,
+            'lookups': lookups,
+            'hit_ratio': round((self.stats['l1_hits'] + self.stats['l2_hits']) / lookups, 4) if lookups else None,
+            'l1_entries': len(self.entries),
+            'l1_bytes': self.bytes,
+            'l1_max_bytes': self.max_bytes,
+            'shared_path': self.shared_path,
+        }
+
+RESULT_CACHE = ResultCache()
+
+def cached_json(route, query, compute):
+    """
+    Serve compute()'s JSON payload through RESULT_CACHE
+    compute returns (payload, status); only complete 200 responses are cached,
+    not ones flagged truncated
+    """
+    key = RESULT_CACHE.key(route, query)
+    body = RESULT_CACHE.get(key)
+    if body is not None:
+        return Response(body, mimetype='application/json', headers={'X-Cache': 'HIT'})
+    payload, status = compute()
+    body = SERIALIZER.encode(payload)
+    if status == 200 and not payload.get('truncated'):
+        RESULT_CACHE.put(key, body)
+    return Response(body, status=status, mimetype='application/json', headers={'X-Cache': 'MISS'})
+
 # ==================== API ENDPOINTS ====================
 
 @app.route('/')
@@ -155,6 +1668,46 @@ def serve_dashboard_html():
 
 # ==================== AUTHENTICATION ENDPOINTS ====================
 
+def require_admin(view):
+    """
+    Guard a route with ADMIN_TOKEN, sent as "Authorization: Bearer <token>"
+    or X-Admin-Token; 401 without it, 403 when no token is configured
+    """
+    @wraps(view)
+    def guarded(*args, **kwargs):
+        if not ADMIN_TOKEN:
+            return jsonify({
+                'success': False,
+                'error': 'This route is disabled (set ADMIN_TOKEN to enable it)'
+            }), 403
+        header = request.headers.get('Authorization', '')
+        token = header[7:] if header.startswith('Bearer ') else request.headers.get('X-Admin-Token', '')
+        if not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+            response = jsonify({
+                'success': False,
+                'error': 'Admin token required'
+            })
+            response.status_code = 401
+            response.headers['WWW-Authenticate'] = 'Bearer'
+            return response
+        return view(*args, **kwargs)
+    return guarded
+
+def require_journal(view):
+    """Answer 503 + Retry-After from a worker that cannot journal writes (another process owns the journal)"""
+    @wraps(view)
+    def guarded(*args, **kwargs):
+        if not JOURNAL.owner:
+            response = jsonify({
+                'success': False,
+                'error': 'This worker cannot accept writes right now'
+            })
+            response.status_code = 503
+            response.headers['Retry-After'] = str(LOADING_RETRY_AFTER)
+            return response
+        return view(*args, **kwargs)
+    return guarded
+
 @app.route('/api/auth/login', methods=['POST'])
 def auth_login():
     """
@@ -178,8 +1731,12 @@ def auth_login():
         
         if user_id:
             # User already exists, just login
-            session_id = generate_session_id()
-            existing_user['last_login'] = datetime.utcnow().isoformat()
+            session_id = start_session(user_id)
+            with STORE.lock:
+                existing_user['last_login'] = datetime.utcnow().isoformat()
+                # Other workers keep last_login in memory; it isn't worth a forwarded write
+                ticket = JOURNAL.write([journal_entry('user', data=existing_user)]) if JOURNAL.owner else 0
+            JOURNAL.sync(ticket)
             
             print(f"[AUTH] User logged in: {email}")
             
@@ -194,11 +1751,8 @@ def auth_login():
             }), 200
         else:
             # Create new user account
-            import uuid
-            new_user_id = str(uuid.uuid4())
-            
-            USERS_DB[new_user_id] = {
-                'id': new_user_id,
+            new_user = {
+                'id': str(uuid.uuid4()),
                 'email': email,
                 'name': name,
                 'walmart_id': walmart_id,
@@ -207,8 +1761,20 @@ def auth_login():
                 'favorites': [],
                 'notes': {}
             }
+            if JOURNAL.owner:
+                new_user_id = create_user(new_user)
+            else:
+                new_user_id = forward_user(new_user)
+                if new_user_id is None:
+                    response = jsonify({
+                        'success': False,
+                        'detail': 'Account could not be created right now'
+                    })
+                    response.status_code = 503
+                    response.headers['Retry-After'] = str(LOADING_RETRY_AFTER)
+                    return response
             
-            session_id = generate_session_id()
+            session_id = start_session(new_user_id)
             
             print(f"[AUTH] New user created and logged in: {email}")
             
@@ -237,6 +1803,10 @@ def auth_logout():
     try:
         data = request.get_json() or {}
         user_id = data.get('user_id')
+        session_id = data.get('session_id') or request.headers.get('X-Session-Id')
+        if isinstance(session_id, str):
+            with STORE.lock:
+                SESSIONS.pop(session_id, None)
         
         if user_id and user_id in USERS_DB:
             print(f"[AUTH] User logged out: {USERS_DB[user_id]['email']}")
@@ -326,7 +1896,8 @@ def get_suppliers():
     Query params: page=1, limit=1000
     """
     try:
-        print(f"[API] GET /api/suppliers - Returning {len(ALL_SUPPLIERS)} suppliers")
+        positions = STORE.live_positions()
+        print(f"[API] GET /api/suppliers - Returning {len(positions)} suppliers")
         
         page = request.args.get('page', 1, type=int)
         limit = request.args.get('limit', 1000, type=int)
@@ -334,15 +1905,16 @@ def get_suppliers():
         # Pagination
         start = (page - 1) * limit
         end = start + limit
-        paginated = ALL_SUPPLIERS[start:end]
+        paginated = STORE.records.encoded(positions[max(start, 0):max(end, 0)])
         
         return jsonify({
             'success': True,
             'data': paginated,
-            'total': len(ALL_SUPPLIERS),
+            'total': len(positions),
             'page': page,
             'limit': limit,
-            'source': 'suppliers.json' if len(ALL_SUPPLIERS) > 150 else 'fallback'
+            'version': STORE.version,
+            'source': 'suppliers.json' if len(positions) > 150 else 'fallback'
         })
     except Exception as e:
         print(f"[ERROR] /api/suppliers: {e}")
@@ -356,7 +1928,7 @@ def get_suppliers():
 def get_supplier(supplier_id):
     """Get a specific supplier by ID"""
     try:
-        supplier = next((s for s in ALL_SUPPLIERS if s['id'] == supplier_id), None)
+        supplier = STORE.find(supplier_id)
         if supplier:
             return jsonify({
                 'success': True,
@@ -373,28 +1945,56 @@ def get_supplier(supplier_id):
             'error': str(e)
         }), 500
 
-@app.route('/api/suppliers/search', methods=['POST'])
-def search_suppliers():
-    """Search suppliers by query"""
+BATCH_MAX_IDS = int(os.environ.get('BATCH_MAX_IDS', 5000))
+
+@app.route('/api/suppliers/batch', methods=['POST'])
+def batch_suppliers():
+    """
+    Look up many suppliers in one request, e.g. a favorites list
+    Request body: {"ids": [12, 7, 9], "fields": ["id", "name", "rating"]}
+    Results follow the order of ids; unknown ids are listed in missing
+    """
     try:
         data = request.get_json() or {}
-        query = data.get('q', '').lower()
-        
-        if not query:
+        if not isinstance(data, dict):
             return jsonify({
-                'success': True,
-                'results': ALL_SUPPLIERS[:50] if ALL_SUPPLIERS else []
-            })
-        
-        results = [s for s in ALL_SUPPLIERS if 
-                   query in s.get('name', '').lower() or 
-                   query in s.get('location', '').lower() or
-                   query in s.get('state', '').lower() or
-                   query in s.get('category', '').lower()]
-        
+                'success': False,
+                'error': 'Request body must be a JSON object'
+            }), 400
+        ids = data.get('ids')
+        fields = data.get('fields')
+        if not isinstance(ids, list) or not all(
+                isinstance(i, int) and not isinstance(i, bool) and -2 ** 63 <= i < 2 ** 63 for i in ids):
+            return jsonify({
+                'success': False,
+                'error': 'ids must be a list of integer supplier ids'
+            }), 400
+        if len(ids) > BATCH_MAX_IDS:
+            return jsonify({
+                'success': False,
+                'error': f"At most {BATCH_MAX_IDS} ids per request"
+            }), 400
+        if fields is not None and (not isinstance(fields, list) or not all(isinstance(f, str) for f in fields)):
+            return jsonify({
+                'success': False,
+                'error': 'fields must be a list of field names'
+            }), 400
+
+        positions = STORE.positions_of(ids)
+        missing = [i for i, position in zip(ids, positions.tolist()) if position < 0]
+        found = positions[positions >= 0]
+        if fields is None:
+            results = STORE.records.encoded(found)
+        else:
+            records = STORE.records
+            results = [project(records[p], fields) for p in found.tolist()]
+
         return jsonify({
             'success': True,
-            'results': results[:100]
+            'results': results,
+            'missing': missing,
+            'count': len(results),
+            'version': STORE.version
         })
     except Exception as e:
         return jsonify({
@@ -402,48 +2002,2727 @@ def search_suppliers():
             'error': str(e)
         }), 500
 
-@app.route('/api/suppliers/filter', methods=['POST'])
-def filter_suppliers():
-    """Filter suppliers by criteria"""
+@app.route('/api/suppliers/search', methods=['POST'])
+def search_suppliers():
+    """
+    Search suppliers by query
+    Request body: {"q": "lumbr", "fuzzy": "auto" | true | false, "maxDistance": 2}
+    With fuzzy=auto, a query with no substring match is retried typo-tolerantly
+    over names and categories; fuzzy=true always does
+    """
     try:
-        filters = request.get_json() or {}
-        
-        results = ALL_SUPPLIERS.copy()
-        
-        if 'state' in filters and filters['state']:
-            results = [s for s in results if s.get('state') == filters['state']]
-        
-        if 'category' in filters and filters['category']:
-            results = [s for s in results if s.get('category') == filters['category']]
-        
-        if 'region' in filters and filters['region']:
-            results = [s for s in results if s.get('region') == filters['region']]
-        
-        if 'minRating' in filters:
-            min_rating = filters['minRating']
-            results = [s for s in results if s.get('rating', 0) >= min_rating]
-        
+        data = request.get_json() or {}
+        if not isinstance(data, dict) or not isinstance(data.get('q', ''), str):
+            raise ValueError('Request body must look like {"q": "lumber"}')
+        query = data.get('q', '').lower()
+        fuzzy = data.get('fuzzy', 'auto')
+        max_distance = data.get('maxDistance', 2)
+        if fuzzy not in (True, False, 'auto'):
+            raise ValueError("fuzzy must be true, false or 'auto'")
+        if not isinstance(max_distance, int) or isinstance(max_distance, bool) or not 0 <= max_distance <= 2:
+            raise ValueError('maxDistance must be 0, 1 or 2')
+
+        def compute():
+            if not query:
+                return {
+                    'success': True,
+                    'results': STORE.records.encoded(STORE.live_positions()[:50])
+                }, 200
+
+            deadline = current_deadline()
+            if fuzzy is not True:
+                charge_scan(STORE.size)
+            positions = STORE.search(query, 100, deadline) if fuzzy is not True else []
+            if positions or fuzzy is False:
+                payload = {
+                    'success': True,
+                    'results': STORE.records.encoded(positions)
+                }
+                if deadline and deadline.outcome == 'partial':
+                    payload['truncated'] = True
+                return payload, 200
+
+            budget = min(FUZZY_BUDGET_MS, deadline.remaining_ms()) if deadline else FUZZY_BUDGET_MS
+            positions, distances, corrections, truncated = FUZZY_INDEX.search(query, 100, max_distance, budget)
+            if truncated and deadline:
+                deadline.cut('fuzzy match')
+            return {
+                'success': True,
+                'results': STORE.records.encoded(positions),
+                'fuzzy': True,
+                'distances': distances.tolist(),
+                'corrections': corrections,
+                'truncated': truncated
+            }, 200
+
+        return cached_json('search', {'q': query, 'fuzzy': fuzzy, 'maxDistance': max_distance}, compute)
+    except ValueError as e:
         return jsonify({
-            'success': True,
-            'results': results,
-            'count': len(results)
-        })
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
-@app.route('/health', methods=['GET'])
-def health_check():
+# filter key -> (column, bound); each becomes a range scan over the column's sorted index
+RANGE_FILTERS = {
+    'minRating': ('rating', 'low'),
+    'minStockLevel': ('stockLevel', 'low'),
+    'minLeadTimeDays': ('leadTimeMinDays', 'low'),
+    'maxLeadTimeDays': ('leadTimeMaxDays', 'high'),
+    'minResponseTimeDays': ('responseTimeMinDays', 'low'),
+    'maxResponseTimeDays': ('responseTimeMaxDays', 'high'),
+}
+SORT_COLUMNS = {
+    'rating': 'rating',
+    'reviews': 'reviews',
+    'stockLevel': 'stockLevel',
+    'leadTime': 'leadTimeMinDays',
+    'responseTime': 'responseTimeMinDays',
+}
+
+def filter_positions(filters):
+    """
+    Resolve a filter body to catalog positions through the query planner
+    Raises ValueError for anything malformed, as parse_query does
+    """
+    ranges = {}
+    for key, (name, bound) in RANGE_FILTERS.items():
+        if filters.get(key) is not None:
+            low, high = ranges.get(name, (None, None))
+            value = query_number(filters[key], key)
+            ranges[name] = (value, high) if bound == 'low' else (low, value)
+    predicates = [RangePredicate(name, low, high) for name, (low, high) in ranges.items()]
+    for field in CATEGORICAL_COLUMNS:
+        if filters.get(field):
+            if not isinstance(filters[field], str):
+                raise ValueError(f"{field} must be a string")
+            predicates.append(EqualsPredicate(field, filters[field]))
+
+    sort_by = filters.get('sortBy')
+    if sort_by and (not isinstance(sort_by, str) or sort_by not in SORT_COLUMNS):
+        raise ValueError(f"Cannot sort by {sort_by!r} (use {', '.join(SORT_COLUMNS)})")
+    order = filters.get('order', 'asc')
+    if order not in ('asc', 'desc'):
+        raise ValueError("order must be 'asc' or 'desc'")
+    positions, _ = plan_query(predicates, SORT_COLUMNS.get(sort_by), order == 'desc')
+    return positions
+
+@app.route('/api/suppliers/filter', methods=['POST'])
+def filter_suppliers():
+    """
+    Filter suppliers by criteria
+    Request body: {"state", "category", "region", "minRating", "minStockLevel",
+                   "minLeadTimeDays", "maxLeadTimeDays", "minResponseTimeDays",
+                   "maxResponseTimeDays", "sortBy", "order": "asc" | "desc"}
+    """
+    try:
+        filters = query_object(request.get_json() or {}, 'Request body')
+        normalized = {k: v for k, v in filters.items() if v not in (None, '', [])}
+
+        def compute():
+            results = STORE.records.encoded(filter_positions(normalized))
+            return {
+                'success': True,
+                'results': results,
+                'count': len(results)
+            }, 200
+
+        return cached_json('filter', normalized, compute)
+    except DeadlineExceeded as e:
+        return timeout_response(e)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/suppliers/changes', methods=['GET'])
+def get_supplier_changes():
+    """
+    Delta sync: suppliers changed after a given version
+    Query params: since=<version from a previous response>
+    If reset is true the client is too far behind and must refetch /api/suppliers
+    """
+    try:
+        since = request.args.get('since', 0, type=int)
+        changes, reset = STORE.changes_since(since)
+        return jsonify({
+            'success': True,
+            'since': since,
+            'version': STORE.version,
+            'reset': reset,
+            'changes': changes,
+            'count': len(changes)
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/admin/cache', methods=['GET'])
+@require_admin
+def cache_stats():
+    """Hit/miss ratios and sizes of the search/filter result cache"""
+    return jsonify({
+        'success': True,
+        'cache': RESULT_CACHE.report(),
+        'token': STORE.cache_token
+    })
+
+@app.route('/api/admin/data-quality', methods=['GET'])
+@require_admin
+def data_quality():
+    """What the load-time normalization pass fixed and rejected in the current data"""
+    return jsonify({
+        'success': True,
+        'quality': DATA_QUALITY
+    })
+
+@app.route('/api/admin/journal', methods=['GET'])
+@require_admin
+def journal_stats():
+    """Journal sequence, group-commit ratio and size, plus the last compaction"""
+    return jsonify({
+        'success': True,
+        'journal': JOURNAL.report(),
+        'watcher': JOURNAL_WATCHER.report(),
+        'compaction': {
+            'snapshot': COMPACTOR.path,
+            'runs': COMPACTOR.runs,
+            'last_run': COMPACTOR.last_run,
+            'last_ms': COMPACTOR.last_ms,
+            'threshold_bytes': JOURNAL_COMPACT_BYTES
+        }
+    })
+
+@app.route('/api/admin/journal/compact', methods=['POST'])
+@require_admin
+def compact_journal():
+    """Fold the journal into a new state snapshot now"""
+    try:
+        if not JOURNAL.owner:
+            return jsonify({
+                'success': False,
+                'error': 'This worker does not own the journal'
+            }), 409
+        seq = COMPACTOR.compact()
+        return jsonify({
+            'success': True,
+            'journal_seq': seq,
+            'ms': COMPACTOR.last_ms
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/admin/reload', methods=['POST'])
+@require_admin
+@require_journal
+def reload_suppliers():
+    """Reload suppliers.json, versioning and broadcasting every changed record"""
+    try:
+        suppliers = load_suppliers_from_file(DATA_FILE)
+        if not suppliers:
+            return jsonify({
+                'success': False,
+                'error': 'suppliers.json could not be loaded'
+            }), 500
+
+        before = STORE.version
+        STORE.load(suppliers, dataset_id=file_fingerprint(DATA_FILE))
+        # Journaled writes predate the reload; fold the new state so replay starts from it
+        COMPACTOR.compact()
+        RANKER.warm()
+        GEO_INDEX.ensure_built()
+        FUZZY_INDEX.ensure_built()
+        SUGGEST_INDEX.ensure_built()
+        print(f"[OK] Reloaded {len(suppliers)} suppliers (version {before} -> {STORE.version})")
+
+        return jsonify({
+            'success': True,
+            'total': STORE.size,
+            'version': STORE.version,
+            'changed': STORE.version - before
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+# ==================== BULK INGESTION ====================
+
+# field -> (accepted types, required); fields not listed pass through unchecked
+SUPPLIER_SCHEMA = {
+    'id': ((int,), True),
+    'name': ((str,), True),
+    'category': ((str,), True),
+    'location': ((str,), False),
+    'state': ((str,), False),
+    'region': ((str,), False),
+    'phone': ((str,), False),
+    'source': ((str,), False),
+    'rating': ((int, float), False),
+    'reviews': ((int,), False),
+    'products': ((list,), False),
+    'certifications': ((list,), False),
+    'leadTime': ((str,), False),
+    'responseTime': ((str,), False),
+    'stockLevel': ((int,), False),
+    'inStock': ((bool,), False),
+    'minimumOrder': ((int,), False),
+    'walmartVerified': ((bool,), False),
+    'size': ((str,), False),
+    'priceRange': ((str,), False),
+    'aiScore': ((int, float), False),
+    'lastStockCheck': ((str,), False),
+}
+# field -> (min, max) for numbers
+SUPPLIER_BOUNDS = {
+    'id': (1, 2 ** 63 - 1),
+    'rating': (0, 5),
+    'reviews': (0, None),
+    'stockLevel': (0, None),
+    'minimumOrder': (0, None),
+}
+SCHEMA_CHECKS = tuple(
+    (field, types, required, bool in types, ' or '.join(t.__name__ for t in types))
+    for field, (types, required) in SUPPLIER_SCHEMA.items()
+)
+
+def validate_supplier(record):
+    """Return why record does not fit SUPPLIER_SCHEMA, or None if it does"""
+    if not isinstance(record, dict):
+        return 'record must be a JSON object'
+    for field, types, required, allow_bool, expected in SCHEMA_CHECKS:
+        value = record.get(field)
+        if value is None:
+            if required:
+                return f"missing required field '{field}'"
+            continue
+        # bool is a subclass of int, so it must be rejected explicitly
+        if not isinstance(value, types) or ((value is True or value is False) and not allow_bool):
+            return f"'{field}' must be {expected}"
+    for field, (low, high) in SUPPLIER_BOUNDS.items():
+        value = record.get(field)
+        if value is not None and ((low is not None and value < low) or (high is not None and value > high)):
+            return f"'{field}' is out of range"
+    return None
+
+def read_ndjson():
+    """
+    Parse the request body as newline-delimited JSON
+    Returns ([(line_number, raw_line, value)], [{'line', 'error'}]); blank lines are skipped
+    """
+    lines = [(n, line) for n, line in enumerate(request.get_data().splitlines(), start=1) if line.strip()]
+    try:
+        # One decoder call for the whole batch is several times faster than one per line
+        values = json.loads(b'[' + b','.join(line for _, line in lines) + b']')
+        if len(values) == len(lines):
+            return [(n, line, v) for (n, line), v in zip(lines, values)], []
+    except ValueError:
+        pass
+    parsed = []
+    errors = []
+    for number, line in lines:
+        try:
+            parsed.append((number, line, json.loads(line)))
+        except ValueError as e:
+            errors.append({'line': number, 'error': f"invalid JSON: {e}"})
+    return parsed, errors
+
+def bulk_response(result, rejected, accepted):
+    status = 400 if rejected and not accepted else 200
+    return jsonify({
+        'success': status == 200,
+        **result,
+        'rejected': rejected,
+        'version': STORE.version
+    }), status
+
+@app.route('/api/suppliers/bulk', methods=['POST'])
+@require_admin
+@require_journal
+def bulk_upsert_suppliers():
+    """
+    Insert or replace suppliers from an NDJSON body, one full record per line
+    Invalid lines are rejected and reported; the rest are applied and
+    journaled, and the response waits for the journal fsync
+    """
+    try:
+        parsed, rejected = read_ndjson()
+        if len(parsed) > BULK_MAX_RECORDS:
+            return jsonify({
+                'success': False,
+                'error': f"At most {BULK_MAX_RECORDS} records per batch"
+            }), 413
+        now = datetime.utcnow().isoformat()
+        prefix = b'{"op":"upsert","ts":"' + now.encode() + b'","data":'
+        records = []
+        entries = []
+        for number, line, record in parsed:
+            error = validate_supplier(record)
+            if not error:
+                record, _, error = normalize_supplier(record)
+            if error:
+                rejected.append({'line': number, 'error': error})
+            else:
+                records.append(record)
+                entries.append(prefix + line.strip() + b'}')
+        rejected.sort(key=lambda r: r['line'])
+
+        result = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+        if records:
+            # Journal only what applied; the response waits for the fsync
+            with STORE.lock:
+                applied = STORE.apply_batch(upserts=records, stamp=now)
+                ticket = JOURNAL.write(entries)
+            JOURNAL.sync(ticket)
+            result = {k: applied[k] for k in result}
+            print(f"[OK] Bulk upsert: {result['inserted']} inserted, {result['updated']} updated, {len(rejected)} rejected")
+        return bulk_response(result, rejected, records)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/suppliers/bulk/delete', methods=['POST'])
+@require_admin
+@require_journal
+def bulk_delete_suppliers():
+    """
+    Delete suppliers listed in an NDJSON body, one {"id": 12} (or bare id) per line
+    Unknown ids are reported in missing
+    """
+    try:
+        parsed, rejected = read_ndjson()
+        if len(parsed) > BULK_MAX_RECORDS:
+            return jsonify({
+                'success': False,
+                'error': f"At most {BULK_MAX_RECORDS} ids per batch"
+            }), 413
+        ids = []
+        for number, _, value in parsed:
+            supplier_id = value.get('id') if isinstance(value, dict) else value
+            if isinstance(supplier_id, int) and not isinstance(supplier_id, bool) and 0 < supplier_id < 2 ** 63:
+                ids.append(supplier_id)
+            else:
+                rejected.append({'line': number, 'error': 'expected {"id": <positive integer>}'})
+        rejected.sort(key=lambda r: r['line'])
+
+        result = {'deleted': 0, 'missing': []}
+        if ids:
+            with STORE.lock:
+                applied = STORE.apply_batch(deletes=ids)
+                ticket = JOURNAL.write([journal_entry('delete', id=i) for i in ids])
+            JOURNAL.sync(ticket)
+            result = {k: applied[k] for k in result}
+            print(f"[OK] Bulk delete: {result['deleted']} deleted, {len(result['missing'])} missing")
+        return bulk_response(result, rejected, ids)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+# ==================== QUERY PLANNER ====================
+
+# While candidates are at most this fraction of the catalog, text terms probe
+# records one by one instead of scanning the whole text blob
+TEXT_PROBE_RATIO = float(os.environ.get('TEXT_PROBE_RATIO', 0.25))
+QUERY_MAX_LIMIT = 1000
+
+class EqualsPredicate:
+    """Categorical field equals a value; served by the per-code position index"""
+    indexed = True
+
+    def __init__(self, field, value):
+        self.field = field
+        self.value = value
+
+    def describe(self):
+        return f"{self.field} = {self.value!r}"
+
+    def estimate(self, columns):
+        return len(columns.code_positions(self.field, self.value))
+
+    def lookup(self, columns):
+        return columns.code_positions(self.field, self.value)
+
+    def apply(self, columns, candidates):
+        return candidates[columns.codes[self.field][candidates] == columns.code(self.field, self.value)]
+
+class RangePredicate:
+    """Numeric column within [low, high]; served by the column's sorted index"""
+    indexed = True
+
+    def __init__(self, name, low=None, high=None):
+        self.name = name
+        self.low = low
+        self.high = high
+
+    def describe(self):
+        if self.low is not None and self.low == self.high:
+            return f"{self.name} = {self.low}"
+        bounds = [f"{self.name} >= {self.low}"] if self.low is not None else []
+        if self.high is not None:
+            bounds.append(f"{self.name} <= {self.high}")
+        return ' and '.join(bounds) or f"{self.name} is any"
+
+    def estimate(self, columns):
+        return len(columns.range(self.name, self.low, self.high))
+
+    def lookup(self, columns):
+        return np.sort(columns.range(self.name, self.low, self.high))
+
+    def apply(self, columns, candidates):
+        values = columns[self.name][candidates]
+        keep = ~np.isnan(values)
+        if self.low is not None:
+            keep &= values >= self.low
+        if self.high is not None:
+            keep &= values <= self.high
+        return candidates[keep]
+
+class TextPredicate:
+    """Substring of name, location, state or category; unindexed, so it runs last"""
+    indexed = False
+
+    def __init__(self, term):
+        self.term = term
+
+    def describe(self):
+        return f"text contains {self.term!r}"
+
+    def estimate(self, columns):
+        return columns.size
+
+    def lookup(self, columns):
+        return STORE.text_positions(self.term, deadline=current_deadline())
+
+    def probes(self, columns, candidates):
+        return len(candidates) <= columns.size * TEXT_PROBE_RATIO
+
+    def apply(self, columns, candidates):
+        if self.probes(columns, candidates):
+            return STORE.text_positions(self.term, candidates, deadline=current_deadline())
+        return candidates[np.isin(candidates, STORE.text_positions(self.term, deadline=current_deadline()),
+                                  assume_unique=True)]
+
+def query_number(value, name):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        number = math.nan
+    if not math.isfinite(number):
+        raise ValueError(f"'{name}' needs a number, got {value!r}")
+    return number
+
+def query_object(value, name):
+    """value if it is a JSON object (or absent), else a ValueError naming the key"""
+    if value is None:
+        return {}
+    if not isinstance(value, dict):
+        raise ValueError(f"{name} must be a JSON object")
+    return value
+
+def parse_query(body):
+    """
+    Validate a structured query body into predicates, sort, projection and paging
+    Raises ValueError for anything malformed
+    """
+    if not isinstance(body, dict):
+        raise ValueError('Query body must be a JSON object')
+    predicates = []
+    text = body.get('text') or []
+    terms = [text] if isinstance(text, str) else text
+    if not isinstance(terms, list) or not all(isinstance(t, str) for t in terms):
+        raise ValueError('text must be a string or a list of strings')
+    for term in terms:
+        if term.strip():
+            predicates.append(TextPredicate(term.strip().lower()))
+
+    for field, value in query_object(body.get('where'), 'where').items():
+        if field in CATEGORICAL_COLUMNS:
+            if not isinstance(value, str):
+                raise ValueError(f"where.{field} must be a string")
+            predicates.append(EqualsPredicate(field, value))
+        elif field in NUMERIC_COLUMNS:
+            value = query_number(value, field)
+            predicates.append(RangePredicate(field, value, value))
+        else:
+            raise ValueError(f"Cannot filter on '{field}' (use {', '.join(CATEGORICAL_COLUMNS + tuple(NUMERIC_COLUMNS))})")
+
+    for name, bounds in query_object(body.get('range'), 'range').items():
+        if name not in NUMERIC_COLUMNS:
+            raise ValueError(f"Cannot range over '{name}' (use {', '.join(NUMERIC_COLUMNS)})")
+        if not isinstance(bounds, dict) or not set(bounds) <= {'min', 'max'}:
+            raise ValueError(f"range.{name} must look like {{\"min\": 1, \"max\": 5}}")
+        low, high = (None if bounds.get(b) is None else query_number(bounds[b], name) for b in ('min', 'max'))
+        predicates.append(RangePredicate(name, low, high))
+
+    sort = body.get('sort') or {}
+    if isinstance(sort, str):
+        sort = {'by': sort}
+    sort = query_object(sort, 'sort')
+    sort_by = sort.get('by')
+    if sort_by is not None:
+        if not isinstance(sort_by, str):
+            raise ValueError('sort.by must be a column name')
+        sort_by = SORT_COLUMNS.get(sort_by, sort_by)
+        if sort_by not in NUMERIC_COLUMNS:
+            raise ValueError(f"Cannot sort by '{sort['by']}' (use {', '.join(SORT_COLUMNS)} or a numeric column)")
+    order = sort.get('order', 'asc')
+    if order not in ('asc', 'desc'):
+        raise ValueError("sort.order must be 'asc' or 'desc'")
+
+    fields = body.get('fields')
+    if fields is not None and (not isinstance(fields, list) or not all(isinstance(f, str) for f in fields)):
+        raise ValueError('fields must be a list of field names')
+
+    offset = body.get('offset', 0)
+    limit = body.get('limit', 100)
+    # bool is a subclass of int, so true/false must be rejected explicitly
+    if (not isinstance(offset, int) or not isinstance(limit, int) or isinstance(offset, bool)
+            or isinstance(limit, bool) or offset < 0 or limit < 1):
+        raise ValueError('offset must be a non-negative integer and limit a positive one')
+
+    return {
+        'predicates': predicates,
+        'sort_by': sort_by,
+        'descending': order == 'desc',
+        'fields': fields,
+        'offset': offset,
+        'limit': min(limit, QUERY_MAX_LIMIT),
+    }
+
+def plan_query(predicates, sort_by=None, descending=False):
+    """
+    Resolve predicates to ordered catalog positions, returning (positions, steps).
+    Every indexed predicate is costed with an exact count from its index; the
+    cheapest seeds the candidate set and the others are applied as vectorized
+    masks, most selective first. Text terms run last: probed per record when
+    candidates are a small share of the catalog, otherwise by one blob scan
+    intersected with them.
+    """
+    columns = STORE.columns
+    steps = []
+
+    def timed(step, run):
+        started = time.perf_counter()
+        result = run()
+        step.update(rows=len(result), ms=round((time.perf_counter() - started) * 1000, 3))
+        steps.append(step)
+        check_deadline(step['step'])
+        return result
+
+    indexed = sorted(((p.estimate(columns), p) for p in predicates if p.indexed), key=lambda e: e[0])
+    text = [p for p in predicates if not p.indexed]
+    if indexed:
+        estimate, seed = indexed.pop(0)
+        candidates = timed({'step': 'index', 'predicate': seed.describe(), 'estimated': estimate},
+                           lambda: seed.lookup(columns))
+    elif text:
+        charge_scan(columns.size)
+        seed = text.pop(0)
+        candidates = timed({'step': 'scan', 'predicate': seed.describe(), 'estimated': columns.size},
+                           lambda: seed.lookup(columns))
+    else:
+        candidates = timed({'step': 'all', 'estimated': columns.size}, lambda: columns.live_positions())
+    if predicates and columns.live is not None:
+        candidates = timed({'step': 'live', 'estimated': len(candidates)}, lambda: columns.live_positions(candidates))
+
+    for estimate, predicate in indexed:
+        candidates = timed({'step': 'filter', 'predicate': predicate.describe(), 'estimated': estimate},
+                           lambda: predicate.apply(columns, candidates))
+    for predicate in text:
+        method = 'probe' if predicate.probes(columns, candidates) else 'scan'
+        if method == 'scan':
+            charge_scan(columns.size)
+        candidates = timed({'step': 'text', 'predicate': predicate.describe(), 'method': method},
+                           lambda: predicate.apply(columns, candidates))
+
+    if sort_by:
+        def sort():
+            values = columns[sort_by][candidates].astype(np.float64)
+            return candidates[np.argsort(-values if descending else values, kind='stable')]
+        candidates = timed({'step': 'sort', 'by': sort_by, 'order': 'desc' if descending else 'asc'}, sort)
+    return candidates, steps
+
+def project(supplier, fields):
+    return supplier if fields is None else {f: supplier[f] for f in fields if f in supplier}
+
+@app.route('/api/suppliers/query', methods=['POST'])
+def query_suppliers():
+    """
+    Structured query: text terms, equality filters, ranges, sort and projection
+    Request body: {"text": "steel" | ["steel", "dallas"], "where": {"state": "Texas", "inStock": true},
+                   "range": {"rating": {"min": 4}, "leadTimeMaxDays": {"max": 14}},
+                   "sort": {"by": "rating", "order": "desc"}, "fields": ["id", "name"],
+                   "offset": 0, "limit": 100}
+    Query params: explain=true adds the chosen plan with per-step timings (never cached)
+    """
+    try:
+        body = request.get_json() or {}
+        explain = request.args.get('explain', '').lower() in ('1', 'true', 'yes')
+        query = parse_query(body)
+
+        def compute():
+            started = time.perf_counter()
+            positions, steps = plan_query(query['predicates'], query['sort_by'], query['descending'])
+            page = positions[query['offset']:query['offset'] + query['limit']]
+            fetch_started = time.perf_counter()
+            if query['fields'] is None:
+                results = STORE.records.encoded(page)
+            else:
+                records = STORE.records
+                results = [project(records[p], query['fields']) for p in page.tolist()]
+            payload = {
+                'success': True,
+                'results': results,
+                'count': len(results),
+                'total': len(positions),
+                'offset': query['offset']
+            }
+            if explain:
+                steps.append({'step': 'fetch', 'rows': len(results),
+                              'ms': round((time.perf_counter() - fetch_started) * 1000, 3)})
+                payload['plan'] = {'steps': steps, 'ms': round((time.perf_counter() - started) * 1000, 3)}
+            return payload, 200
+
+        if explain:
+            payload, status = compute()
+            return jsonify(payload), status
+        return cached_json('query', body, compute)
+    except DeadlineExceeded as e:
+        return timeout_response(e)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+# ==================== FUZZY SEARCH ====================
+
+FUZZY_WORD = re.compile(r'[a-z0-9]+')
+FUZZY_FIELDS = (0, 3)  # name and category within a search_text() row
+
+def fuzzy_words(text):
+    return set(FUZZY_WORD.findall(text.lower()))
+
+def trigrams(word):
+    padded = f"${word}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def max_edits(word):
+    """Typos tolerated for a query word: none up to 3 letters, one up to 5, then two"""
+    return 0 if len(word) <= 3 else 1 if len(word) <= 5 else 2
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance (a transposition counts as one edit), capped at limit + 1"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+class FuzzyIndex:
+    """
+    Typo-tolerant word index over supplier names and categories.
+
+    At load, every distinct word gets a posting list of catalog positions,
+    and every word is indexed by its padded trigrams. A query word only
+    computes edit distances against vocabulary words that share enough
+    trigrams with it and have a compatible length, so a lookup touches a
+    handful of words rather than every name. Records match when each query
+    word is within max_edits of one of their words; they rank by total
+    distance, then rating.
+
+    The postings cover the snapshot; records changed or appended since are
+    checked directly, as in STORE.search.
+    """
+    def __init__(self):
+        self.snapshot = None
+        self.words = []
+        self.lookup = {}
+        self.postings = None
+        self.starts = None
+        self.gram_words = None
+        self.gram_starts = None
+        self.grams = {}
+        self.lock = threading.Lock()
+
+    def build(self):
+        snapshot = STORE.snapshot
+        started = time.perf_counter()
+        offsets = snapshot.arrays['text:offsets']
+        start = snapshot.base + snapshot.layout['text:blob']['offset']
+        rows = bytes(snapshot.buffer[start:start + int(offsets[-1])]).decode().split('\x1e')
+        lookup = {}
+        word_ids, positions = [], []
+        for position in range(snapshot.size):
+            fields = rows[position].split('\x1f')
+            for word in set(FUZZY_WORD.findall(fields[0])) | set(FUZZY_WORD.findall(fields[3])):
+                word_ids.append(lookup.setdefault(word, len(lookup)))
+                positions.append(position)
+        del rows
+        word_ids = np.array(word_ids, dtype=np.int32)
+        order = np.argsort(word_ids, kind='stable')
+        self.postings = np.array(positions, dtype=np.int64)[order]
+        self.starts = np.searchsorted(word_ids[order], np.arange(len(lookup) + 1))
+        self.words = list(lookup)
+        self.lookup = lookup
+
+        grams = {}
+        gram_ids, gram_words = [], []
+        for word_id, word in enumerate(self.words):
+            for gram in trigrams(word):
+                gram_ids.append(grams.setdefault(gram, len(grams)))
+                gram_words.append(word_id)
+        gram_ids = np.array(gram_ids, dtype=np.int32)
+        order = np.argsort(gram_ids, kind='stable')
+        self.gram_words = np.array(gram_words, dtype=np.int32)[order]
+        self.gram_starts = np.searchsorted(gram_ids[order], np.arange(len(grams) + 1))
+        self.grams = grams
+        self.snapshot = snapshot
+        print(f"[OK] Fuzzy index ready: {len(self.words)} words, {len(grams)} trigrams "
+              f"in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    def ensure_built(self):
+        with self.lock:
+            if self.snapshot is not STORE.snapshot:
+                self.build()
+
+    def similar(self, word, limit, deadline):
+        """
+        [(distance, vocabulary word)] within limit edits, nearest first, plus
+        whether the deadline cut verification short
+        """
+        exact = [(0, word)] if word in self.lookup else []
+        if limit == 0:
+            return exact, False
+        ids = [self.grams[g] for g in trigrams(word) if g in self.grams]
+        if not ids:
+            return exact, False
+        hits = np.concatenate([self.gram_words[self.gram_starts[g]:self.gram_starts[g + 1]] for g in ids])
+        candidates, shared = np.unique(hits, return_counts=True)
+        # Each edit changes at most four trigrams (a transposition); the rest must survive
+        keep = shared >= max(len(word) - 4 * limit, 1)
+        candidates, shared = candidates[keep], shared[keep]
+        candidates = candidates[np.argsort(-shared, kind='stable')][:FUZZY_MAX_CANDIDATES]
+        matches = []
+        truncated = False
+        for word_id in candidates.tolist():
+            if time.perf_counter() > deadline:
+                truncated = True
+                break
+            other = self.words[word_id]
+            if other != word:
+                distance = edit_distance(word, other, limit)
+                if distance <= limit:
+                    matches.append((distance, other))
+        matches.sort()
+        return exact + matches[:FUZZY_MAX_EXPANSIONS], truncated
+
+    def search(self, query, limit, max_distance=2, budget_ms=FUZZY_BUDGET_MS):
+        """
+        Best matching positions for query as (positions, distances, corrections,
+        truncated); corrections maps each query word to the words it matched
+        """
+        self.ensure_built()
+        deadline = time.perf_counter() + budget_ms / 1000
+        query_words = sorted(fuzzy_words(query))[:FUZZY_MAX_TERMS]
+        empty = np.empty(0, dtype=np.int64)
+        if not query_words:
+            return empty, empty, {}, False
+
+        columns = STORE.columns
+        skip, overlay = STORE._text_sources()
+        skip = np.fromiter(skip, dtype=np.int64, count=len(skip))
+        corrections = {}
+        truncated = False
+        positions = distances = None
+        for word in query_words:
+            edits = min(max_edits(word), max_distance)
+            similar, cut = self.similar(word, edits, deadline)
+            truncated |= cut
+            corrections[word] = [w for _, w in similar]
+            if not similar:
+                positions = distances = None
+                break
+            # Best distance per position for this query word
+            chunks = [(self.postings[self.starts[self.lookup[w]]:self.starts[self.lookup[w] + 1]], d) for d, w in similar]
+            found = np.concatenate([p for p, _ in chunks])
+            found_distance = np.concatenate([np.full(len(p), d, dtype=np.int64) for p, d in chunks])
+            order = np.lexsort((found_distance, found))
+            found, found_distance = found[order], found_distance[order]
+            first = np.concatenate(([True], found[1:] != found[:-1]))
+            found, found_distance = found[first], found_distance[first]
+            if positions is None:
+                positions, distances = found, found_distance
+            else:
+                common, left, right = np.intersect1d(positions, found, assume_unique=True, return_indices=True)
+                positions, distances = common, distances[left] + found_distance[right]
+            if not len(positions):
+                break
+        if positions is None:
+            positions = distances = empty
+        if len(skip) and len(positions):
+            keep = ~np.isin(positions, skip)
+            positions, distances = positions[keep], distances[keep]
+
+        # Records changed or appended since the snapshot are matched directly
+        extra = []
+        for position, supplier in overlay.items():
+            words = fuzzy_words(f"{supplier.get('name') or ''} {supplier.get('category') or ''}")
+            total = 0
+            for word in query_words:
+                edits = min(max_edits(word), max_distance)
+                best = min((edit_distance(word, w, edits) for w in words), default=edits + 1)
+                if best > edits:
+                    break
+                total += best
+            else:
+                extra.append((position, total))
+        if extra:
+            positions = np.concatenate((positions, np.array([p for p, _ in extra], dtype=np.int64)))
+            distances = np.concatenate((distances, np.array([d for _, d in extra], dtype=np.int64)))
+
+        order = np.lexsort((positions, -columns['rating'][positions], distances))[:limit]
+        return positions[order], distances[order], corrections, truncated
+
+FUZZY_INDEX = FuzzyIndex()
+
+# ==================== AUTOCOMPLETE ====================
+
+SUGGEST_KINDS = ('name', 'category', 'product', 'city')
+SUGGEST_KEY_BYTES = 24
+SUGGEST_WORD_STARTS = 4
+SUGGEST_MAX = 20
+SUGGEST_SCAN_KEYS = 2048
+WORD_START = re.compile(r'(?:^|(?<=[^a-z0-9]))[a-z0-9]')
+
+def supplier_city(supplier):
+    """City from a "street, city, state zip" location, or None"""
+    parts = [p.strip() for p in (supplier.get('location') or '').split(',')]
+    return parts[-2] if len(parts) >= 3 and parts[-2] else None
+
+def popularity(supplier):
+    """Rating weighted by the log of the review count, so a few 5-star reviews don't win"""
+    return (supplier.get('rating') or 0) * math.log1p(supplier.get('reviews') or 0)
+
+class SuggestIndex:
+    """
+    Prefix index for typeahead over supplier names, categories, products
+    and cities. Each distinct term is keyed from each of its first few word
+    starts ("Lumber & Wood" under "lumber & wood" and "wood"), the keys kept
+    as one sorted fixed-width byte array, so a prefix is a binary-searched
+    range. Terms rank by the popularity of their best supplier (rating x
+    log reviews), then supplier count. Prefixes covering more than
+    SUGGEST_SCAN_KEYS keys - the trie nodes near the root - have their best
+    terms of each kind precomputed, so no request ranks a wide range.
+
+    Built from the snapshot at load; deleted suppliers' names are dropped
+    at query time, other changes show up after the next reload.
+    """
+    def __init__(self):
+        self.snapshot = None
+        self.texts = []
+        self.kinds = None
+        self.counts = None
+        self.positions = None
+        self.rank = None
+        self.order = None
+        self.keys = None
+        self.key_terms = None
+        self.wide = {}
+        self.lock = threading.Lock()
+
+    def build(self):
+        snapshot = STORE.snapshot
+        started = time.perf_counter()
+        terms = {}
+        for position in range(snapshot.size):
+            supplier = json.loads(snapshot.blob('records', position))
+            score = popularity(supplier)
+            values = [('name', supplier.get('name')), ('category', supplier.get('category')),
+                      ('city', supplier_city(supplier))]
+            values += [('product', p) for p in supplier.get('products') or []]
+            for kind, text in values:
+                if not isinstance(text, str) or not text.strip():
+                    continue
+                entry = terms.get((kind, text))
+                if entry is None:
+                    terms[(kind, text)] = [score, 1, position]
+                else:
+                    entry[0] = max(entry[0], score)
+                    entry[1] += 1
+                    entry[2] = -1
+
+        self.texts = [text for _, text in terms]
+        self.kinds = np.array([SUGGEST_KINDS.index(kind) for kind, _ in terms], dtype=np.int8)
+        values = np.array(list(terms.values()), dtype=np.float64).reshape(-1, 3)
+        self.counts, self.positions = values[:, 1].astype(np.int64), values[:, 2].astype(np.int64)
+        # One total order (score, then count, then first seen) so top-k never depends on tie breaking
+        order = np.lexsort((np.arange(len(values)), -self.counts, -values[:, 0]))
+        self.order = order
+        self.rank = np.empty(len(order), dtype=np.int64)
+        self.rank[order] = np.arange(len(order))
+
+        keys, key_terms = [], []
+        for term_id, text in enumerate(self.texts):
+            lowered = text.lower()
+            for match in list(WORD_START.finditer(lowered))[:SUGGEST_WORD_STARTS]:
+                keys.append(lowered[match.start():].encode()[:SUGGEST_KEY_BYTES])
+                key_terms.append(term_id)
+        keys = np.array(keys, dtype=f'S{SUGGEST_KEY_BYTES}')
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.key_terms = np.array(key_terms, dtype=np.int64)[order]
+
+        # Walk down from one-byte prefixes while a range is still too wide to rank per request
+        self.wide = {}
+        pending, length = [(0, len(self.keys))], 1
+        while pending and length <= SUGGEST_KEY_BYTES:
+            deeper = []
+            for start, end in pending:
+                heads = self.keys[start:end].astype(f'S{length}')
+                bounds = (np.flatnonzero(heads[1:] != heads[:-1]) + 1 + start).tolist()
+                for low, high in zip([start] + bounds, bounds + [end]):
+                    if high - low > SUGGEST_SCAN_KEYS:
+                        ranked = self._best(self.key_terms[low:high])
+                        self.wide[bytes(heads[low - start])] = [
+                            ranked[self.kinds[ranked] == kind][:SUGGEST_MAX * 4] for kind in range(len(SUGGEST_KINDS))]
+                        deeper.append((low, high))
+            pending, length = deeper, length + 1
+        self.snapshot = snapshot
+        print(f"[OK] Suggest index ready: {len(self.texts)} terms, {len(self.keys)} keys, "
+              f"{len(self.wide)} wide prefixes in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    def ensure_built(self):
+        with self.lock:
+            if self.snapshot is not STORE.snapshot:
+                self.build()
+
+    def _best(self, term_ids, kinds=None, limit=None):
+        """Distinct term ids (of the given kinds), best first, at most limit"""
+        ranks = np.sort(self.rank[term_ids])
+        first = np.ones(len(ranks), dtype=bool)
+        first[1:] = ranks[1:] != ranks[:-1]
+        term_ids = self.order[ranks[first]]
+        if kinds is not None:
+            term_ids = term_ids[np.isin(self.kinds[term_ids], kinds)]
+        return term_ids[:limit]
+
+    def suggest(self, prefix, limit, kinds=None):
+        """[{"text", "type", "suppliers"}] for terms with a word starting with prefix"""
+        self.ensure_built()
+        prefix = ' '.join(prefix.lower().split())
+        needle = prefix.encode()[:SUGGEST_KEY_BYTES]
+        if not needle:
+            return []
+        live = STORE.columns.live
+        wanted = list(range(len(SUGGEST_KINDS))) if kinds is None else [SUGGEST_KINDS.index(k) for k in kinds]
+        wide = self.wide.get(needle)
+        for exhaustive in (False, True):
+            if wide is not None and not exhaustive:
+                candidates = np.concatenate([wide[kind] for kind in wanted])
+                candidates = candidates[np.argsort(self.rank[candidates])]
+                cut = any(len(wide[kind]) == SUGGEST_MAX * 4 for kind in wanted)
+            else:
+                low = np.searchsorted(self.keys, needle, 'left')
+                high = np.searchsorted(self.keys, needle + b'\xff', 'left')
+                candidates = self._best(self.key_terms[low:high], wanted, None if exhaustive else limit * 4)
+                cut = not exhaustive and len(candidates) == limit * 4
+            if live is not None:
+                positions = self.positions[candidates]
+                candidates = candidates[(positions < 0) | live[np.maximum(positions, 0)]]
+            # The same text as several kinds ("Concrete & Cement" category and product) is shown once
+            results, seen = [], set()
+            for term_id in candidates.tolist():
+                lowered = self.texts[term_id].lower()
+                if lowered in seen:
+                    continue
+                if len(prefix.encode()) > SUGGEST_KEY_BYTES and not any(
+                        lowered.startswith(prefix, m.start()) for m in WORD_START.finditer(lowered)):
+                    continue
+                seen.add(lowered)
+                results.append(term_id)
+                if len(results) == limit:
+                    break
+            # Deletions or duplicates can empty a cut-off candidate list; rank the whole range then
+            if len(results) == limit or not cut:
+                break
+        return [{'text': self.texts[t], 'type': SUGGEST_KINDS[self.kinds[t]], 'suppliers': int(self.counts[t])}
+                for t in results]
+
+SUGGEST_INDEX = SuggestIndex()
+
+@app.route('/api/suppliers/suggest', methods=['GET'])
+def suggest_suppliers():
+    """
+    Typeahead suggestions for a prefix, most popular first
+    Query params: q (prefix), limit=8 (max 20), types=name,category,product,city
+    """
+    try:
+        limit = max(1, min(request.args.get('limit', 8, type=int), SUGGEST_MAX))
+        kinds = None
+        if request.args.get('types'):
+            kinds = request.args['types'].split(',')
+            unknown = [k for k in kinds if k not in SUGGEST_KINDS]
+            if unknown:
+                raise ValueError(f"Unknown type {', '.join(unknown)} (use {', '.join(SUGGEST_KINDS)})")
+        return jsonify({
+            'success': True,
+            'suggestions': SUGGEST_INDEX.suggest(request.args.get('q', ''), limit, kinds)
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+# ==================== GEO SEARCH ====================
+
+GEO_FIELDS = ('location', 'state', 'region', 'category')
+
+class KDTree:
+    """
+    Static 3-d tree over unit-sphere points, stored as flat arrays so it can
+    live in a dataset snapshot. Leaves are contiguous runs of points scanned
+    with NumPy. Straight-line distance between unit vectors orders the same
+    way as great-circle distance, so plain euclidean pruning is exact.
+    """
+    LEAF_SIZE = 16
+    PARTS = ('points', 'positions', 'axis', 'split', 'children', 'spans')
+
+    def __init__(self, points, positions, axis, split, children, spans):
+        self.points = points
+        self.positions = positions
+        self.axis = axis
+        self.split = split
+        self.children = children
+        self.spans = spans
+
+    @classmethod
+    def build(cls, points, positions):
+        """Build from an (n, 3) array of unit vectors and their catalog positions"""
+        order = np.arange(len(points))
+        nodes = []
+
+        def build_node(start, stop):
+            index = len(nodes)
+            nodes.append(None)
+            if stop - start <= cls.LEAF_SIZE:
+                nodes[index] = (-1, 0.0, -1, -1, start, stop)
+                return index
+            chunk = order[start:stop]
+            spread = points[chunk].max(axis=0) - points[chunk].min(axis=0)
+            axis = int(np.argmax(spread))
+            order[start:stop] = chunk[np.argsort(points[chunk, axis], kind='stable')]
+            mid = (start + stop) // 2
+            split = float(points[order[mid], axis])
+            left = build_node(start, mid)
+            right = build_node(mid, stop)
+            nodes[index] = (axis, split, left, right, start, stop)
+            return index
+
+        build_node(0, len(points))
+        return cls(
+            np.ascontiguousarray(points[order]),
+            np.asarray(positions, dtype=np.int64)[order],
+            np.array([n[0] for n in nodes], dtype=np.int8),
+            np.array([n[1] for n in nodes], dtype=np.float64),
+            np.array([n[2:4] for n in nodes], dtype=np.int32).reshape(-1, 2),
+            np.array([n[4:6] for n in nodes], dtype=np.int64).reshape(-1, 2),
+        )
+
+    def arrays(self, prefix):
+        return {prefix + part: getattr(self, part) for part in self.PARTS}
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix):
+        return cls(*(arrays[prefix + part] for part in cls.PARTS))
+
+    def nearest(self, target, k, max_dist2=float('inf')):
+        """Return up to k (dist2, position) pairs closest to target, nearest first"""
+        heap = []
+        target_array = np.asarray(target)
+
+        def visit(node):
+            axis = int(self.axis[node])
+            if axis < 0:
+                start, stop = self.spans[node]
+                d2 = ((self.points[start:stop] - target_array) ** 2).sum(axis=1)
+                for i in np.flatnonzero(d2 <= max_dist2).tolist():
+                    if len(heap) < k:
+                        heapq.heappush(heap, (-d2[i], start + i))
+                    elif d2[i] < -heap[0][0]:
+                        heapq.heapreplace(heap, (-d2[i], start + i))
+                return
+            delta = target[axis] - self.split[node]
+            left, right = self.children[node]
+            near, far = (left, right) if delta < 0 else (right, left)
+            visit(near)
+            worst = -heap[0][0] if len(heap) == k else max_dist2
+            if delta * delta <= worst:
+                visit(far)
+
+        if k > 0 and len(self.points):
+            visit(0)
+        return sorted((float(-d2), int(self.positions[i])) for d2, i in heap)
+
+def build_geo_trees(lat, lon, category_codes, live=None):
+    """One KD-tree for every located supplier (key None) plus one per category code"""
+    located = ~np.isnan(lat) & ~np.isnan(lon)
+    located = np.flatnonzero(located if live is None else located & live)
+    phi, lam = np.radians(lat[located]), np.radians(lon[located])
+    points = np.column_stack((np.cos(phi) * np.cos(lam), np.cos(phi) * np.sin(lam), np.sin(phi)))
+    trees = {None: KDTree.build(points, located)}
+    codes = category_codes[located]
+    for code in np.unique(codes).tolist():
+        members = np.flatnonzero(codes == code)
+        trees[code] = KDTree.build(points[members], located[members])
+    return trees
+
+class GeoIndex:
+    """
+    Supplier coordinates indexed in one KD-tree for the whole catalog plus one
+    per category, so category-filtered nearest queries stay logarithmic.
+    The trees come prebuilt in the dataset snapshot; they are rebuilt locally
+    only after a change touching location, state, region or category.
+    """
+    def __init__(self):
+        self.trees = {}
+        self.dirty = True
+        self.lock = threading.Lock()
+
+    def on_change(self, old, new, version):
+        if old is None or new is None or any(old.get(f) != new.get(f) for f in GEO_FIELDS):
+            self.dirty = True
+
+    def build(self):
+        columns = STORE.columns
+        snapshot = STORE.snapshot
+        if columns.live is None and all(columns.is_shared(name) for name in ('lat', 'lon', 'category')):
+            self.trees = {
+                None if key == 'all' else int(key): KDTree.from_arrays(snapshot.arrays, f"geo:{key}:")
+                for key in snapshot.meta['geo']
+            }
+        else:
+            self.trees = build_geo_trees(columns['lat'], columns['lon'], columns.codes['category'], columns.live)
+        print(f"[OK] Geo index ready: {len(self.trees[None].points)} of {columns.size} suppliers located")
+
+    def ensure_built(self):
+        with self.lock:
+            if self.dirty:
+                self.dirty = False
+                self.build()
+
+    def nearby(self, lat, lon, k, radius_miles=None, category=None):
+        """Return [(distance_miles, position)] nearest first"""
+        self.ensure_built()
+        columns = STORE.columns
+        tree = self.trees.get(columns.code('category', category) if category else None)
+        if tree is None:
+            return []
+        max_dist2 = miles_to_chord(radius_miles) ** 2 if radius_miles is not None else float('inf')
+        results = []
+        for _, position in tree.nearest(to_unit_vector(lat, lon), k, max_dist2):
+            s_lat, s_lon = float(columns['lat'][position]), float(columns['lon'][position])
+            results.append((haversine_miles(lat, lon, s_lat, s_lon), position))
+        return results
+
+GEO_INDEX = GeoIndex()
+STORE.listeners.append(GEO_INDEX.on_change)
+
+@app.route('/api/suppliers/nearby', methods=['GET'])
+def nearby_suppliers():
+    """
+    Nearest suppliers to a point
+    Query params: lat & lon, or city & state (or state alone),
+                  k=10 (max 500), radius=<miles>, category
+    """
+    try:
+        lat = request.args.get('lat', type=float)
+        lon = request.args.get('lon', type=float)
+        if lat is not None and lon is not None:
+            if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+                raise ValueError('lat must be within [-90, 90] and lon within [-180, 180]')
+            origin = (lat, lon, 'exact')
+        else:
+            origin = geocode(request.args.get('city'), request.args.get('state'))
+        if not origin:
+            return jsonify({
+                'success': False,
+                'error': 'Provide lat and lon, or a known city and state'
+            }), 400
+
+        k = max(1, min(request.args.get('k', 10, type=int), 500))
+        radius = request.args.get('radius', type=float)
+        if radius is not None and not 0 < radius < math.inf:
+            raise ValueError('radius must be a positive number of miles')
+        category = request.args.get('category') or None
+
+        results = []
+        records = STORE.records
+        for distance, position in GEO_INDEX.nearby(origin[0], origin[1], k, radius, category):
+            results.append({**records[position], 'distanceMiles': round(distance, 1)})
+
+        return jsonify({
+            'success': True,
+            'origin': {'lat': origin[0], 'lon': origin[1], 'precision': origin[2]},
+            'results': results,
+            'count': len(results)
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+# ==================== RANKING ====================
+
+RANKING_FEATURES = ('rating', 'reviews', 'leadTime', 'stockLevel', 'certifications', 'walmartVerified')
+
+RANKING_PROFILES = {
+    'balanced': {'rating': 3, 'reviews': 1, 'leadTime': 2, 'stockLevel': 1, 'certifications': 1, 'walmartVerified': 2},
+    'quality': {'rating': 5, 'reviews': 2, 'certifications': 2, 'walmartVerified': 2},
+    'fastest': {'leadTime': 5, 'stockLevel': 2, 'rating': 1},
+    'availability': {'stockLevel': 5, 'leadTime': 2, 'rating': 1},
+}
+RANKING_PROFILES.update(json.loads(os.environ.get('RANKING_PROFILES', '{}')))
+
+RANK_GROUP_FIELDS = ('category', 'region')
+
+def minmax(values):
+    values = values.astype(np.float64)
+    low, high = np.nanmin(values, initial=np.inf), np.nanmax(values, initial=-np.inf)
+    if not np.isfinite(low) or high <= low:
+        return np.zeros_like(values)
+    return np.nan_to_num((values - low) / (high - low))
+
+def ranking_features(columns):
+    """Every ranking feature scaled to 0..1, higher is better"""
+    lead = columns['leadTimeMaxDays']
+    return {
+        'rating': minmax(columns['rating']),
+        'reviews': minmax(np.log1p(columns['reviews'])),
+        'leadTime': 1.0 - minmax(np.where(np.isnan(lead), np.nanmax(lead, initial=0), lead)),
+        'stockLevel': minmax(np.log1p(np.maximum(columns['stockLevel'], 0))),
+        'certifications': minmax(columns['certifications']),
+        'walmartVerified': columns['walmartVerified'].astype(np.float64),
+    }
+
+def parse_weights(text):
+    """Parse "rating:3,leadTime:2" into a weights dict"""
+    weights = {}
+    for part in text.split(','):
+        name, _, value = part.partition(':')
+        name = name.strip()
+        if name not in RANKING_FEATURES:
+            raise ValueError(f"Unknown ranking feature '{name}' (use {', '.join(RANKING_FEATURES)})")
+        try:
+            weight = float(value or 1)
+        except ValueError:
+            weight = math.nan
+        # nan/inf would poison every score
+        if not math.isfinite(weight):
+            raise ValueError(f"Weight for '{name}' must be a finite number, got {value.strip()!r}")
+        weights[name] = weight
+    return weights
+
+class RankingEngine:
+    """
+    Composite supplier scores computed over the columnar store in one pass
+    per weight profile, with the top RANK_CACHE_DEPTH positions for every
+    category and region cached. Everything is recomputed when the store
+    version moves; requests within the cached depth are just a slice.
+    """
+    MAX_CUSTOM_PROFILES = 32
+
+    def __init__(self, depth=RANK_CACHE_DEPTH):
+        self.depth = depth
+        self.version = None
+        self.features = None
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _compute(self, weights):
+        total = sum(weights.values()) or 1.0
+        scores = np.zeros(STORE.columns.size)
+        for name, weight in weights.items():
+            scores += weight * self.features[name]
+        scores *= 100.0 / total
+        if STORE.columns.live is not None:
+            scores[~STORE.columns.live] = -np.inf
+
+        top = {None: np.argsort(-scores, kind='stable')[:self.depth]}
+        for field in RANK_GROUP_FIELDS:
+            codes = STORE.columns.codes[field]
+            order = np.lexsort((-scores, codes))
+            grouped = codes[order]
+            bounds = np.flatnonzero(np.diff(grouped)) + 1
+            for chunk in np.split(order, bounds):
+                if len(chunk):
+                    top[(field, int(codes[chunk[0]]))] = chunk[:self.depth]
+        return {'scores': scores, 'top': top}
+
+    def warm(self):
+        """Recompute features and the named profiles for the current store version"""
+        with self.lock:
+            self._refresh()
+            for weights in RANKING_PROFILES.values():
+                self._entry(weights)
+
+    def _refresh(self):
+        if self.version != STORE.version:
+            self.features = ranking_features(STORE.columns)
+            self.cache.clear()
+            self.version = STORE.version
+
+    def _entry(self, weights):
+        key = tuple(sorted(weights.items()))
+        entry = self.cache.get(key)
+        if entry is None:
+            entry = self.cache[key] = self._compute(weights)
+            if len(self.cache) > len(RANKING_PROFILES) + self.MAX_CUSTOM_PROFILES:
+                self.cache.popitem(last=False)
+        self.cache.move_to_end(key)
+        return entry
+
+    def top(self, weights, limit, category=None, region=None):
+        """Return [(score, position)] best first"""
+        with self.lock:
+            self._refresh()
+            entry = self._entry(weights)
+        scores = entry['scores']
+        columns = STORE.columns
+
+        groups = [(f, v) for f, v in (('category', category), ('region', region)) if v]
+        if len(groups) <= 1 and limit <= self.depth:
+            key = None
+            if groups:
+                field, value = groups[0]
+                key = (field, columns.code(field, value))
+            positions = entry['top'].get(key, np.empty(0, dtype=np.int64))
+            positions = columns.live_positions(positions)[:limit]
+        else:
+            mask = np.ones(columns.size, dtype=bool) if columns.live is None else columns.live.copy()
+            for field, value in groups:
+                mask &= columns.codes[field] == columns.code(field, value)
+            candidates = np.flatnonzero(mask)
+            if len(candidates) > limit:
+                candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+            positions = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return [(float(scores[p]), int(p)) for p in positions]
+
+RANKER = RankingEngine()
+
+@app.route('/api/suppliers/ranked', methods=['GET'])
+def ranked_suppliers():
+    """
+    Top suppliers by composite score
+    Query params: profile=balanced, weights=rating:3,leadTime:2 (overrides profile),
+                  category, region, limit=20
+    """
+    try:
+        profile = request.args.get('profile', 'balanced')
+        if request.args.get('weights'):
+            profile = 'custom'
+            weights = parse_weights(request.args['weights'])
+        elif profile in RANKING_PROFILES:
+            weights = RANKING_PROFILES[profile]
+        else:
+            return jsonify({
+                'success': False,
+                'error': f"Unknown profile '{profile}' (use {', '.join(RANKING_PROFILES)})"
+            }), 400
+
+        limit = max(1, min(request.args.get('limit', 20, type=int), 1000))
+        ranked = RANKER.top(weights, limit, request.args.get('category'), request.args.get('region'))
+        records = STORE.records
+
+        return jsonify({
+            'success': True,
+            'profile': profile,
+            'weights': weights,
+            'results': [{**records[p], 'rankScore': round(score, 2)} for score, p in ranked],
+            'count': len(ranked),
+            'version': STORE.version
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+# ==================== STOCK ANALYTICS ====================
+
+STOCK_PERCENTILES = (10, 25, 50, 75, 90, 99)
+STOCK_BUCKETS = ('day', 'week', 'month')
+
+def group_percentiles(codes, values, groups, percentiles):
+    """
+    Percentiles of values within each code group from one lexsort, using
+    the same linear interpolation as np.percentile. Returns
+    {q: array of length groups}; empty groups are NaN.
+    """
+    order = np.lexsort((values, codes))
+    ordered = values[order].astype(np.float64)
+    counts = np.bincount(codes, minlength=groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    present = counts > 0
+    result = {}
+    for q in percentiles:
+        rank = np.where(present, (counts - 1) * q / 100, 0)
+        low = np.floor(rank).astype(np.int64)
+        high = np.ceil(rank).astype(np.int64)
+        below = ordered[np.where(present, starts + low, 0)] if len(ordered) else np.zeros(groups)
+        above = ordered[np.where(present, starts + high, 0)] if len(ordered) else np.zeros(groups)
+        result[q] = np.where(present, below + (above - below) * (rank - low), np.nan)
+    return result
+
+def rounded(value, digits=2):
+    return None if value is None or np.isnan(value) else round(float(value), digits)
+
+def stock_totals(stock, in_stock, low):
+    count = len(stock)
+    percentiles = np.percentile(stock, STOCK_PERCENTILES) if count else [np.nan] * len(STOCK_PERCENTILES)
+    return {
+        'suppliers': count,
+        'inStock': int(in_stock.sum()),
+        'outOfStock': int(count - in_stock.sum()),
+        'availability': rounded(in_stock.mean(), 4) if count else None,
+        'lowStock': int(low.sum()),
+        'stockTotal': int(stock.sum()),
+        'stockMean': rounded(stock.mean()) if count else None,
+        'percentiles': {f"p{q}": rounded(v) for q, v in zip(STOCK_PERCENTILES, percentiles)}
+    }
+
+def stock_groups(field, positions, stock, in_stock, low):
+    """Per-value rollups of field via bincount, largest group first"""
+    columns = STORE.columns
+    codes = columns.codes[field][positions]
+    labels = columns.labels[field]
+    groups = len(labels)
+    counts = np.bincount(codes, minlength=groups)
+    available = np.bincount(codes, weights=in_stock, minlength=groups)
+    lows = np.bincount(codes, weights=low, minlength=groups)
+    totals = np.bincount(codes, weights=stock, minlength=groups)
+    percentiles = group_percentiles(codes, stock, groups, (10, 50, 90))
+    rows = []
+    for code in np.flatnonzero(counts).tolist():
+        count = int(counts[code])
+        rows.append({
+            'value': labels[code],
+            'suppliers': count,
+            'inStock': int(available[code]),
+            'availability': round(available[code] / count, 4),
+            'lowStock': int(lows[code]),
+            'stockTotal': int(totals[code]),
+            'stockMean': round(totals[code] / count, 2),
+            'stockP10': rounded(percentiles[10][code]),
+            'stockMedian': rounded(percentiles[50][code]),
+            'stockP90': rounded(percentiles[90][code])
+        })
+    rows.sort(key=lambda r: (-r['suppliers'], str(r['value'])))
+    return rows
+
+def stock_timeline(positions, stock, in_stock, low, bucket, limit):
+    """Rollups by lastStockCheck day, ISO week (Monday start) or month, newest last"""
+    checked = STORE.columns['lastStockCheck'][positions]
+    valid = ~np.isnan(checked)
+    days = np.floor(checked[valid] / 86400).astype(np.int64)
+    if bucket == 'day':
+        keys = days
+    elif bucket == 'week':
+        # 1970-01-01 was a Thursday; shift so buckets start on Monday
+        keys = (days + 3) // 7 * 7 - 3
+    else:
+        keys = days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+    unique, inverse = np.unique(keys, return_inverse=True)
+    counts = np.bincount(inverse, minlength=len(unique))
+    available = np.bincount(inverse, weights=in_stock[valid], minlength=len(unique))
+    lows = np.bincount(inverse, weights=low[valid], minlength=len(unique))
+    totals = np.bincount(inverse, weights=stock[valid], minlength=len(unique))
+    unit = 'M' if bucket == 'month' else 'D'
+    starts = np.array(unique, dtype=f'datetime64[{unit}]').astype('datetime64[D]').astype(str)
+    rows = [{
+        'start': start,
+        'checks': int(count),
+        'inStock': int(avail),
+        'availability': round(avail / count, 4),
+        'lowStock': int(lw),
+        'stockTotal': int(total)
+    } for start, count, avail, lw, total in zip(starts.tolist(), counts, available, lows, totals)]
+    return {'bucket': bucket, 'unchecked': int((~valid).sum()), 'buckets': rows[-limit:]}
+
+@app.route('/api/suppliers/analytics/stock', methods=['GET'])
+def stock_analytics():
+    """
+    Stock rollups over the columnar store
+    Query params: group_by=category,region,state, category, region, state (filters),
+                  low_stock=1000 (stockLevel below this is low), top=10 (lowest-stock suppliers),
+                  bucket=day|week|month, buckets=30 (lastStockCheck timeline)
+    """
+    try:
+        group_by = [f for f in request.args.get('group_by', ','.join(CATEGORICAL_COLUMNS)).split(',') if f]
+        unknown = [f for f in group_by if f not in CATEGORICAL_COLUMNS]
+        if unknown:
+            raise ValueError(f"Cannot group by {', '.join(unknown)} (use {', '.join(CATEGORICAL_COLUMNS)})")
+        filters = {f: request.args[f] for f in CATEGORICAL_COLUMNS if request.args.get(f)}
+        low_stock = request.args.get('low_stock', LOW_STOCK_THRESHOLD, type=int)
+        top = max(0, min(request.args.get('top', 10, type=int), 100))
+        bucket = request.args.get('bucket', 'day')
+        if bucket not in STOCK_BUCKETS:
+            raise ValueError(f"bucket must be one of {', '.join(STOCK_BUCKETS)}")
+        buckets = max(1, min(request.args.get('buckets', 30, type=int), 1000))
+        params = {'group_by': group_by, 'filters': filters, 'low_stock': low_stock,
+                  'top': top, 'bucket': bucket, 'buckets': buckets}
+
+        def compute():
+            columns = STORE.columns
+            if filters:
+                positions, _ = plan_query([EqualsPredicate(f, v) for f, v in filters.items()])
+            else:
+                positions = STORE.live_positions()
+            stock = columns['stockLevel'][positions]
+            in_stock = columns['inStock'][positions]
+            low = stock < low_stock
+
+            lowest = []
+            if top and len(positions):
+                take = min(top, len(positions))
+                candidates = np.argpartition(stock, take - 1)[:take]
+                candidates = candidates[np.lexsort((columns['id'][positions[candidates]], stock[candidates]))]
+                records = STORE.records
+                lowest = [{f: records[p].get(f) for f in ('id', 'name', 'category', 'state', 'stockLevel', 'inStock', 'lastStockCheck')}
+                          for p in positions[candidates].tolist()]
+
+            groups = {}
+            for field in group_by:
+                check_deadline(f"group by {field}")
+                groups[field] = stock_groups(field, positions, stock, in_stock, low)
+            check_deadline('timeline')
+            return {
+                'success': True,
+                'filters': filters,
+                'lowStockThreshold': low_stock,
+                'totals': stock_totals(stock, in_stock, low),
+                'groups': groups,
+                'lowestStock': lowest,
+                'timeline': stock_timeline(positions, stock, in_stock, low, bucket, buckets),
+                'version': STORE.version
+            }, 200
+
+        return cached_json('analytics', params, compute)
+    except DeadlineExceeded as e:
+        return timeout_response(e)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+# ==================== LIVE UPDATES (SSE) ====================
+
+STOCK_FIELDS = ('stockLevel', 'inStock', 'lastStockCheck')
+
+SUBSCRIBERS = set()
+SUBSCRIBERS_LOCK = threading.Lock()
+
+class UpdateSubscriber:
+    """
+    One connected /api/suppliers/stream client.
+    Pending events are coalesced per supplier id, so a slow consumer only ever
+    holds the latest diff for each supplier. If the outbox still grows past
+    max_pending the backlog is dropped and the client is told to resync.
+    """
+    def __init__(self, categories=None, states=None, max_pending=SSE_MAX_PENDING):
+        self.categories = categories
+        self.states = states
+        self.max_pending = max_pending
+        self.pending = OrderedDict()
+        self.overflowed = False
+        self.cond = threading.Condition()
+
+    def matches(self, supplier):
+        if not supplier:
+            return False
+        if self.categories and supplier.get('category') not in self.categories:
+            return False
+        if self.states and supplier.get('state') not in self.states:
+            return False
+        return True
+
+    def offer(self, event):
+        with self.cond:
+            if self.overflowed:
+                return
+            supplier_id = event['id']
+            queued = self.pending.get(supplier_id)
+            if queued is not None and queued['op'] == 'update' and event['op'] == 'update':
+                self.pending[supplier_id] = dict(event, changes={**queued['changes'], **event['changes']})
+            elif queued is not None or len(self.pending) < self.max_pending:
+                self.pending[supplier_id] = event
+            else:
+                self.pending.clear()
+                self.overflowed = True
+            self.cond.notify()
+
+    def drain(self, timeout):
+        """Wait up to timeout seconds, then hand back (events, overflowed)"""
+        with self.cond:
+            if not self.pending and not self.overflowed:
+                self.cond.wait(timeout)
+            events = list(self.pending.values())
+            overflowed = self.overflowed
+            self.pending.clear()
+            self.overflowed = False
+            return events, overflowed
+
+def diff_supplier(old, new):
+    """Return the fields of new that differ from old"""
+    return {k: v for k, v in new.items() if old.get(k) != v}
+
+def publish_supplier_change(old, new, version):
+    """
+    Push a supplier change to every matching stream subscriber.
+    old is None for a created supplier, new is None for a deleted one.
+    """
+    if new is None:
+        event = {'op': 'delete', 'id': old['id'], 'version': version}
+    elif old is None:
+        event = {'op': 'upsert', 'id': new['id'], 'version': version, 'data': new}
+    else:
+        changes = diff_supplier(old, new)
+        if not changes:
+            return
+        event = {'op': 'update', 'id': new['id'], 'version': version, 'changes': changes}
+
+    with SUBSCRIBERS_LOCK:
+        subscribers = list(SUBSCRIBERS)
+    for subscriber in subscribers:
+        if subscriber.matches(old) or subscriber.matches(new):
+            subscriber.offer(event)
+
+STORE.listeners.append(publish_supplier_change)
+
+def format_sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def split_param(name):
+    """Parse a repeated or comma separated query param into a set"""
+    values = set()
+    for raw in request.args.getlist(name):
+        values.update(v.strip() for v in raw.split(',') if v.strip())
+    return values or None
+
+@app.route('/api/suppliers/stream', methods=['GET'])
+def stream_suppliers():
+    """
+    Server-sent events stream of supplier changes
+    Query params: category, state (repeatable or comma separated)
+    Events: supplier (update diff, upsert or delete), resync (client fell behind)
+    """
+    subscriber = UpdateSubscriber(
+        categories=split_param('category'),
+        states=split_param('state')
+    )
+    with SUBSCRIBERS_LOCK:
+        SUBSCRIBERS.add(subscriber)
+    print(f"[SSE] Subscriber connected ({len(SUBSCRIBERS)} active)")
+
+    def generate():
+        try:
+            yield "retry: 3000\n\n"
+            yield format_sse('ready', {'total': STORE.size, 'version': STORE.version})
+            while True:
+                events, overflowed = subscriber.drain(SSE_HEARTBEAT_SECONDS)
+                if overflowed:
+                    yield format_sse('resync', {'reason': 'backlog exceeded'})
+                for event in events:
+                    yield format_sse('supplier', event)
+                if not events and not overflowed:
+                    yield ": keepalive\n\n"
+        finally:
+            with SUBSCRIBERS_LOCK:
+                SUBSCRIBERS.discard(subscriber)
+            print(f"[SSE] Subscriber disconnected ({len(SUBSCRIBERS)} active)")
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/suppliers/<int:supplier_id>/stock', methods=['PATCH'])
+@require_admin
+@require_journal
+def update_supplier_stock(supplier_id):
+    """
+    Update stock fields of a supplier and notify stream subscribers
+    Request body: {"stockLevel": 1200, "inStock": true, "lastStockCheck": "2024-05-01T09:30:00"}
+    """
+    try:
+        data = request.get_json() or {}
+        if not isinstance(data, dict):
+            return jsonify({
+                'success': False,
+                'error': 'Request body must be a JSON object'
+            }), 400
+        updates = {k: data[k] for k in STOCK_FIELDS if k in data}
+
+        if 'stockLevel' in updates:
+            level = updates['stockLevel']
+            if not isinstance(level, int) or isinstance(level, bool) or level < 0:
+                return jsonify({
+                    'success': False,
+                    'error': 'stockLevel must be a non-negative integer'
+                }), 400
+            updates.setdefault('inStock', updates['stockLevel'] > 0)
+        if 'inStock' in updates and not isinstance(updates['inStock'], bool):
+            return jsonify({
+                'success': False,
+                'error': 'inStock must be a boolean'
+            }), 400
+        if 'lastStockCheck' in updates:
+            # Same rule normalization applies on load and journal replay
+            updates['lastStockCheck'] = to_timestamp(updates['lastStockCheck'])
+            if updates['lastStockCheck'] is None:
+                return jsonify({
+                    'success': False,
+                    'error': 'lastStockCheck must be an ISO timestamp or epoch seconds'
+                }), 400
+        if not updates:
+            return jsonify({
+                'success': False,
+                'error': f"Provide at least one of: {', '.join(STOCK_FIELDS)}"
+            }), 400
+        updates.setdefault('lastStockCheck', datetime.utcnow().isoformat())
+
+        with STORE.lock:
+            supplier = STORE.update(supplier_id, updates)
+            ticket = JOURNAL.write([journal_entry('upsert', data=supplier)]) if supplier else 0
+        JOURNAL.sync(ticket)
+        if not supplier:
+            return jsonify({
+                'success': False,
+                'error': 'Supplier not found'
+            }), 404
+
+        return jsonify({
+            'success': True,
+            'data': supplier,
+            'version': STORE.version
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+# ==================== RATE LIMITING ====================
+
+class RateLimiter:
+    """
+    Token buckets per client (a logged-in session's user, else the remote address).
+
+    Every bucket holds up to burst tokens and refills at rate per second.
+    A request is admitted only if its bucket covers the up-front cost
+    estimate; whatever it turns out to cost beyond that (a large response,
+    an unindexed scan) is charged afterwards and may leave the bucket in
+    debt, so the client's next requests wait it off. With
+    RATE_LIMIT_SHARED_PATH the buckets live in one SQLite file and every
+    worker on the host draws from the same ones; otherwise they are
+    per process. Counters in report() are per process.
+    """
+    TAKE = (
+        'INSERT INTO buckets (key, tokens, updated, allowed) VALUES (:key, :burst - :cost, :now, 1) '
+        'ON CONFLICT (key) DO UPDATE SET '
+        'tokens = MIN(:burst, tokens + MAX(:now - updated, 0) * :rate) '
+        '- (MIN(:burst, tokens + MAX(:now - updated, 0) * :rate) >= :cost) * :cost, '
+        'allowed = MIN(:burst, tokens + MAX(:now - updated, 0) * :rate) >= :cost, '
+        'updated = MAX(updated, :now) '
+        'RETURNING tokens, allowed'
+    )
+
+    def __init__(self, rate=RATE_LIMIT_PER_SECOND, burst=RATE_LIMIT_BURST, shared_path=RATE_LIMIT_SHARED_PATH):
+        self.rate = rate
+        self.burst = burst
+        self.shared_path = shared_path
+        self.buckets = {}
+        self.routes = {}
+        self.limited_clients = {}
+        self.takes = 0
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    @property
+    def enabled(self):
+        return self.rate > 0
+
+    def _shared(self):
+        """Per-thread SQLite connection to the shared buckets, or None"""
+        if not self.shared_path:
+            return None
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.shared_path, timeout=1, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            conn.execute('CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, updated REAL, allowed INTEGER)')
+            self.local.conn = conn
+        return conn
+
+    def take(self, key, cost):
+        """Charge cost if the bucket covers it: (allowed, tokens left, seconds until it would)"""
+        now = time.time()
+        with self.lock:
+            self.takes += 1
+            prune = self.takes % 1024 == 0
+        try:
+            conn = self._shared()
+            if conn:
+                tokens, allowed = conn.execute(self.TAKE, {
+                    'key': key, 'cost': cost, 'now': now, 'rate': self.rate, 'burst': self.burst
+                }).fetchone()
+                if prune:
+                    # A bucket that has refilled completely is the same as no bucket
+                    conn.execute('DELETE FROM buckets WHERE tokens + (? - updated) * ? >= ?', (now, self.rate, self.burst))
+                return bool(allowed), tokens, 0 if allowed else (cost - tokens) / self.rate
+        except sqlite3.Error as e:
+            print(f"[WARNING] Shared rate limit buckets unavailable, using local ones: {e}")
+
+        with self.lock:
+            tokens, updated = self.buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + max(now - updated, 0) * self.rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self.buckets[key] = (tokens, now)
+            if prune:
+                self.buckets = {k: (t, u) for k, (t, u) in self.buckets.items()
+                                if t + (now - u) * self.rate < self.burst}
+        return allowed, tokens, 0 if allowed else (cost - tokens) / self.rate
+
+    def settle(self, route, key, extra):
+        """Charge cost found after the request ran; debt is capped at one full bucket"""
+        with self.lock:
+            self.routes[route]['tokens'] += extra
+        try:
+            conn = self._shared()
+            if conn:
+                conn.execute('UPDATE buckets SET tokens = MAX(tokens - ?, ?) WHERE key = ?', (extra, -self.burst, key))
+                return
+        except sqlite3.Error as e:
+            print(f"[WARNING] Shared rate limit buckets unavailable, using local ones: {e}")
+        with self.lock:
+            if key in self.buckets:
+                tokens, updated = self.buckets[key]
+                self.buckets[key] = (max(tokens - extra, -self.burst), updated)
+
+    def record(self, route, key, cost, limited):
+        with self.lock:
+            stats = self.routes.setdefault(route, {'requests': 0, 'limited': 0, 'tokens': 0.0})
+            stats['requests'] += 1
+            if limited:
+                stats['limited'] += 1
+                if key in self.limited_clients or len(self.limited_clients) < 10000:
+                    self.limited_clients[key] = self.limited_clients.get(key, 0) + 1
+            else:
+                stats['tokens'] += cost
+
+    def report(self):
+        with self.lock:
+            routes = {route: {**stats, 'tokens': round(stats['tokens'], 1)} for route, stats in sorted(self.routes.items())}
+            top = heapq.nlargest(10, self.limited_clients.items(), key=lambda item: item[1])
+            buckets = len(self.buckets)
+        try:
+            conn = self._shared()
+            if conn:
+                buckets = conn.execute('SELECT COUNT(*) FROM buckets').fetchone()[0]
+        except sqlite3.Error:
+            pass
+        return {
+            'enabled': self.enabled,
+            'rate_per_second': self.rate,
+            'burst': self.burst,
+            'shared_path': self.shared_path,
+            'buckets': buckets,
+            'routes': routes,
+            'top_limited_clients': [{'client': key, 'limited': count} for key, count in top]
+        }
+
+RATE_LIMITER = RateLimiter()
+
+if TRUSTED_PROXY_HOPS > 0:
+    # Take the client address from the proxies' X-Forwarded-For, never from further back
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS, x_proto=TRUSTED_PROXY_HOPS)
+
+def client_key():
+    """
+    Bucket key: the user behind a session issued at login (X-Session-Id),
+    else the remote address. A user id the caller merely claims is not
+    trusted, or anyone could get a fresh bucket per request
+    """
+    user_id = SESSIONS.get(request.headers.get('X-Session-Id', ''))
+    if user_id:
+        return f"user:{user_id}"
+    return f"ip:{request.remote_addr}"
+
+def request_cost():
+    """
+    Tokens charged before the request runs: 1, plus one per RATE_LIMIT_ROWS_PER_TOKEN
+    rows the page or batch asks for, plus the upload size; capped at a full bucket
+    """
+    rows = request.args.get('limit', 1000 if request.path == '/api/suppliers' else 0, type=int)
+    if request.is_json:
+        body = request.get_json(silent=True)
+        if isinstance(body, dict):
+            if isinstance(body.get('limit'), int):
+                rows = body['limit']
+            elif isinstance(body.get('ids'), list):
+                rows = len(body['ids'])
+    cost = (1 + max(min(rows, STORE.size), 0) / RATE_LIMIT_ROWS_PER_TOKEN
+            + (request.content_length or 0) / RATE_LIMIT_BYTES_PER_TOKEN)
+    return min(cost, RATE_LIMITER.burst)
+
+def charge_scan(rows):
+    """Add rows scanned without an index to the current request's cost"""
+    if has_request_context():
+        g.rate_scan_rows = g.get('rate_scan_rows', 0) + rows
+
+@app.before_request
+def rate_limit_begin():
+    """Answer 429 + Retry-After when the client's bucket can't cover the request"""
+    if not RATE_LIMITER.enabled or not request.path.startswith(RATE_LIMIT_PREFIXES):
+        return None
+    key, cost = client_key(), request_cost()
+    allowed, tokens, wait = RATE_LIMITER.take(key, cost)
+    rule = request.url_rule.rule if request.url_rule else request.path
+    RATE_LIMITER.record(f"{request.method} {rule}", key, cost, not allowed)
+    if allowed:
+        g.rate_limit = (f"{request.method} {rule}", key, cost, tokens)
+        return None
+    response = jsonify({
+        'success': False,
+        'error': 'Rate limit exceeded',
+        'retry_after': round(wait, 1)
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = str(max(math.ceil(wait), 1))
+    response.headers['X-RateLimit-Cost'] = f"{cost:.1f}"
+    return response
+
+@app.after_request
+def rate_limit_settle(response):
+    """Charge response size and unindexed scans beyond the up-front estimate"""
+    entry = g.pop('rate_limit', None)
+    if entry is None:
+        return response
+    route, key, charged, tokens = entry
+    cost = (1 + (0 if response.is_streamed else response.content_length or 0) / RATE_LIMIT_BYTES_PER_TOKEN
+            + g.get('rate_scan_rows', 0) / RATE_LIMIT_SCAN_ROWS_PER_TOKEN)
+    if cost > charged:
+        RATE_LIMITER.settle(route, key, cost - charged)
+    response.headers['X-RateLimit-Cost'] = f"{max(cost, charged):.1f}"
+    response.headers['X-RateLimit-Remaining'] = f"{tokens - max(cost - charged, 0):.0f}"
+    return response
+
+@app.route('/api/admin/ratelimit', methods=['GET'])
+@require_admin
+def rate_limit_stats():
+    """Limiter settings, per-route admitted/limited counts and tokens, most limited clients"""
+    return jsonify({
+        'success': True,
+        'ratelimit': RATE_LIMITER.report()
+    })
+
+# ==================== DEADLINES ====================
+
+# 'METHOD /rule' -> time budget in ms; ROUTE_BUDGETS ("POST /api/suppliers/search=300,...") overrides
+ROUTE_BUDGETS_MS = {
+    'POST /api/suppliers/search': 500,
+    'POST /api/suppliers/filter': 1000,
+    'POST /api/suppliers/query': 1000,
+    'GET /api/suppliers/analytics/stock': 2000,
+    'GET /api/suppliers/nearby': 500,
+    'GET /api/suppliers/ranked': 500,
+}
+for item in filter(None, (part.strip() for part in ROUTE_BUDGETS.split(','))):
+    route, _, budget = item.rpartition('=')
+    ROUTE_BUDGETS_MS[route.strip()] = float(budget)
+
+class DeadlineExceeded(Exception):
+    """Raised by Deadline.check once a request has spent its budget"""
+    def __init__(self, deadline, stage):
+        super().__init__(f"Request exceeded its {deadline.budget_ms:g} ms budget during {stage}")
+        self.deadline = deadline
+        self.stage = stage
+
+class Deadline:
+    """
+    Time budget of one request. Long-running work checks it cooperatively:
+    check() aborts with DeadlineExceeded where a partial answer would be
+    wrong (planner steps), cut() tells a scan to stop and return what it
+    has (search, fuzzy matching). Either way the outcome is recorded.
+    """
+    def __init__(self, route, budget_ms):
+        self.route = route
+        self.budget_ms = budget_ms
+        self.started = time.perf_counter()
+        self.expires = self.started + budget_ms / 1000
+        self.outcome = 'ok'
+        self.stage = None
+
+    def remaining_ms(self):
+        return max((self.expires - time.perf_counter()) * 1000, 0)
+
+    def check(self, stage):
+        if time.perf_counter() >= self.expires:
+            self.outcome, self.stage = 'timeout', stage
+            raise DeadlineExceeded(self, stage)
+
+    def cut(self, stage):
+        if time.perf_counter() >= self.expires:
+            self.outcome, self.stage = 'partial', stage
+            return True
+        return False
+
+def current_deadline():
+    """The Deadline of the request being served, or None"""
+    return g.get('deadline') if has_request_context() else None
+
+def check_deadline(stage):
+    deadline = current_deadline()
+    if deadline is not None:
+        deadline.check(stage)
+
+def timeout_response(error):
+    response = jsonify({
+        'success': False,
+        'error': str(error),
+        'timeout': True,
+        'stage': error.stage
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
+class DeadlineStats:
+    """Per-route outcomes of budgeted requests: ok, partial, timeout, and ok-but-over-budget"""
+    def __init__(self):
+        self.routes = {}
+        self.lock = threading.Lock()
+
+    def record(self, deadline, status):
+        elapsed = (time.perf_counter() - deadline.started) * 1000
+        with self.lock:
+            stats = self.routes.setdefault(deadline.route, {
+                'budget_ms': deadline.budget_ms, 'requests': 0, 'ok': 0, 'partial': 0, 'timeout': 0,
+                'over_budget': 0, 'max_ms': 0.0, 'stages': {}
+            })
+            stats['requests'] += 1
+            stats[deadline.outcome] += 1
+            # Finished, but late: work with no checkpoint ran past the budget
+            if deadline.outcome == 'ok' and elapsed > deadline.budget_ms and status < 500:
+                stats['over_budget'] += 1
+            if deadline.stage:
+                stats['stages'][deadline.stage] = stats['stages'].get(deadline.stage, 0) + 1
+            stats['max_ms'] = max(stats['max_ms'], round(elapsed, 1))
+
+    def report(self):
+        with self.lock:
+            return {
+                'budgets_ms': ROUTE_BUDGETS_MS,
+                'routes': {route: {**stats, 'stages': dict(stats['stages'])} for route, stats in sorted(self.routes.items())}
+            }
+
+DEADLINE_STATS = DeadlineStats()
+
+@app.before_request
+def deadline_begin():
+    """Start the route's budget; X-Request-Timeout-Ms lets a client that gives up sooner shorten it"""
+    rule = request.url_rule.rule if request.url_rule else request.path
+    route = f"{request.method} {rule}"
+    budget = ROUTE_BUDGETS_MS.get(route)
+    if budget is None:
+        return None
+    try:
+        budget = min(budget, max(float(request.headers.get('X-Request-Timeout-Ms', budget)), 1))
+    except ValueError:
+        pass
+    g.deadline = Deadline(route, budget)
+
+@app.after_request
+def deadline_end(response):
+    deadline = g.pop('deadline', None)
+    if deadline is not None:
+        DEADLINE_STATS.record(deadline, response.status_code)
+        response.headers['X-Time-Budget-Ms'] = f"{deadline.budget_ms:g}"
+    return response
+
+@app.route('/api/admin/deadlines', methods=['GET'])
+@require_admin
+def deadline_stats():
+    """Route time budgets and how budgeted requests ended"""
+    return jsonify({
+        'success': True,
+        'deadlines': DEADLINE_STATS.report()
+    })
+
+# ==================== PROFILING ====================
+
+class SlowRequestProfiler:
+    """
+    Opt-in sampling profiler for slow requests.
+
+    While enabled, a sampler thread snapshots the stack of every in-flight
+    request each interval (sys._current_frames). When a request finishes,
+    its samples are kept only if it took at least threshold_ms, aggregated
+    per route as folded stacks ("frame;frame;frame count") that
+    flamegraph.pl and speedscope read directly. Disabled, the request hooks
+    cost one attribute check.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.threshold_ms = 0
+        self.interval = 0.005
+        self.lock = threading.Lock()
+        self.active = {}
+        self.stacks = {}
+        self.routes = {}
+        self.samples = 0
+        self.thread = None
+
+    def start(self, threshold_ms, interval_ms=None):
+        if interval_ms:
+            self.interval = interval_ms / 1000
+        self.threshold_ms = threshold_ms
+        self.enabled = True
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._run, name='slow-request-profiler', daemon=True)
+            self.thread.start()
+        print(f"[OK] Profiling requests slower than {threshold_ms} ms every {self.interval * 1000:g} ms")
+
+    def stop(self):
+        self.enabled = False
+        with self.lock:
+            self.active.clear()
+
+    def reset(self):
+        with self.lock:
+            self.stacks.clear()
+            self.routes.clear()
+            self.samples = 0
+
+    def begin(self, route):
+        with self.lock:
+            self.active[threading.get_ident()] = (route, time.perf_counter(), {})
+
+    def end(self):
+        with self.lock:
+            entry = self.active.pop(threading.get_ident(), None)
+            if entry is None:
+                return
+            route, started, stacks = entry
+            elapsed = (time.perf_counter() - started) * 1000
+            if elapsed < self.threshold_ms:
+                return
+            stats = self.routes.setdefault(route, {'requests': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'samples': 0})
+            stats['requests'] += 1
+            stats['total_ms'] += elapsed
+            stats['max_ms'] = max(stats['max_ms'], elapsed)
+            folded = self.stacks.setdefault(route, {})
+            for stack, count in stacks.items():
+                folded[stack] = folded.get(stack, 0) + count
+                stats['samples'] += count
+
+    @staticmethod
+    def fold(frame):
+        """Root-first 'function (module:line)' frames joined with ';'"""
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({frame.f_globals.get('__name__', '?')}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def _run(self):
+        while self.enabled:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self.lock:
+                for ident, (_, _, stacks) in self.active.items():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        stack = self.fold(frame)
+                        stacks[stack] = stacks.get(stack, 0) + 1
+                        self.samples += 1
+            del frames
+
+    def folded(self, route=None):
+        """Folded-stack text, one line per distinct stack, prefixed with the route"""
+        with self.lock:
+            lines = []
+            for name, stacks in sorted(self.stacks.items()):
+                if route is None or name == route:
+                    lines.extend(f"{name};{stack} {count}" for stack, count in stacks.items())
+            return '\n'.join(lines) + '\n' if lines else ''
+
+    def report(self):
+        with self.lock:
+            routes = {
+                route: {**stats, 'avg_ms': round(stats['total_ms'] / stats['requests'], 1),
+                        'total_ms': round(stats['total_ms'], 1), 'max_ms': round(stats['max_ms'], 1),
+                        'stacks': len(self.stacks.get(route, ()))}
+                for route, stats in self.routes.items()
+            }
+        return {
+            'enabled': self.enabled,
+            'threshold_ms': self.threshold_ms,
+            'interval_ms': self.interval * 1000,
+            'in_flight': len(self.active),
+            'samples': self.samples,
+            'routes': routes
+        }
+
+PROFILER = SlowRequestProfiler()
+if PROFILE_SLOW_MS > 0:
+    PROFILER.start(PROFILE_SLOW_MS, PROFILE_INTERVAL_MS)
+
+@app.before_request
+def profile_begin():
+    if PROFILER.enabled:
+        rule = request.url_rule.rule if request.url_rule else request.path
+        PROFILER.begin(f"{request.method} {rule}")
+
+@app.teardown_request
+def profile_end(error=None):
+    if PROFILER.enabled:
+        PROFILER.end()
+
+@app.route('/api/admin/profile', methods=['GET'])
+@require_admin
+def profile_stats():
+    """Profiler state and per-route counts of slow requests captured"""
+    return jsonify({
+        'success': True,
+        'profile': PROFILER.report()
+    })
+
+@app.route('/api/admin/profile', methods=['POST'])
+@require_admin
+def configure_profile():
+    """
+    Turn slow-request profiling on or off
+    Request body: {"enabled": true, "threshold_ms": 200, "interval_ms": 5, "reset": false}
+    """
+    try:
+        data = request.get_json() or {}
+        if not isinstance(data, dict):
+            raise ValueError('Request body must be a JSON object')
+        if data.get('reset'):
+            PROFILER.reset()
+        if data.get('enabled') is False:
+            PROFILER.stop()
+        elif data.get('enabled') or 'threshold_ms' in data or 'interval_ms' in data:
+            threshold = float(data.get('threshold_ms', PROFILER.threshold_ms or 200))
+            interval = float(data.get('interval_ms', PROFILER.interval * 1000))
+            if not 0 <= threshold < math.inf or not 0.5 <= interval <= 1000:
+                raise ValueError('threshold_ms must be >= 0 and interval_ms between 0.5 and 1000')
+            PROFILER.start(threshold, interval)
+        return jsonify({
+            'success': True,
+            'profile': PROFILER.report()
+        })
+    except (TypeError, ValueError) as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@app.route('/api/admin/profile/flamegraph', methods=['GET'])
+@require_admin
+def profile_flamegraph():
+    """
+    Folded stacks of slow requests, for flamegraph.pl or speedscope
+    Query params: route="GET /api/suppliers/search" (all routes if omitted)
+    """
+    return Response(PROFILER.folded(request.args.get('route')), mimetype='text/plain')
+
+# ==================== MEMORY ====================
+
+class AllocationTracker:
+    """
+    tracemalloc-backed allocation accounting for selected routes.
+
+    For each tracked request it records the peak traced memory above the
+    level at request start (working set while building the response) and
+    the net bytes still held when it finishes. tracemalloc is process-wide,
+    so only one request is measured at a time; tracked requests that
+    overlap it are counted as skipped rather than mixed in. tracemalloc
+    itself slows allocation-heavy code, so leave it off outside diagnosis.
+    """
+    def __init__(self):
+        self.routes = set()
+        self.current = None
+        self.started_tracing = False
+        self.stats = {}
+        self.skipped = 0
+        self.lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.routes)
+
+    def track(self, routes):
+        """routes: iterable of 'METHOD /rule' strings, or '*' for every route"""
+        import tracemalloc
+        self.routes = {'*'} if routes == '*' or '*' in routes else set(routes)
+        if self.routes and not tracemalloc.is_tracing():
+            tracemalloc.start(ALLOC_TRACE_FRAMES)
+            self.started_tracing = True
+        print(f"[OK] Tracking allocations for {', '.join(sorted(self.routes))}")
+
+    def stop(self):
+        import tracemalloc
+        with self.lock:
+            self.routes = set()
+            self.current = None
+            if self.started_tracing:
+                tracemalloc.stop()
+                self.started_tracing = False
+
+    def reset(self):
+        with self.lock:
+            self.stats.clear()
+            self.skipped = 0
+
+    def begin(self, route):
+        import tracemalloc
+        if '*' not in self.routes and route not in self.routes:
+            return
+        with self.lock:
+            if not tracemalloc.is_tracing():
+                return
+            if self.current is not None:
+                self.skipped += 1
+                return
+            tracemalloc.reset_peak()
+            self.current = (threading.get_ident(), route, tracemalloc.get_traced_memory()[0])
+
+    def end(self, response=None):
+        """Record the request on this thread, if it is the one being measured"""
+        import tracemalloc
+        with self.lock:
+            if self.current is None or self.current[0] != threading.get_ident():
+                return
+            _, route, before = self.current
+            self.current = None
+            if not tracemalloc.is_tracing():
+                return
+            current, peak = tracemalloc.get_traced_memory()
+            peak, net = peak - before, current - before
+            stats = self.stats.setdefault(route, {'requests': 0, 'peak_total': 0, 'peak_max': 0, 'net_total': 0, 'net_max': 0})
+            stats['requests'] += 1
+            stats['peak_total'] += peak
+            stats['peak_max'] = max(stats['peak_max'], peak)
+            stats['net_total'] += net
+            stats['net_max'] = max(stats['net_max'], net)
+        if response is not None:
+            response.headers['X-Alloc-Peak-Bytes'] = str(peak)
+            response.headers['X-Alloc-Net-Bytes'] = str(net)
+
+    def top_sites(self, limit=10):
+        """Largest live allocation sites (file:line) while tracing"""
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            return []
+        stats = tracemalloc.take_snapshot().statistics('lineno')[:limit]
+        return [{'site': str(s.traceback[0]), 'bytes': s.size, 'blocks': s.count} for s in stats]
+
+    def report(self):
+        import tracemalloc
+        routes = {
+            route: {
+                'requests': s['requests'],
+                'peak_avg': s['peak_total'] // s['requests'],
+                'peak_max': s['peak_max'],
+                'net_avg': s['net_total'] // s['requests'],
+                'net_max': s['net_max']
+            }
+            for route, s in sorted(self.stats.items())
+        }
+        traced, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (None, None)
+        return {
+            'tracking': sorted(self.routes),
+            'tracing': tracemalloc.is_tracing(),
+            'traced_bytes': traced,
+            'traced_peak_bytes': peak,
+            'skipped_overlapping': self.skipped,
+            'routes': routes
+        }
+
+ALLOCATIONS = AllocationTracker()
+if ALLOC_TRACK_ROUTES:
+    ALLOCATIONS.track([r.strip() for r in ALLOC_TRACK_ROUTES.split(',') if r.strip()])
+
+@app.before_request
+def allocations_begin():
+    if ALLOCATIONS.enabled:
+        rule = request.url_rule.rule if request.url_rule else request.path
+        ALLOCATIONS.begin(f"{request.method} {rule}")
+
+@app.after_request
+def allocations_end(response):
+    if ALLOCATIONS.enabled:
+        ALLOCATIONS.end(response)
+    return response
+
+@app.teardown_request
+def allocations_abort(error=None):
+    # after_request is skipped when a view raises; drop the measurement
+    if ALLOCATIONS.enabled and ALLOCATIONS.current is not None:
+        ALLOCATIONS.end()
+
+def memory_breakdown():
+    """
+    Bytes held by the store, its indexes and caches. "shared" arrays are
+    views into the dataset snapshot (one mmapped copy per host when
+    SHARED_DATASET_DIR is set); "private" ones were built or copied by
+    this process.
+    """
+    snapshot = STORE.snapshot
+    start = np.frombuffer(snapshot.buffer, dtype=np.uint8).ctypes.data if snapshot else 0
+    end = start + (snapshot.nbytes if snapshot else 0)
+    totals = {'shared': 0, 'private': 0}
+
+    def size(*arrays):
+        entry = {'bytes': 0, 'shared': 0}
+        for array in arrays:
+            address = array.__array_interface__['data'][0]
+            shared = start <= address < end
+            entry['bytes'] += array.nbytes
+            entry['shared'] += array.nbytes if shared else 0
+            totals['shared' if shared else 'private'] += array.nbytes
+        entry['private'] = entry['bytes'] - entry['shared']
+        return entry
+
+    columns = STORE.columns
+    breakdown = {
+        'snapshot': {
+            'path': snapshot.path,
+            'bytes': snapshot.nbytes,
+            'mmapped': snapshot.path is not None,
+            'records_blob': int(snapshot.arrays['records:blob'].nbytes),
+            'text_blob': int(snapshot.arrays['text:blob'].nbytes)
+        },
+        'columns': {name: size(array) for name, array in {**columns.numeric, **columns.codes}.items()},
+        'sorted_index': {name: size(*arrays) for name, arrays in columns.sorted.items()},
+        'code_index': {field: size(*arrays) for field, arrays in columns.code_index.items()},
+        'live_mask': size(columns.live) if columns.live is not None else None,
+        'geo_index': {
+            'all' if group is None else columns.labels['category'][group]:
+                size(*(getattr(tree, part) for part in KDTree.PARTS))
+            for group, tree in GEO_INDEX.trees.items()
+        },
+        'ranking': size(*(RANKER.features or {}).values(),
+                        *(a for entry in RANKER.cache.values() for a in (entry['scores'], *entry['top'].values()))),
+        'overlay': {
+            'records': len(STORE.records.overlay),
+            'bytes': sum(len(encode_record(s)) for s in list(STORE.records.overlay.values()))
+        },
+        'change_log': len(STORE.changes),
+        'result_cache_bytes': RESULT_CACHE.bytes,
+        'users': len(USERS_DB)
+    }
+    breakdown['arrays_shared_bytes'] = totals['shared']
+    breakdown['arrays_private_bytes'] = totals['private']
+    return breakdown
+
+def process_rss():
+    """Resident set size in bytes (Linux /proc, else the peak from getrusage)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+@app.route('/api/admin/memory', methods=['GET'])
+@require_admin
+def memory_stats():
+    """
+    Memory held by the store by column and index, plus per-route allocations
+    Query params: top=10 (largest allocation sites while tracking)
+    """
+    try:
+        with STORE.lock:
+            breakdown = memory_breakdown()
+        return jsonify({
+            'success': True,
+            'rss_bytes': process_rss(),
+            'store': breakdown,
+            'allocations': ALLOCATIONS.report(),
+            'top_sites': ALLOCATIONS.top_sites(request.args.get('top', 10, type=int))
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/admin/memory/tracking', methods=['POST'])
+@require_admin
+def configure_allocations():
+    """
+    Choose the routes whose requests are measured with tracemalloc
+    Request body: {"routes": ["POST /api/suppliers/filter"] | "*", "enabled": false, "reset": false}
+    """
+    try:
+        data = request.get_json() or {}
+        if not isinstance(data, dict):
+            raise ValueError('Request body must be a JSON object')
+        if data.get('reset'):
+            ALLOCATIONS.reset()
+        if data.get('enabled') is False:
+            ALLOCATIONS.stop()
+        elif 'routes' in data:
+            routes = data['routes']
+            if routes != '*' and (not isinstance(routes, list) or not all(isinstance(r, str) for r in routes)):
+                raise ValueError("routes must be a list of 'METHOD /rule' strings or '*'")
+            ALLOCATIONS.track(routes)
+        return jsonify({
+            'success': True,
+            'allocations': ALLOCATIONS.report()
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+# ==================== HEALTH ====================
+
+# Written only by load_data(); read by the probes and the request gate
+LOAD_STATE = {
+    'status': 'idle',
+    'degraded': False,
+    'error': None,
+    'started_at': None,
+    'finished_at': None
+}
+# Accounts are restored with the data, so /api/auth waits for the load too
+DATA_ROUTE_PREFIXES = ('/api/suppliers', '/api/admin', '/api/auth')
+
+@app.before_request
+def gate_data_routes():
+    """Answer data routes with 503 + Retry-After until the store is loaded"""
+    if LOAD_STATE['status'] == 'ready' or not request.path.startswith(DATA_ROUTE_PREFIXES):
+        return None
+    response = jsonify({
+        'success': False,
+        'error': 'Supplier data failed to load' if LOAD_STATE['status'] == 'failed' else 'Supplier data is loading',
+        'status': LOAD_STATE['status']
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(LOADING_RETRY_AFTER)
+    return response
+
+def readiness():
+    """In-memory readiness of the store and its indexes; never does I/O"""
+    components = {
+        'load': LOAD_STATE['status'] == 'ready',
+        'store': STORE.loaded_at is not None and len(STORE.records) > 0,
+        'columns': STORE.columns is not None and STORE.columns.size == len(STORE.records),
+        'ranking': RANKER.version is not None,
+        'geo': bool(GEO_INDEX.trees),
+    }
+    return all(components.values()), components
+
+@app.route('/health', methods=['GET'])
+def health_check():
     """Health check endpoint"""
     return jsonify({
         'status': 'healthy',
-        'suppliers_loaded': len(ALL_SUPPLIERS),
-        'source': 'suppliers.json' if len(ALL_SUPPLIERS) > 150 else 'fallback',
+        'data': LOAD_STATE['status'],
+        'degraded': LOAD_STATE['degraded'],
+        'suppliers_loaded': STORE.size,
+        'source': 'suppliers.json' if STORE.size > 150 else 'fallback',
+        'version': STORE.version,
+        'loaded_at': STORE.loaded_at,
         'timestamp': datetime.utcnow().isoformat()
     })
 
+@app.route('/health/live', methods=['GET'])
+def health_live():
+    """Liveness probe: the process is up and serving"""
+    return jsonify({'status': 'ok'})
+
+@app.route('/health/ready', methods=['GET'])
+def health_ready():
+    """Readiness probe: the store and indexes are loaded"""
+    ready, components = readiness()
+    return jsonify({
+        'status': 'ready' if ready else LOAD_STATE['status'],
+        'components': components,
+        'degraded': LOAD_STATE['degraded'],
+        'error': LOAD_STATE['error'],
+        'version': STORE.version,
+        'loaded_at': STORE.loaded_at,
+        'suppliers_loaded': STORE.size
+    }), 200 if ready else 503
+
 # ==================== ERROR HANDLERS ====================
 
 @app.errorhandler(404)
@@ -462,12 +4741,156 @@ def internal_error(error):
 
 # ==================== MAIN ====================
 
-if __name__ == '__main__':
+def load_data(filename=None, fallback=None):
+    """
+    Load suppliers into the store and build every index
+    Generated demo data is only used when fallback (or FALLBACK_DATA) is set
+    """
+    global DATA_QUALITY
+    filename = filename or DATA_FILE
+    fallback = FALLBACK_DATA if fallback is None else fallback
+    started = time.perf_counter()
+    LOAD_STATE.update(status='loading', error=None, started_at=datetime.utcnow().isoformat())
+
+    try:
+        print("[1/3] Loading supplier data...")
+        after = 0
+        recompact = False
+        replay_suppliers = True
+        snapshot = None
+        state_id = JOURNAL_WATCHER.current_snapshot_id()
+        dataset_id = file_fingerprint(filename) if os.path.exists(filename) else None
+        if os.path.exists(STATE_SNAPSHOT_FILE):
+            # Journaled writes live on top of the last compaction, not suppliers.json
+            state = DatasetSnapshot.attach(STATE_SNAPSHOT_FILE)
+            after = state.meta['journal_seq']
+            USERS_DB.update(state.meta['users'])
+            # Snapshots written before the source was recorded are taken to match the file
+            source_id = state.meta.setdefault('source', dataset_id)
+            if dataset_id and source_id != dataset_id:
+                # An edited data file wins over earlier supplier writes, as with /api/admin/reload
+                print(f"[WARNING] {filename} changed since {STATE_SNAPSHOT_FILE} was written; loading it instead")
+                replay_suppliers = False
+                recompact = True
+            elif state.outdated:
+                print(f"[WARNING] {STATE_SNAPSHOT_FILE} predates the current columns or normalization; rebuilding it")
+                snapshot = state.rebuilt()
+                recompact = True
+            else:
+                snapshot = state
+        if snapshot is None:
+            snapshot = shared_snapshot(dataset_id, lambda: load_suppliers_from_file(filename))
+        if snapshot:
+            print(f"[OK] Attached dataset {snapshot.path} ({snapshot.size} suppliers)")
+            # Written by whichever process normalized the records
+            DATA_QUALITY = snapshot.meta.get('quality')
+            print("[2/3] Initializing supplier database...")
+            STORE.load_snapshot(snapshot)
+        else:
+            suppliers = load_suppliers_from_file(filename)
+
+            print("[2/3] Initializing supplier database...")
+            if not suppliers:
+                if not fallback:
+                    raise RuntimeError(f"{filename} could not be loaded (set FALLBACK_DATA=1 to serve demo data)")
+                print(f"[WARNING] {filename} not found - DEGRADED MODE, generating fallback data")
+                suppliers = normalize_records(generate_fallback_suppliers(150), 'fallback data')
+                dataset_id = None
+                LOAD_STATE['degraded'] = True
+                print(f"[OK] Generated {len(suppliers)} fallback suppliers")
+
+            STORE.load(suppliers, dataset_id=dataset_id)
+            del suppliers
+        if not JOURNAL.owner:
+            # Lock first: only the owner may cut off a torn last entry
+            owner = JOURNAL.lock()
+            last, applied, rejected = replay_journal(after, suppliers=replay_suppliers, truncate=owner,
+                                                     offsets=JOURNAL_WATCHER.offsets)
+            JOURNAL.replay_rejected = rejected
+            print(f"[OK] Replayed {applied} journal entries (seq {after} -> {last}), {rejected} rejected")
+            if owner:
+                JOURNAL.open(last)
+                COMPACTOR.start()
+                if recompact:
+                    COMPACTOR.compact()
+            else:
+                JOURNAL.seq = JOURNAL.durable_seq = last
+                print(f"[WARNING] {JOURNAL.path} is owned by another process; following it, writes are refused")
+            JOURNAL_WATCHER.start(state_id)
+        RANKER.warm()
+        GEO_INDEX.ensure_built()
+        FUZZY_INDEX.ensure_built()
+        SUGGEST_INDEX.ensure_built()
+    except Exception as e:
+        LOAD_STATE.update(status='failed', error=str(e), finished_at=datetime.utcnow().isoformat())
+        print(f"[ERROR] Supplier data load failed: {e}")
+        raise
+
+    LOAD_STATE.update(status='ready', finished_at=datetime.utcnow().isoformat())
+    print(f"[OK] Total suppliers loaded: {STORE.size}")
+    print(f"[OK] Source: {'suppliers.json' if STORE.size > 150 else 'Fallback Demo'}")
+    print(f"[OK] Data and indexes ready in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+def start_background_load(**kwargs):
+    """Run load_data() on a daemon thread; data routes answer 503 until it finishes"""
+    def run():
+        try:
+            load_data(**kwargs)
+        except Exception:
+            pass  # already recorded in LOAD_STATE and logged
+
+    LOAD_STATE['status'] = 'loading'
+    thread = threading.Thread(target=run, name='supplier-loader', daemon=True)
+    thread.start()
+    return thread
+
+def create_app(load=True, background=False, fallback=None):
+    """
+    Application factory for WSGI servers, e.g. gunicorn 'app:create_app(background=True)'
+    Importing this module does no I/O. With background=True the app is returned
+    immediately and serves /health while the store loads on a separate thread.
+    """
+    if load and LOAD_STATE['status'] in ('idle', 'failed'):
+        if background:
+            start_background_load(fallback=fallback)
+        else:
+            load_data(fallback=fallback)
+    return app
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Walmart Supplier Portal API')
+    parser.add_argument('--fallback', action='store_true',
+                        help='serve generated demo data if the data file cannot be loaded (degraded mode)')
+    parser.add_argument('--foreground-load', action='store_true',
+                        help='load data before binding the port instead of in the background')
+    args = parser.parse_args()
+    started = time.perf_counter()
+
+    print("\n" + "="*70)
+    print("WALMART SUPPLIER PORTAL - REAL DATA BACKEND")
+    print("Serving actual construction material suppliers from USA")
+    print("="*70)
+    print(f"Environment: {NODE_ENV}")
+    print(f"Host: {HOST}:{PORT}")
+    print()
+
+    debug = NODE_ENV == 'development'
+    # The debug reloader's parent only watches files and restarts the child that serves;
+    # loading there would take the journal lock away from the child
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        create_app(background=not args.foreground_load, fallback=args.fallback or None)
+
+    print("[3/3] Starting API server...")
+    print()
     print(f"API Endpoint:        http://{HOST}:{PORT}/api/suppliers")
     print(f"Health Check:        http://{HOST}:{PORT}/health")
+    print(f"Readiness:           http://{HOST}:{PORT}/health/ready")
     print(f"Dashboard:           http://{HOST}:{PORT}/")
-    print(f"\nSuppliers Loaded:    {len(ALL_SUPPLIERS)}")
-    print(f"Source:              {'suppliers.json (REAL DATA)' if len(ALL_SUPPLIERS) > 150 else 'Fallback Demo'}")
+    print(f"Startup:             {(time.perf_counter() - started) * 1000:.0f} ms (data loading: {LOAD_STATE['status']})")
     print(f"\nServer starting on {HOST}:{PORT}...\n")
     
-    app.run(host=HOST, port=PORT, debug=(NODE_ENV == 'development'))
+    app.run(host=HOST, port=PORT, debug=debug)
+
+if __name__ == '__main__':
+    main()
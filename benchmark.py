@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for app.py - latency and memory per endpoint, in process
+
+Loads the data file into the app (no server needed) and runs each scenario
+twice: a timing pass with tracemalloc off, then a memory pass with every
+route tracked by the app's AllocationTracker (peak bytes above the start of
+the request, and bytes still held when it returns). The result cache is
+disabled unless --cache is given, so numbers reflect the real work.
+
+Usage:
+    python benchmark.py                          # suppliers.json, report to bench_output.txt
+    python benchmark.py --data big.json --json run.json
+    python benchmark.py --baseline run.json      # exit 1 on time or memory regressions
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+SCENARIOS = [
+    # (name, method, path, json body)
+    ('list_page', 'GET', '/api/suppliers?page=2&limit=50', None),
+    ('list_1000', 'GET', '/api/suppliers?page=1&limit=1000', None),
+    ('detail', 'GET', '/api/suppliers/{id}', None),
+    ('batch_100', 'POST', '/api/suppliers/batch', {'ids': '{ids100}'}),
+    ('search', 'POST', '/api/suppliers/search', {'q': 'steel'}),
+    ('search_short', 'POST', '/api/suppliers/search', {'q': 'co'}),
+    ('suggest', 'GET', '/api/suppliers/suggest?q=con', None),
+    ('suggest_short', 'GET', '/api/suppliers/suggest?q=s', None),
+    ('search_fuzzy', 'POST', '/api/suppliers/search', {'q': 'consrete suply'}),
+    ('filter_state', 'POST', '/api/suppliers/filter', {'state': '{state}', 'minRating': 3.5}),
+    ('filter_sorted', 'POST', '/api/suppliers/filter', {'minRating': 4, 'sortBy': 'rating', 'order': 'desc'}),
+    ('query', 'POST', '/api/suppliers/query', {'range': {'rating': {'min': 4}}, 'sort': {'by': 'stockLevel'}, 'limit': 100}),
+    ('ranked', 'GET', '/api/suppliers/ranked?limit=20', None),
+    ('nearby', 'GET', '/api/suppliers/nearby?lat=41.88&lon=-87.63&k=20', None),
+    ('stock_analytics', 'GET', '/api/suppliers/analytics/stock', None),
+]
+
+def fill(value, sample):
+    """Substitute {id}/{state}/{ids100} placeholders with values from the loaded data"""
+    if isinstance(value, str):
+        if value == '{ids100}':
+            return sample['ids'][:100]
+        return value.format(**sample)
+    if isinstance(value, dict):
+        return {k: fill(v, sample) for k, v in value.items()}
+    return value
+
+def measure(client, method, path, body, iterations, warmup):
+    for _ in range(warmup):
+        client.open(path, method=method, json=body)
+    times = []
+    status = None
+    for _ in range(iterations):
+        started = time.perf_counter()
+        response = client.open(path, method=method, json=body)
+        times.append((time.perf_counter() - started) * 1000)
+        status = response.status_code
+    times.sort()
+    return {
+        'status': status,
+        'median_ms': round(statistics.median(times), 3),
+        'p95_ms': round(times[min(int(len(times) * 0.95), len(times) - 1)], 3),
+        'bytes': len(response.data)
+    }
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started) * 1000)
+    return round(min(times), 3)
+
+def serializer_comparison(backend, sizes=(50, 1000, 10000), repeat=20):
+    """
+    Encode a page of records three ways: decoded dicts through the stdlib
+    encoder (the path before the serializer layer), decoded dicts through
+    the configured backend, and RawRecords spliced from the snapshot.
+    """
+    records = backend.STORE.records
+    live = backend.STORE.live_positions()
+    stdlib = backend.JSONSerializer('stdlib')
+    serializer = backend.SERIALIZER
+    results = {}
+    for size in sizes:
+        positions = live[:size]
+        if len(positions) < size:
+            break
+        results[size] = {
+            'dicts_stdlib_ms': best_of(lambda: stdlib.dumps({'data': [records[p] for p in positions.tolist()]}), repeat),
+            f'dicts_{serializer.name}_ms': best_of(lambda: serializer.dumps({'data': [records[p] for p in positions.tolist()]}), repeat),
+            f'raw_{serializer.name}_ms': best_of(lambda: serializer.encode({'data': records.encoded(positions)}), repeat)
+        }
+    return results
+
+def run(args):
+    # Keep the benchmark from touching the real journal and state snapshot
+    scratch = tempfile.mkdtemp(prefix='supplier-bench-')
+    os.environ['DATA_FILE'] = args.data
+    os.environ['JOURNAL_FILE'] = os.path.join(scratch, 'suppliers.journal')
+    os.environ['STATE_SNAPSHOT_FILE'] = os.path.join(scratch, 'suppliers.snapshot')
+    os.environ.setdefault('NODE_ENV', 'production')
+    os.environ['RATE_LIMIT_PER_SECOND'] = '0'
+    if not args.cache:
+        os.environ['RESULT_CACHE_MAX_BYTES'] = '0'
+        os.environ.pop('RESULT_CACHE_SHARED_PATH', None)
+
+    import app as backend
+    started = time.perf_counter()
+    backend.create_app()
+    load_ms = (time.perf_counter() - started) * 1000
+    client = backend.app.test_client()
+    records = backend.STORE.records
+    positions = backend.STORE.live_positions()[:100].tolist()
+    sample = {
+        'id': records[positions[0]]['id'],
+        'ids': [records[p]['id'] for p in positions],
+        'state': records[positions[0]].get('state', 'Texas')
+    }
+
+    results = {}
+    selected = [s for s in SCENARIOS if not args.only or s[0] in args.only]
+    for name, method, path, body in selected:
+        path, body = fill(path, sample), fill(body, sample)
+        results[name] = measure(client, method, path, body, args.iterations, args.warmup)
+
+    # Memory pass: tracemalloc on for every route
+    backend.ALLOCATIONS.track('*')
+    for name, method, path, body in selected:
+        path, body = fill(path, sample), fill(body, sample)
+        peaks, nets = [], []
+        for _ in range(max(args.iterations // 10, 3)):
+            response = client.open(path, method=method, json=body)
+            peaks.append(int(response.headers.get('X-Alloc-Peak-Bytes', 0)))
+            nets.append(int(response.headers.get('X-Alloc-Net-Bytes', 0)))
+        results[name]['peak_bytes'] = int(statistics.median(peaks))
+        results[name]['net_bytes'] = int(statistics.median(nets))
+    backend.ALLOCATIONS.stop()
+
+    with backend.STORE.lock:
+        breakdown = backend.memory_breakdown()
+    return {
+        'serializer': backend.SERIALIZER.name,
+        'encoding': serializer_comparison(backend),
+        'data': args.data,
+        'suppliers': backend.STORE.size,
+        'load_ms': round(load_ms),
+        'rss_bytes': backend.process_rss(),
+        'store_private_bytes': breakdown['arrays_private_bytes'],
+        'store_shared_bytes': breakdown['arrays_shared_bytes'],
+        'scenarios': results
+    }
+
+def compare(result, baseline, tolerance):
+    """Lines describing scenarios that got slower or allocate more than tolerance allows"""
+    regressions = []
+    for name, now in result['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(name)
+        if not before:
+            continue
+        for key in ('median_ms', 'peak_bytes'):
+            if before.get(key) and now.get(key, 0) > before[key] * (1 + tolerance):
+                regressions.append(f"{name}: {key} {before[key]} -> {now[key]} (+{(now[key] / before[key] - 1) * 100:.0f}%)")
+    return regressions
+
+def format_report(result, regressions=None):
+    lines = [
+        '=' * 78,
+        f"BENCHMARK - {result['suppliers']} suppliers from {result['data']} (load {result['load_ms']} ms)",
+        '=' * 78,
+        f"{'scenario':<15} {'status':>6} {'median ms':>10} {'p95 ms':>9} {'resp KB':>9} {'peak KB':>9} {'net KB':>8}"
+    ]
+    for name, r in result['scenarios'].items():
+        lines.append(f"{name:<15} {r['status']:>6} {r['median_ms']:>10.3f} {r['p95_ms']:>9.3f} "
+                     f"{r['bytes'] / 1024:>9.1f} {r.get('peak_bytes', 0) / 1024:>9.1f} {r.get('net_bytes', 0) / 1024:>8.1f}")
+    lines.append('')
+    lines.append(f"JSON encoding of N records ({result['serializer']} backend, best of 20, ms):")
+    for size, timings in result['encoding'].items():
+        stdlib = timings['dicts_stdlib_ms']
+        lines.append(f"  {size:>6} records: " + ', '.join(
+            f"{name[:-3]} {ms:.3f}" + ('' if ms == stdlib else f" ({stdlib / ms:.1f}x)") for name, ms in timings.items()))
+    lines.append('')
+    lines.append(f"RSS {result['rss_bytes'] / 2**20:.1f} MB; store arrays {result['store_private_bytes'] / 2**20:.1f} MB private, "
+                 f"{result['store_shared_bytes'] / 2**20:.1f} MB in the snapshot")
+    if regressions is not None:
+        lines.append('')
+        lines.extend(['REGRESSIONS:'] + ['  ' + r for r in regressions] if regressions else ['[OK] No regressions against the baseline'])
+    lines.append('=' * 78)
+    return '\n'.join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description='Latency and memory benchmark for app.py')
+    parser.add_argument('--data', default='suppliers.json')
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--only', nargs='*', help='scenario names to run')
+    parser.add_argument('--cache', action='store_true', help='leave the result cache on')
+    parser.add_argument('--json', help='write the results here (use as a later --baseline)')
+    parser.add_argument('--baseline', help='results JSON from an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='allowed slowdown/growth before flagging')
+    parser.add_argument('--output', default='bench_output.txt')
+    args = parser.parse_args()
+
+    result = run(args)
+    regressions = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+    report = format_report(result, regressions)
+    print(report)
+    with open(args.output, 'w') as f:
+        f.write(report + '\n')
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+    sys.exit(1 if regressions else 0)
+
+if __name__ == '__main__':
+    main()
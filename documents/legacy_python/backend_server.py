@@ -6,29 +6,151 @@ Port: 3000
 
 from flask import Flask, jsonify, request
 from flask_cors import CORS
+from collections import OrderedDict
+from concurrent.futures import Future
+from requests.adapters import HTTPAdapter
 import requests
+import threading
 import time
 
 app = Flask(__name__)
 CORS(app)
 
 DATA_SERVER_URL = 'http://localhost:3001'
-MAX_RETRIES = 3
-RETRY_DELAY = 0.5
+REQUEST_TIMEOUT = 5
+CACHE_TTL = 5          # seconds a cached response is served as fresh
+STALE_TTL = 60         # seconds a cached response may be served while it is refreshed
+CACHE_MAX_ENTRIES = 1000  # least recently used responses are dropped beyond this
+BREAKER_THRESHOLD = 3  # consecutive failures before the circuit opens
+BREAKER_RESET = 10     # seconds before an open circuit lets a trial request through
+HEALTH_INTERVAL = 10   # seconds between background probes of the data server
 
-def fetch_from_data_server(endpoint):
-    """Fetch data from data server with retries"""
-    for attempt in range(MAX_RETRIES):
+# One pooled keepalive session shared by every request thread
+session = requests.Session()
+session.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=0))
+
+class CircuitBreaker:
+    """Fail fast while the data server is down instead of sleeping between retries"""
+    def __init__(self, threshold=BREAKER_THRESHOLD, reset_after=BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_after:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        with self.lock:
+            if self.state == "open":
+                return False
+            if self.state == "half-open":
+                # Let exactly one trial request through, re-arm for the rest
+                self.opened_at = time.monotonic()
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+breaker = CircuitBreaker()
+cache = OrderedDict()  # endpoint -> (data, fetched_at), least recently used first
+inflight = {}    # endpoint -> Future shared by concurrent callers
+cache_lock = threading.Lock()
+
+def _fetch_upstream(endpoint):
+    """Single upstream GET; raises on connection errors and bad responses"""
+    if not breaker.allow():
+        raise ConnectionError(f"Data server circuit open (retry in {breaker.reset_after}s)")
+    try:
+        response = session.get(f'{DATA_SERVER_URL}{endpoint}', timeout=REQUEST_TIMEOUT)
+        data = response.json()
+    except Exception:
+        breaker.record_failure()
+        raise
+    # A data server answering 5xx is as unhealthy as one that doesn't answer
+    if response.status_code >= 500:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    return data, response.status_code
+
+def _coalesced_fetch(endpoint):
+    """Fetch endpoint once no matter how many threads ask for it at the same time"""
+    with cache_lock:
+        future = inflight.get(endpoint)
+        leader = future is None
+        if leader:
+            future = inflight[endpoint] = Future()
+    if not leader:
+        return future.result(timeout=REQUEST_TIMEOUT * 2)
+
+    try:
+        data, status = _fetch_upstream(endpoint)
+        if status < 500:
+            with cache_lock:
+                cache[endpoint] = (data, time.monotonic())
+                cache.move_to_end(endpoint)
+                while len(cache) > CACHE_MAX_ENTRIES:
+                    cache.popitem(last=False)
+        future.set_result(data)
+        return data
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with cache_lock:
+            inflight.pop(endpoint, None)
+
+def _refresh_in_background(endpoint):
+    def refresh():
         try:
-            response = requests.get(f'{DATA_SERVER_URL}{endpoint}', timeout=5)
-            return response.json()
-        except requests.exceptions.ConnectionError:
-            if attempt < MAX_RETRIES - 1:
-                time.sleep(RETRY_DELAY)
-            else:
-                return {"error": f"Cannot connect to data server at {DATA_SERVER_URL}"}
+            _coalesced_fetch(endpoint)
         except Exception as e:
-            return {"error": str(e)}
+            print(f"[WARNING] Background refresh of {endpoint} failed: {e}")
+    threading.Thread(target=refresh, daemon=True).start()
+
+def fetch_from_data_server(endpoint):
+    """
+    Fetch data from the data server through the cache
+    Fresh entries are served directly, stale ones are served while a
+    background refresh runs, and stale data is also the fallback on errors
+    """
+    with cache_lock:
+        cached = cache.get(endpoint)
+        if cached:
+            cache.move_to_end(endpoint)
+        refreshing = endpoint in inflight
+    age = time.monotonic() - cached[1] if cached else None
+
+    if cached and age < CACHE_TTL:
+        return cached[0]
+    if cached and age < STALE_TTL:
+        if not refreshing:
+            _refresh_in_background(endpoint)
+        return cached[0]
+
+    try:
+        return _coalesced_fetch(endpoint)
+    except Exception as e:
+        if cached:
+            return cached[0]
+        if isinstance(e, requests.exceptions.ConnectionError):
+            return {"error": f"Cannot connect to data server at {DATA_SERVER_URL}"}
+        return {"error": str(e)}
 
 @app.route('/api/suppliers', methods=['GET'])
 def get_suppliers():
@@ -78,23 +200,65 @@ def get_notes():
     """Get user notes"""
     return jsonify({"success": True, "notes": {}})
 
+# Data server health, refreshed by a background prober and served from memory
+health_state = {"dataServer": "unknown", "checkedAt": None, "latencyMs": None}
+prober_started = False
+prober_lock = threading.Lock()
+
+def probe_data_server():
+    """Refresh health_state forever; never runs on a request thread"""
+    while True:
+        started = time.monotonic()
+        try:
+            session.get(f'{DATA_SERVER_URL}/health', timeout=2).raise_for_status()
+            status = "connected"
+        except Exception:
+            status = "disconnected"
+        health_state.update({
+            "dataServer": status,
+            "checkedAt": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            "latencyMs": round((time.monotonic() - started) * 1000, 1)
+        })
+        time.sleep(HEALTH_INTERVAL)
+
+@app.before_request
+def start_health_prober():
+    global prober_started
+    if prober_started:
+        return
+    with prober_lock:
+        if not prober_started:
+            threading.Thread(target=probe_data_server, daemon=True).start()
+            prober_started = True
+
 @app.route('/health', methods=['GET'])
 def health():
-    """Health check endpoint"""
-    # Try to check if data server is up
-    try:
-        data_health = requests.get(f'{DATA_SERVER_URL}/health', timeout=2).json()
-        data_status = "connected"
-    except:
-        data_status = "disconnected"
-    
+    """Health check endpoint (cached, never calls the data server)"""
     return jsonify({
         "status": "ok",
         "service": "backend-api",
         "port": 3000,
-        "dataServer": data_status
+        "dataServer": health_state["dataServer"],
+        "dataServerCheckedAt": health_state["checkedAt"],
+        "dataServerLatencyMs": health_state["latencyMs"],
+        "circuit": breaker.state
     })
 
+@app.route('/health/live', methods=['GET'])
+def health_live():
+    """Liveness: the process is up and serving"""
+    return jsonify({"status": "ok"})
+
+@app.route('/health/ready', methods=['GET'])
+def health_ready():
+    """Readiness: the last background probe reached the data server"""
+    ready = health_state["dataServer"] == "connected"
+    return jsonify({
+        "status": "ready" if ready else "not ready",
+        "dataServer": health_state["dataServer"],
+        "checkedAt": health_state["checkedAt"]
+    }), 200 if ready else 503
+
 @app.route('/', methods=['GET'])
 def index():
     """Root endpoint"""
@@ -109,7 +273,9 @@ def index():
             "/api/user/profile": "Get user profile",
             "/api/user/favorites": "Get user favorites",
             "/api/user/notes": "Get user notes",
-            "/health": "Health check"
+            "/health": "Health check",
+            "/health/live": "Liveness probe",
+            "/health/ready": "Readiness probe"
         }
     })
 
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Offline US gazetteer for geocoding supplier locations
+Seeded from the CITIES table in expand_suppliers.py and extended with
+other major cities, plus state and region centroids as fallbacks
+"""
+
+import math
+from functools import lru_cache
+
+EARTH_RADIUS_MILES = 3958.8
+
+# (city, state) -> (latitude, longitude)
+CITY_COORDS = {
+    # expand_suppliers.py CITIES
+    ('Birmingham', 'Alabama'): (33.52, -86.80),
+    ('Anchorage', 'Alaska'): (61.22, -149.90),
+    ('Phoenix', 'Arizona'): (33.45, -112.07),
+    ('Little Rock', 'Arkansas'): (34.75, -92.29),
+    ('Sacramento', 'California'): (38.58, -121.49),
+    ('Denver', 'Colorado'): (39.74, -104.99),
+    ('Hartford', 'Connecticut'): (41.76, -72.69),
+    ('Wilmington', 'Delaware'): (39.74, -75.55),
+    ('Jacksonville', 'Florida'): (30.33, -81.66),
+    ('Atlanta', 'Georgia'): (33.75, -84.39),
+    ('Honolulu', 'Hawaii'): (21.31, -157.86),
+    ('Boise', 'Idaho'): (43.62, -116.20),
+    ('Chicago', 'Illinois'): (41.88, -87.63),
+    ('Indianapolis', 'Indiana'): (39.77, -86.16),
+    ('Des Moines', 'Iowa'): (41.59, -93.62),
+    ('Topeka', 'Kansas'): (39.05, -95.68),
+    ('Louisville', 'Kentucky'): (38.25, -85.76),
+    ('New Orleans', 'Louisiana'): (29.95, -90.07),
+    ('Portland', 'Maine'): (43.66, -70.26),
+    ('Baltimore', 'Maryland'): (39.29, -76.61),
+    ('Boston', 'Massachusetts'): (42.36, -71.06),
+    ('Detroit', 'Michigan'): (42.33, -83.05),
+    ('Minneapolis', 'Minnesota'): (44.98, -93.27),
+    ('Jackson', 'Mississippi'): (32.30, -90.18),
+    ('Kansas City', 'Missouri'): (39.10, -94.58),
+    ('Billings', 'Montana'): (45.78, -108.50),
+    ('Omaha', 'Nebraska'): (41.26, -95.93),
+    ('Las Vegas', 'Nevada'): (36.17, -115.14),
+    ('Manchester', 'New Hampshire'): (42.99, -71.46),
+    ('Newark', 'New Jersey'): (40.74, -74.17),
+    ('Albuquerque', 'New Mexico'): (35.08, -106.65),
+    ('New York', 'New York'): (40.71, -74.01),
+    ('Charlotte', 'North Carolina'): (35.23, -80.84),
+    ('Bismarck', 'North Dakota'): (46.81, -100.78),
+    ('Columbus', 'Ohio'): (39.96, -83.00),
+    ('Oklahoma City', 'Oklahoma'): (35.47, -97.52),
+    ('Portland', 'Oregon'): (45.52, -122.68),
+    ('Philadelphia', 'Pennsylvania'): (39.95, -75.17),
+    ('Providence', 'Rhode Island'): (41.82, -71.41),
+    ('Charleston', 'South Carolina'): (32.78, -79.93),
+    ('Sioux Falls', 'South Dakota'): (43.54, -96.73),
+    ('Memphis', 'Tennessee'): (35.15, -90.05),
+    ('Houston', 'Texas'): (29.76, -95.37),
+    ('Salt Lake City', 'Utah'): (40.76, -111.89),
+    ('Montpelier', 'Vermont'): (44.26, -72.58),
+    ('Richmond', 'Virginia'): (37.54, -77.44),
+    ('Seattle', 'Washington'): (47.61, -122.33),
+    ('Charleston', 'West Virginia'): (38.35, -81.63),
+    ('Milwaukee', 'Wisconsin'): (43.04, -87.91),
+    ('Cheyenne', 'Wyoming'): (41.14, -104.82),
+
+    # Additional major cities
+    ('Montgomery', 'Alabama'): (32.38, -86.30),
+    ('Mobile', 'Alabama'): (30.69, -88.04),
+    ('Huntsville', 'Alabama'): (34.73, -86.59),
+    ('Fairbanks', 'Alaska'): (64.84, -147.72),
+    ('Juneau', 'Alaska'): (58.30, -134.42),
+    ('Tucson', 'Arizona'): (32.22, -110.97),
+    ('Mesa', 'Arizona'): (33.42, -111.83),
+    ('Flagstaff', 'Arizona'): (35.20, -111.65),
+    ('Fayetteville', 'Arkansas'): (36.06, -94.16),
+    ('Fort Smith', 'Arkansas'): (35.39, -94.40),
+    ('Los Angeles', 'California'): (34.05, -118.24),
+    ('San Diego', 'California'): (32.72, -117.16),
+    ('San Francisco', 'California'): (37.77, -122.42),
+    ('San Jose', 'California'): (37.34, -121.89),
+    ('Fresno', 'California'): (36.74, -119.79),
+    ('Oakland', 'California'): (37.80, -122.27),
+    ('Bakersfield', 'California'): (35.37, -119.02),
+    ('Riverside', 'California'): (33.95, -117.40),
+    ('Colorado Springs', 'Colorado'): (38.83, -104.82),
+    ('Aurora', 'Colorado'): (39.73, -104.83),
+    ('Fort Collins', 'Colorado'): (40.59, -105.08),
+    ('Bridgeport', 'Connecticut'): (41.19, -73.20),
+    ('New Haven', 'Connecticut'): (41.31, -72.92),
+    ('Dover', 'Delaware'): (39.16, -75.52),
+    ('Miami', 'Florida'): (25.76, -80.19),
+    ('Tampa', 'Florida'): (27.95, -82.46),
+    ('Orlando', 'Florida'): (28.54, -81.38),
+    ('Tallahassee', 'Florida'): (30.44, -84.28),
+    ('Savannah', 'Georgia'): (32.08, -81.09),
+    ('Augusta', 'Georgia'): (33.47, -81.97),
+    ('Columbus', 'Georgia'): (32.46, -84.99),
+    ('Hilo', 'Hawaii'): (19.72, -155.09),
+    ('Idaho Falls', 'Idaho'): (43.49, -112.03),
+    ('Pocatello', 'Idaho'): (42.87, -112.45),
+    ('Springfield', 'Illinois'): (39.78, -89.65),
+    ('Peoria', 'Illinois'): (40.69, -89.59),
+    ('Rockford', 'Illinois'): (42.27, -89.09),
+    ('Fort Wayne', 'Indiana'): (41.08, -85.14),
+    ('Evansville', 'Indiana'): (37.97, -87.56),
+    ('South Bend', 'Indiana'): (41.68, -86.25),
+    ('Cedar Rapids', 'Iowa'): (41.98, -91.67),
+    ('Davenport', 'Iowa'): (41.52, -90.58),
+    ('Wichita', 'Kansas'): (37.69, -97.34),
+    ('Overland Park', 'Kansas'): (38.98, -94.67),
+    ('Lexington', 'Kentucky'): (38.04, -84.50),
+    ('Frankfort', 'Kentucky'): (38.20, -84.87),
+    ('Baton Rouge', 'Louisiana'): (30.45, -91.15),
+    ('Shreveport', 'Louisiana'): (32.53, -93.75),
+    ('Lafayette', 'Louisiana'): (30.22, -92.02),
+    ('Augusta', 'Maine'): (44.31, -69.78),
+    ('Bangor', 'Maine'): (44.80, -68.77),
+    ('Annapolis', 'Maryland'): (38.98, -76.49),
+    ('Frederick', 'Maryland'): (39.41, -77.41),
+    ('Worcester', 'Massachusetts'): (42.26, -71.80),
+    ('Springfield', 'Massachusetts'): (42.10, -72.59),
+    ('Grand Rapids', 'Michigan'): (42.96, -85.67),
+    ('Lansing', 'Michigan'): (42.73, -84.56),
+    ('Ann Arbor', 'Michigan'): (42.28, -83.74),
+    ('Saint Paul', 'Minnesota'): (44.95, -93.09),
+    ('Duluth', 'Minnesota'): (46.79, -92.10),
+    ('Rochester', 'Minnesota'): (44.02, -92.47),
+    ('Gulfport', 'Mississippi'): (30.37, -89.09),
+    ('Hattiesburg', 'Mississippi'): (31.33, -89.29),
+    ('St. Louis', 'Missouri'): (38.63, -90.20),
+    ('Springfield', 'Missouri'): (37.21, -93.29),
+    ('Jefferson City', 'Missouri'): (38.58, -92.17),
+    ('Missoula', 'Montana'): (46.87, -113.99),
+    ('Helena', 'Montana'): (46.59, -112.04),
+    ('Bozeman', 'Montana'): (45.68, -111.04),
+    ('Lincoln', 'Nebraska'): (40.81, -96.68),
+    ('Grand Island', 'Nebraska'): (40.93, -98.34),
+    ('Reno', 'Nevada'): (39.53, -119.81),
+    ('Carson City', 'Nevada'): (39.16, -119.77),
+    ('Henderson', 'Nevada'): (36.04, -114.98),
+    ('Concord', 'New Hampshire'): (43.21, -71.54),
+    ('Nashua', 'New Hampshire'): (42.77, -71.47),
+    ('Jersey City', 'New Jersey'): (40.73, -74.08),
+    ('Trenton', 'New Jersey'): (40.22, -74.76),
+    ('Paterson', 'New Jersey'): (40.92, -74.17),
+    ('Santa Fe', 'New Mexico'): (35.69, -105.94),
+    ('Las Cruces', 'New Mexico'): (32.32, -106.76),
+    ('Buffalo', 'New York'): (42.89, -78.88),
+    ('Rochester', 'New York'): (43.16, -77.61),
+    ('Albany', 'New York'): (42.65, -73.76),
+    ('Syracuse', 'New York'): (43.05, -76.15),
+    ('Raleigh', 'North Carolina'): (35.78, -78.64),
+    ('Greensboro', 'North Carolina'): (36.07, -79.79),
+    ('Durham', 'North Carolina'): (35.99, -78.90),
+    ('Wilmington', 'North Carolina'): (34.23, -77.94),
+    ('Fargo', 'North Dakota'): (46.88, -96.79),
+    ('Grand Forks', 'North Dakota'): (47.93, -97.03),
+    ('Cleveland', 'Ohio'): (41.50, -81.69),
+    ('Cincinnati', 'Ohio'): (39.10, -84.51),
+    ('Toledo', 'Ohio'): (41.65, -83.54),
+    ('Dayton', 'Ohio'): (39.76, -84.19),
+    ('Tulsa', 'Oklahoma'): (36.15, -95.99),
+    ('Norman', 'Oklahoma'): (35.22, -97.44),
+    ('Eugene', 'Oregon'): (44.05, -123.09),
+    ('Salem', 'Oregon'): (44.94, -123.04),
+    ('Bend', 'Oregon'): (44.06, -121.32),
+    ('Pittsburgh', 'Pennsylvania'): (40.44, -79.99),
+    ('Harrisburg', 'Pennsylvania'): (40.27, -76.88),
+    ('Allentown', 'Pennsylvania'): (40.60, -75.49),
+    ('Erie', 'Pennsylvania'): (42.13, -80.09),
+    ('Warwick', 'Rhode Island'): (41.70, -71.42),
+    ('Columbia', 'South Carolina'): (34.00, -81.03),
+    ('Greenville', 'South Carolina'): (34.85, -82.40),
+    ('Rapid City', 'South Dakota'): (44.08, -103.23),
+    ('Pierre', 'South Dakota'): (44.37, -100.35),
+    ('Nashville', 'Tennessee'): (36.16, -86.78),
+    ('Knoxville', 'Tennessee'): (35.96, -83.92),
+    ('Chattanooga', 'Tennessee'): (35.05, -85.31),
+    ('Dallas', 'Texas'): (32.78, -96.80),
+    ('San Antonio', 'Texas'): (29.42, -98.49),
+    ('Austin', 'Texas'): (30.27, -97.74),
+    ('Fort Worth', 'Texas'): (32.76, -97.33),
+    ('El Paso', 'Texas'): (31.76, -106.49),
+    ('Corpus Christi', 'Texas'): (27.80, -97.40),
+    ('Lubbock', 'Texas'): (33.58, -101.86),
+    ('Provo', 'Utah'): (40.23, -111.66),
+    ('Ogden', 'Utah'): (41.22, -111.97),
+    ('St. George', 'Utah'): (37.10, -113.58),
+    ('Burlington', 'Vermont'): (44.48, -73.21),
+    ('Rutland', 'Vermont'): (43.61, -72.97),
+    ('Virginia Beach', 'Virginia'): (36.85, -75.98),
+    ('Norfolk', 'Virginia'): (36.85, -76.29),
+    ('Roanoke', 'Virginia'): (37.27, -79.94),
+    ('Arlington', 'Virginia'): (38.88, -77.10),
+    ('Spokane', 'Washington'): (47.66, -117.43),
+    ('Tacoma', 'Washington'): (47.25, -122.44),
+    ('Olympia', 'Washington'): (47.04, -122.90),
+    ('Huntington', 'West Virginia'): (38.42, -82.45),
+    ('Morgantown', 'West Virginia'): (39.63, -79.96),
+    ('Madison', 'Wisconsin'): (43.07, -89.40),
+    ('Green Bay', 'Wisconsin'): (44.51, -88.01),
+    ('Casper', 'Wyoming'): (42.87, -106.31),
+    ('Laramie', 'Wyoming'): (41.31, -105.59),
+    ('Washington', 'District of Columbia'): (38.91, -77.04),
+}
+
+# Approximate geographic centers, used when the city is unknown
+STATE_CENTROIDS = {
+    'Alabama': (32.81, -86.79), 'Alaska': (61.37, -152.40), 'Arizona': (33.73, -111.43),
+    'Arkansas': (34.97, -92.37), 'California': (36.12, -119.68), 'Colorado': (39.06, -105.31),
+    'Connecticut': (41.60, -72.76), 'Delaware': (39.32, -75.51), 'Florida': (27.77, -81.69),
+    'Georgia': (33.04, -83.64), 'Hawaii': (21.09, -157.50), 'Idaho': (44.24, -114.48),
+    'Illinois': (40.35, -88.99), 'Indiana': (39.85, -86.26), 'Iowa': (42.01, -93.21),
+    'Kansas': (38.53, -96.73), 'Kentucky': (37.67, -84.67), 'Louisiana': (31.17, -91.87),
+    'Maine': (44.69, -69.38), 'Maryland': (39.06, -76.80), 'Massachusetts': (42.23, -71.53),
+    'Michigan': (43.33, -84.54), 'Minnesota': (45.69, -93.90), 'Mississippi': (32.74, -89.68),
+    'Missouri': (38.46, -92.29), 'Montana': (46.92, -110.45), 'Nebraska': (41.13, -98.27),
+    'Nevada': (38.31, -117.06), 'New Hampshire': (43.45, -71.56), 'New Jersey': (40.30, -74.52),
+    'New Mexico': (34.84, -106.25), 'New York': (42.17, -74.95), 'North Carolina': (35.63, -79.81),
+    'North Dakota': (47.53, -99.78), 'Ohio': (40.39, -82.76), 'Oklahoma': (35.57, -96.93),
+    'Oregon': (44.57, -122.07), 'Pennsylvania': (40.59, -77.21), 'Rhode Island': (41.68, -71.51),
+    'South Carolina': (33.86, -80.95), 'South Dakota': (44.30, -99.44), 'Tennessee': (35.75, -86.69),
+    'Texas': (31.05, -97.56), 'Utah': (40.15, -111.86), 'Vermont': (44.05, -72.71),
+    'Virginia': (37.77, -78.17), 'Washington': (47.40, -121.49), 'West Virginia': (38.49, -80.95),
+    'Wisconsin': (44.27, -89.62), 'Wyoming': (42.76, -107.30),
+    'District of Columbia': (38.90, -77.03),
+}
+
+REGION_CENTROIDS = {
+    'Northeast': (41.50, -74.50),
+    'Southeast': (33.50, -84.50),
+    'Midwest': (41.90, -91.50),
+    'Southwest': (33.50, -103.00),
+    'West': (41.00, -116.00),
+}
+
+STATE_ABBREVIATIONS = {
+    'AL': 'Alabama', 'AK': 'Alaska', 'AZ': 'Arizona', 'AR': 'Arkansas', 'CA': 'California',
+    'CO': 'Colorado', 'CT': 'Connecticut', 'DE': 'Delaware', 'FL': 'Florida', 'GA': 'Georgia',
+    'HI': 'Hawaii', 'ID': 'Idaho', 'IL': 'Illinois', 'IN': 'Indiana', 'IA': 'Iowa',
+    'KS': 'Kansas', 'KY': 'Kentucky', 'LA': 'Louisiana', 'ME': 'Maine', 'MD': 'Maryland',
+    'MA': 'Massachusetts', 'MI': 'Michigan', 'MN': 'Minnesota', 'MS': 'Mississippi', 'MO': 'Missouri',
+    'MT': 'Montana', 'NE': 'Nebraska', 'NV': 'Nevada', 'NH': 'New Hampshire', 'NJ': 'New Jersey',
+    'NM': 'New Mexico', 'NY': 'New York', 'NC': 'North Carolina', 'ND': 'North Dakota', 'OH': 'Ohio',
+    'OK': 'Oklahoma', 'OR': 'Oregon', 'PA': 'Pennsylvania', 'RI': 'Rhode Island', 'SC': 'South Carolina',
+    'SD': 'South Dakota', 'TN': 'Tennessee', 'TX': 'Texas', 'UT': 'Utah', 'VT': 'Vermont',
+    'VA': 'Virginia', 'WA': 'Washington', 'WV': 'West Virginia', 'WI': 'Wisconsin', 'WY': 'Wyoming',
+    'DC': 'District of Columbia',
+}
+
+_CITY_LOOKUP = {(city.lower(), state.lower()): coords for (city, state), coords in CITY_COORDS.items()}
+_STATE_LOOKUP = {state.lower(): coords for state, coords in STATE_CENTROIDS.items()}
+_STATE_NAMES = {state.lower(): state for state in STATE_CENTROIDS}
+_STATE_NAMES.update({abbr.lower(): state for abbr, state in STATE_ABBREVIATIONS.items()})
+
+def normalize_state(state):
+    """Map a state name or two letter abbreviation to its full name"""
+    if not state:
+        return None
+    return _STATE_NAMES.get(state.strip().lower())
+
+def parse_city(location):
+    """
+    Pull the city out of a location string
+    "239 Main St, Phoenix, Arizona 85776" -> "Phoenix", "Dallas, TX" -> "Dallas"
+    """
+    if not location:
+        return None
+    parts = [p.strip() for p in location.split(',') if p.strip()]
+    if len(parts) >= 3:
+        return parts[-2]
+    if len(parts) == 2:
+        return parts[0]
+    return None
+
+@lru_cache(maxsize=4096)
+def geocode(city=None, state=None, region=None):
+    """
+    Resolve to (lat, lon, precision) where precision is 'city', 'state' or 'region'
+    Returns None when nothing matches
+    """
+    state_name = normalize_state(state)
+    if city and state_name:
+        coords = _CITY_LOOKUP.get((city.strip().lower(), state_name.lower()))
+        if coords:
+            return coords[0], coords[1], 'city'
+    if state_name:
+        coords = _STATE_LOOKUP[state_name.lower()]
+        return coords[0], coords[1], 'state'
+    if region in REGION_CENTROIDS:
+        coords = REGION_CENTROIDS[region]
+        return coords[0], coords[1], 'region'
+    return None
+
+def geocode_supplier(supplier):
+    """Geocode a supplier record from its location, state and region fields"""
+    location = supplier.get('location')
+    state = supplier.get('state')
+    if not state and location:
+        # "Dallas, TX" style locations carry the state (and maybe a zip) as the last part
+        words = location.split(',')[-1].split()
+        if words and words[-1].isdigit():
+            words = words[:-1]
+        state = ' '.join(words)
+    return geocode(parse_city(location), state, supplier.get('region'))
+
+def to_unit_vector(lat, lon):
+    """Project a lat/lon onto the unit sphere so straight-line distance orders like great-circle distance"""
+    phi = math.radians(lat)
+    lam = math.radians(lon)
+    return (math.cos(phi) * math.cos(lam), math.cos(phi) * math.sin(lam), math.sin(phi))
+
+def haversine_miles(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlam = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlam / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * math.asin(min(1.0, math.sqrt(a)))
+
+def miles_to_chord(miles):
+    """Convert a great-circle distance to the equivalent unit-sphere chord length"""
+    return 2 * math.sin(min(math.pi, miles / EARTH_RADIUS_MILES) / 2)
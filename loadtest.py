@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+Load test for app.py - replays dashboard traffic with many virtual users
+
+Each virtual user logs in once and then loops: pick an action from the
+traffic mix (paginated list, typeahead search, filters, detail view,
+favorites, ranked list), run it, think, repeat. The number of users follows
+a ramp profile of stages; every stage is reported separately so the last
+stage that still meets the latency SLO is the saturation point of the
+configuration under test.
+
+Usage:
+    python loadtest.py --url http://localhost:3000 --ramp 10:30,25:30,50:30,100:30
+    python loadtest.py --mix list=5,search=3,filter=2 --workers 4 --target-rps 800
+    python loadtest.py --json results.json   # keep numbers to compare configs
+
+Only the standard library is used (asyncio streams speak HTTP/1.1 directly).
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+from urllib.parse import urlencode, urlsplit
+
+DEFAULT_MIX = {
+    'list': 30,
+    'search': 25,
+    'filter': 20,
+    'detail': 12,
+    'favorites': 8,
+    'ranked': 5
+}
+DEFAULT_RAMP = '10:20,25:20,50:20,100:20,200:20'
+TYPEAHEAD_DELAY = 0.12
+PAGE_SIZE = 50
+
+# ==================== HTTP CLIENT ====================
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection; reconnects when the server closes it"""
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def close(self):
+        if self.writer:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except Exception:
+                pass
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=None, headers=None):
+        """Send one request and return (status, body bytes)"""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        payload = json.dumps(body).encode() if body is not None else b''
+        head = f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nAccept: application/json\r\n"
+        head += ''.join(f"{name}: {value}\r\n" for name, value in (headers or {}).items())
+        if body is not None:
+            head += f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n"
+        self.writer.write(head.encode() + b'\r\n' + payload)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError('server closed the connection')
+        version, status = status_line.split(b' ', 2)[:2]
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    await self.reader.readline()
+                    break
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readline()
+            data = b''.join(chunks)
+        elif 'content-length' in headers:
+            data = await self.reader.readexactly(int(headers['content-length']))
+        else:
+            data = await self.reader.read()
+
+        if version == b'HTTP/1.0' or headers.get('connection', '').lower() == 'close' or 'content-length' not in headers and 'transfer-encoding' not in headers:
+            await self.close()
+        return int(status), data
+
+# ==================== METRICS ====================
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(int(math.ceil(pct / 100 * len(sorted_values))) - 1, 0)
+    return sorted_values[rank]
+
+def summarize(samples, seconds):
+    """Throughput, error rate and latency percentiles (ms) for (end, action, ms, ok) samples"""
+    latencies = sorted(s[2] for s in samples)
+    errors = sum(1 for s in samples if not s[3])
+    return {
+        'requests': len(samples),
+        'rps': round(len(samples) / seconds, 1) if seconds > 0 else 0.0,
+        'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+        'p50': round(percentile(latencies, 50), 1) if samples else None,
+        'p90': round(percentile(latencies, 90), 1) if samples else None,
+        'p99': round(percentile(latencies, 99), 1) if samples else None,
+        'max': round(latencies[-1], 1) if samples else None
+    }
+
+class Recorder:
+    """Collects every request outcome; summaries are computed after the run"""
+    def __init__(self):
+        self.samples = []
+        self.errors = {}
+
+    def add(self, action, started, ok, reason=None):
+        end = time.perf_counter()
+        self.samples.append((end, action, (end - started) * 1000, ok))
+        if not ok:
+            self.errors[reason] = self.errors.get(reason, 0) + 1
+
+    def window(self, start, end):
+        return [s for s in self.samples if start <= s[0] < end]
+
+# ==================== TRAFFIC ====================
+
+class Catalog:
+    """Ids and filter values harvested from the server so requests hit real data"""
+    def __init__(self, suppliers):
+        self.ids = [s['id'] for s in suppliers]
+        self.states = sorted({s.get('state') for s in suppliers if s.get('state')})
+        self.categories = sorted({s.get('category') for s in suppliers if s.get('category')})
+        words = set()
+        for s in suppliers:
+            words.update(w.lower() for w in s.get('name', '').split() if len(w) > 3 and w.isalpha())
+        self.words = sorted(words) or ['supply']
+
+class VirtualUser:
+    """One dashboard session: log in, then run actions from the mix until stopped"""
+    def __init__(self, number, args, catalog, recorder, total):
+        self.number = number
+        self.args = args
+        self.catalog = catalog
+        self.recorder = recorder
+        self.total = total
+        self.random = random.Random(args.seed * 100003 + number)
+        self.connection = Connection(args.host, args.port)
+        self.user_id = None
+        self.session_id = None
+        self.actions = list(args.mix)
+        self.weights = [args.mix[a] for a in self.actions]
+
+    async def call(self, action, method, path, body=None):
+        started = time.perf_counter()
+        try:
+            # Identify the session so the server's rate limiter gives each user its own bucket,
+            # and tell it when this client gives up so it stops working on the request too
+            headers = {'X-Request-Timeout-Ms': f"{self.args.timeout * 1000:g}"}
+            if self.session_id:
+                headers['X-Session-Id'] = self.session_id
+            status, data = await asyncio.wait_for(self.connection.request(method, path, body, headers), self.args.timeout)
+        except asyncio.TimeoutError:
+            await self.connection.close()
+            self.recorder.add(action, started, False, 'timeout')
+            return None
+        except (OSError, ValueError, asyncio.IncompleteReadError) as e:
+            await self.connection.close()
+            self.recorder.add(action, started, False, type(e).__name__)
+            return None
+        ok = status < 400
+        self.recorder.add(action, started, ok, None if ok else f"HTTP {status}")
+        return data if ok else None
+
+    async def login(self):
+        data = await self.call('login', 'POST', '/api/auth/login', {
+            'email': f"loadtest{self.number}@example.com",
+            'name': f"Load Test {self.number}"
+        })
+        if data:
+            login = json.loads(data)
+            self.user_id, self.session_id = login.get('user_id'), login.get('session_id')
+
+    async def list(self):
+        pages = max(self.total // PAGE_SIZE, 1)
+        page = 1 if self.random.random() < 0.5 else self.random.randint(1, pages)
+        await self.call('list', 'GET', '/api/suppliers?' + urlencode({'page': page, 'limit': PAGE_SIZE}))
+
+    async def search(self):
+        # Typeahead: one request per keystroke of a word from the catalog
+        word = self.random.choice(self.catalog.words)
+        for end in range(2, min(len(word), 6) + 1):
+            await self.call('search', 'POST', '/api/suppliers/search', {'q': word[:end]})
+            await asyncio.sleep(TYPEAHEAD_DELAY)
+
+    async def filter(self):
+        body = {}
+        if self.catalog.states and self.random.random() < 0.6:
+            body['state'] = self.random.choice(self.catalog.states)
+        if self.catalog.categories and self.random.random() < 0.6:
+            body['category'] = self.random.choice(self.catalog.categories)
+        if self.random.random() < 0.4:
+            body['minRating'] = self.random.choice([3, 3.5, 4, 4.5])
+        if self.random.random() < 0.3:
+            body['sortBy'], body['order'] = self.random.choice(['rating', 'leadTime', 'stockLevel']), 'desc'
+        await self.call('filter', 'POST', '/api/suppliers/filter', body)
+
+    async def detail(self):
+        await self.call('detail', 'GET', f"/api/suppliers/{self.random.choice(self.catalog.ids)}")
+
+    async def favorites(self):
+        if self.user_id is None:
+            await self.login()
+        if self.user_id is not None:
+            await self.call('favorites', 'GET', '/api/auth/user?' + urlencode({'user_id': self.user_id}))
+
+    async def ranked(self):
+        await self.call('ranked', 'GET', '/api/suppliers/ranked?' + urlencode({'limit': 20}))
+
+    async def run(self):
+        try:
+            await self.login()
+            while True:
+                action = self.random.choices(self.actions, self.weights)[0]
+                await getattr(self, action)()
+                await asyncio.sleep(self.random.expovariate(1 / self.args.think) if self.args.think > 0 else 0)
+        finally:
+            await self.connection.close()
+
+# ==================== RUNNER ====================
+
+def parse_mix(text):
+    """'list=5,search=3' -> {'list': 5.0, 'search': 3.0}"""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown action '{name}' (choose from {', '.join(DEFAULT_MIX)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+def parse_ramp(text):
+    """'10:30,50:60' -> [(10 users, 30 s), (50 users, 60 s)]"""
+    stages = []
+    for part in text.split(','):
+        users, _, seconds = part.partition(':')
+        stages.append((int(users), float(seconds or 30)))
+    return stages
+
+async def fetch_catalog(args):
+    connection = Connection(args.host, args.port)
+    try:
+        status, data = await connection.request('GET', '/api/suppliers?' + urlencode({'page': 1, 'limit': 500}))
+    finally:
+        await connection.close()
+    if status != 200:
+        raise RuntimeError(f"GET /api/suppliers returned {status} - is the server ready?")
+    payload = json.loads(data)
+    return Catalog(payload['data']), payload.get('total', len(payload['data']))
+
+async def run(args):
+    catalog, total = await fetch_catalog(args)
+    print(f"[OK] {total} suppliers on {args.url}; {len(catalog.words)} search words, {len(catalog.states)} states")
+    recorder = Recorder()
+    users = []
+    stages = []
+    started = time.perf_counter()
+    for number, (count, seconds) in enumerate(parse_ramp(args.ramp), 1):
+        while len(users) < count:
+            users.append(asyncio.create_task(VirtualUser(len(users), args, catalog, recorder, total).run()))
+        while len(users) > count:
+            users.pop().cancel()
+        stage_start = time.perf_counter()
+        print(f"[STAGE {number}] {count} users for {seconds:.0f}s")
+        next_report = stage_start + args.interval
+        while time.perf_counter() < stage_start + seconds:
+            await asyncio.sleep(min(next_report, stage_start + seconds) - time.perf_counter())
+            now = time.perf_counter()
+            if now >= next_report - 1e-3:
+                s = summarize(recorder.window(next_report - args.interval, now), args.interval)
+                print(f"  t={now - started:6.1f}s  {s['rps']:8.1f} req/s  p50 {s['p50']} ms  "
+                      f"p99 {s['p99']} ms  errors {s['error_rate'] * 100:.1f}%")
+                next_report += args.interval
+        # Skip the first second of each stage so new users' logins and ramp-up don't skew it
+        window = recorder.window(stage_start + min(1.0, seconds / 4), time.perf_counter())
+        stages.append({'users': count, 'seconds': seconds, **summarize(window, seconds - min(1.0, seconds / 4))})
+    for task in users:
+        task.cancel()
+    await asyncio.gather(*users, return_exceptions=True)
+    return recorder, stages, time.perf_counter() - started
+
+def saturation(stages, args):
+    """
+    Last stage that met the SLO (p99 and error rate) while throughput was
+    still growing. Adding users past it only adds queueing.
+    """
+    best = None
+    for stage in stages:
+        within_slo = stage['p99'] is not None and stage['p99'] <= args.slo_ms and stage['error_rate'] <= args.max_error_rate
+        growing = best is None or stage['rps'] >= best['rps'] * 1.05
+        stage['saturated'] = not (within_slo and growing)
+        if not stage['saturated']:
+            best = stage
+        else:
+            break
+    return best
+
+def report(args, recorder, stages, elapsed):
+    print("\n" + "=" * 70)
+    print(f"LOAD TEST REPORT - {args.url} ({args.workers or '?'} workers)")
+    print("=" * 70)
+    print(f"{'users':>6} {'req/s':>9} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8} {'errors':>7}")
+    for stage in stages:
+        flag = '  <- saturated' if stage.get('saturated') else ''
+        print(f"{stage['users']:>6} {stage['rps']:>9.1f} {stage['p50'] or 0:>8.1f} {stage['p90'] or 0:>8.1f} "
+              f"{stage['p99'] or 0:>8.1f} {stage['max'] or 0:>8.1f} {stage['error_rate'] * 100:>6.1f}%{flag}")
+
+    routes = {}
+    for sample in recorder.samples:
+        routes.setdefault(sample[1], []).append(sample)
+    print(f"\n{'action':<10} {'requests':>9} {'p50':>8} {'p99':>8} {'errors':>7}")
+    per_route = {}
+    for action, samples in sorted(routes.items()):
+        s = per_route[action] = summarize(samples, elapsed)
+        print(f"{action:<10} {s['requests']:>9} {s['p50']:>8.1f} {s['p99']:>8.1f} {s['error_rate'] * 100:>6.1f}%")
+    if recorder.errors:
+        print("\nErrors: " + ", ".join(f"{k}: {v}" for k, v in sorted(recorder.errors.items(), key=lambda e: -e[1])))
+
+    best = saturation(stages, args)
+    result = {'url': args.url, 'workers': args.workers, 'mix': args.mix, 'slo_ms': args.slo_ms,
+              'stages': stages, 'routes': per_route, 'errors': recorder.errors, 'saturation': best}
+    print()
+    if best is None:
+        print(f"[WARNING] Even the first stage missed the SLO (p99 <= {args.slo_ms} ms, errors <= {args.max_error_rate * 100:.1f}%)")
+    else:
+        note = '' if stages[-1].get('saturated') else ' (not reached - extend the ramp)'
+        print(f"[OK] Saturation point: {best['users']} users, {best['rps']:.1f} req/s at p99 {best['p99']} ms{note}")
+        if args.target_rps:
+            instances = math.ceil(args.target_rps / best['rps'])
+            result['instances_needed'] = instances
+            line = f"[OK] {args.target_rps} req/s needs {instances} instance(s) of this configuration"
+            if args.workers:
+                result['workers_needed'] = math.ceil(args.target_rps / (best['rps'] / args.workers))
+                line += f" (~{result['workers_needed']} workers)"
+            print(line)
+    print("=" * 70)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay dashboard traffic against app.py')
+    parser.add_argument('--url', default='http://localhost:3000')
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX,
+                        help=f"action weights, e.g. list=5,search=3 (actions: {', '.join(DEFAULT_MIX)})")
+    parser.add_argument('--ramp', default=DEFAULT_RAMP, help='stages as users:seconds, comma separated')
+    parser.add_argument('--think', type=float, default=0.5, help='mean think time between actions (s)')
+    parser.add_argument('--timeout', type=float, default=10.0, help='per request timeout (s)')
+    parser.add_argument('--interval', type=float, default=5.0, help='seconds between progress lines')
+    parser.add_argument('--slo-ms', type=float, default=500.0, help='p99 latency a stage must stay under')
+    parser.add_argument('--max-error-rate', type=float, default=0.01)
+    parser.add_argument('--workers', type=int, help='worker count of the server under test (for the report)')
+    parser.add_argument('--target-rps', type=float, help='size the deployment for this request rate')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='also write the report to this file')
+    args = parser.parse_args()
+
+    url = urlsplit(args.url)
+    if url.scheme != 'http':
+        parser.error('only http:// URLs are supported')
+    args.host, args.port = url.hostname, url.port or 80
+
+    try:
+        recorder, stages, elapsed = asyncio.run(run(args))
+    except (OSError, RuntimeError) as e:
+        print(f"[ERROR] {e}")
+        print("  Make sure the server is running: python app.py")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        sys.exit(130)
+
+    result = report(args, recorder, stages, elapsed)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"[OK] Wrote {args.json}")
+
+if __name__ == '__main__':
+    main()
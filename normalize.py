@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Load-time data-quality pass over supplier records
+suppliers.json mixes scraper output, expand_suppliers.py output and fallback
+data with different schemas. Every record is brought to one typed shape
+(derived fields filled, types coerced) before it reaches the store, and
+whatever was fixed or rejected is counted for the load report.
+"""
+
+import math
+import multiprocessing
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+from gazetteer import normalize_state
+
+# Bumped whenever normalize_supplier() changes what it produces
+NORMALIZE_VERSION = 1
+# Files smaller than this are normalized in process; pool start-up isn't worth it
+PARALLEL_MIN_RECORDS = 20000
+CHUNK_RECORDS = 10000
+REJECTION_SAMPLES = 50
+
+# Same regions as expand_suppliers.py
+REGION_STATES = {
+    'Northeast': ['Connecticut', 'Delaware', 'Maine', 'Maryland', 'Massachusetts', 'New Hampshire', 'New Jersey',
+                  'New York', 'Pennsylvania', 'Rhode Island', 'Vermont', 'West Virginia', 'District of Columbia'],
+    'Southeast': ['Alabama', 'Arkansas', 'Florida', 'Georgia', 'Kentucky', 'Louisiana', 'Mississippi',
+                  'North Carolina', 'South Carolina', 'Tennessee', 'Virginia'],
+    'Midwest': ['Illinois', 'Indiana', 'Iowa', 'Kansas', 'Michigan', 'Minnesota', 'Missouri', 'Nebraska',
+                'North Dakota', 'Ohio', 'South Dakota', 'Wisconsin'],
+    'Southwest': ['Arizona', 'New Mexico', 'Oklahoma', 'Texas'],
+    'West': ['Alaska', 'California', 'Colorado', 'Hawaii', 'Idaho', 'Montana', 'Nevada', 'Oregon', 'Utah',
+             'Washington', 'Wyoming'],
+}
+STATE_REGION = {state: region for region, states in REGION_STATES.items() for state in states}
+
+DEFAULT_CATEGORY = 'Uncategorized'
+STRING_FIELDS = ('location', 'phone', 'source', 'category', 'region', 'leadTime', 'responseTime', 'size', 'priceRange')
+# field -> (integer, low, high, default when missing)
+NUMBER_FIELDS = {
+    'rating': (False, 0, 5, 0.0),
+    'reviews': (True, 0, None, 0),
+    'stockLevel': (True, 0, None, 0),
+    'minimumOrder': (True, 0, None, None),
+    'aiScore': (False, 0, 100, None),
+}
+BOOLEAN_WORDS = {'true': True, 'yes': True, 'y': True, '1': True, 'false': False, 'no': False, 'n': False, '0': False, '': False}
+LIST_FIELDS = ('products', 'certifications')
+TIMESTAMP_FIELDS = ('lastStockCheck', 'lastUpdated')
+
+def to_number(value, integer):
+    """int/float (or numeric string like "1,200") as int or float; None if not a finite number"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str):
+        try:
+            value = float(value.replace(',', '').strip())
+        except ValueError:
+            return None
+    if not isinstance(value, (int, float)) or (isinstance(value, float) and not math.isfinite(value)):
+        return None
+    if integer:
+        return int(round(value))
+    return value
+
+def to_timestamp(value):
+    """ISO timestamp string (epoch seconds are converted), or None if unparseable"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value):
+        return datetime.fromtimestamp(value, timezone.utc).replace(tzinfo=None).isoformat()
+    if isinstance(value, str):
+        try:
+            datetime.fromisoformat(value.strip())
+            return value.strip()
+        except ValueError:
+            return None
+    return None
+
+def state_from_location(location):
+    """State named in the last part of a location like 'Dallas, TX' or 'Phoenix, Arizona 85776'"""
+    words = location.split(',')[-1].split()
+    if words and words[-1].isdigit():
+        words = words[:-1]
+    return normalize_state(' '.join(words))
+
+def normalize_supplier(record):
+    """
+    Bring one record to the store's schema. Returns (record, fixes, error):
+    record is the input itself when nothing needed fixing, a fixed copy
+    otherwise, or None with error when it can't be used at all (no object,
+    id or name). fixes lists 'field: what was done' strings.
+    """
+    if not isinstance(record, dict):
+        return None, [], 'record must be a JSON object'
+    supplier_id = to_number(record.get('id'), True) if not isinstance(record.get('id'), float) or record['id'].is_integer() else None
+    if supplier_id is None or not 0 < supplier_id < 2 ** 63:
+        return None, [], 'id must be a positive integer'
+    name = record.get('name')
+    if not isinstance(name, str) or not name.strip():
+        return None, [], 'missing name'
+
+    out = record
+    fixes = []
+
+    def fix(field, value, why):
+        nonlocal out
+        if out is record:
+            out = dict(record)
+        if value is None:
+            out.pop(field, None)
+        else:
+            out[field] = value
+        fixes.append(f"{field}: {why}")
+
+    if record['id'] != supplier_id or type(record['id']) is not int:
+        fix('id', supplier_id, 'coerced to integer')
+    if name != name.strip():
+        fix('name', name.strip(), 'trimmed')
+
+    for field in STRING_FIELDS:
+        value = out.get(field)
+        if value is None:
+            continue
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            fix(field, str(value), 'coerced to string')
+        elif not isinstance(value, str):
+            fix(field, None, f"dropped {type(value).__name__}")
+        elif not value.strip():
+            fix(field, None, 'dropped empty string')
+        elif value != value.strip():
+            fix(field, value.strip(), 'trimmed')
+
+    state = out.get('state')
+    if isinstance(state, str) and state.strip():
+        canonical = normalize_state(state)
+        if canonical and canonical != state:
+            fix('state', canonical, 'expanded to full state name')
+        elif not canonical:
+            fixes.append('state: unknown, kept as is')
+    elif state is not None:
+        fix('state', None, 'dropped non-string')
+    if not out.get('state') and out.get('location'):
+        derived = state_from_location(out['location'])
+        if derived:
+            fix('state', derived, 'derived from location')
+    if not out.get('region') and STATE_REGION.get(out.get('state')):
+        fix('region', STATE_REGION[out['state']], 'derived from state')
+    if not out.get('category'):
+        fix('category', DEFAULT_CATEGORY, f"missing, set to {DEFAULT_CATEGORY}")
+
+    for field, (integer, low, high, default) in NUMBER_FIELDS.items():
+        value = out.get(field)
+        if value is None:
+            if default is not None:
+                fix(field, default, 'missing, set to default')
+            continue
+        number = to_number(value, integer)
+        if number is None:
+            fix(field, default, 'not a number, reset' if default is not None else 'not a number, dropped')
+            continue
+        clamped = max(number, low) if high is None else min(max(number, low), high)
+        if clamped != number:
+            fix(field, clamped, 'out of range, clamped')
+        elif number != value or type(number) is not type(value):
+            fix(field, number, f"coerced from {type(value).__name__}")
+
+    value = out.get('walmartVerified')
+    if not isinstance(value, bool):
+        word = str(value).strip().lower() if value is not None else ''
+        fix('walmartVerified', BOOLEAN_WORDS.get(word, False), 'missing, set to false' if value is None else 'coerced to boolean')
+    value = out.get('inStock')
+    if not isinstance(value, bool):
+        if value is None:
+            fix('inStock', out['stockLevel'] > 0, 'derived from stockLevel')
+        else:
+            fix('inStock', BOOLEAN_WORDS.get(str(value).strip().lower(), out['stockLevel'] > 0), 'coerced to boolean')
+
+    for field in LIST_FIELDS:
+        value = out.get(field)
+        if value is None:
+            fix(field, [], 'missing, set to empty list')
+        elif isinstance(value, str):
+            fix(field, [part.strip() for part in value.split(',') if part.strip()], 'split comma separated string')
+        elif not isinstance(value, list):
+            fix(field, [], f"dropped {type(value).__name__}")
+        elif not all(isinstance(item, str) for item in value):
+            fix(field, [str(item) for item in value if item is not None and not isinstance(item, (dict, list))],
+                'coerced items to strings')
+
+    for field in TIMESTAMP_FIELDS:
+        value = out.get(field)
+        if value is None:
+            continue
+        timestamp = to_timestamp(value)
+        if timestamp != value:
+            fix(field, timestamp, 'converted epoch seconds' if timestamp else 'unparseable, dropped')
+    return out, fixes, None
+
+def normalize_chunk(records, start=0):
+    """
+    normalize_supplier() over records; returns only what differs from the
+    input (so little crosses the process boundary): ([(index, record)]
+    for fixed records, [(index, id, error)] for rejected ones, fix counts)
+    """
+    fixed = []
+    rejected = []
+    counts = Counter()
+    for index, record in enumerate(records, start=start):
+        clean, fixes, error = normalize_supplier(record)
+        if error:
+            rejected.append((index, record.get('id') if isinstance(record, dict) else None, error))
+            continue
+        if clean is not record:
+            fixed.append((index, clean))
+        counts.update(fixes)
+    return fixed, rejected, counts
+
+def pool_context():
+    """
+    forkserver where available, else spawn. The load runs on a background
+    thread while requests are served, and forking a multi-threaded process
+    can leave a worker holding a lock some other thread had taken
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+def normalize_suppliers(records, workers=0, chunk_size=CHUNK_RECORDS):
+    """
+    Normalize a whole file's records. Large inputs are split into chunks,
+    pickled to a process pool of workers processes (0 = one per CPU).
+    Duplicate ids keep the last record, as the store would. Returns
+    (clean records, report).
+    """
+    started = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    ranges = [(start, min(start + chunk_size, len(records))) for start in range(0, len(records), chunk_size)]
+    if workers > 1 and len(ranges) > 1 and len(records) >= PARALLEL_MIN_RECORDS:
+        workers = min(workers, len(ranges))
+        with ProcessPoolExecutor(workers, mp_context=pool_context()) as pool:
+            futures = [pool.submit(normalize_chunk, records[start:end], start) for start, end in ranges]
+            results = [future.result() for future in futures]
+    else:
+        workers = 1
+        results = [normalize_chunk(records[start:end], start) for start, end in ranges]
+
+    clean = list(records)
+    counts = Counter()
+    rejected = []
+    for fixed, chunk_rejected, chunk_counts in results:
+        for index, record in fixed:
+            clean[index] = record
+        rejected += chunk_rejected
+        counts += chunk_counts
+    drop = {index for index, _, _ in rejected}
+    positions = {}
+    for index, record in enumerate(clean):
+        if index not in drop:
+            previous = positions.get(record['id'])
+            if previous is not None:
+                drop.add(previous)
+                rejected.append((previous, record['id'], f"duplicate id, superseded by record {index}"))
+            positions[record['id']] = index
+    if drop:
+        clean = [record for index, record in enumerate(clean) if index not in drop]
+    rejected.sort()
+
+    report = {
+        'version': NORMALIZE_VERSION,
+        'records': len(records),
+        'accepted': len(clean),
+        'rejected': len(rejected),
+        'fixed_records': sum(len(fixed) for fixed, _, _ in results),
+        'fixes': dict(counts.most_common()),
+        'rejections': [{'index': index, 'id': supplier_id, 'error': error}
+                       for index, supplier_id, error in rejected[:REJECTION_SAMPLES]],
+        'workers': workers,
+        'chunks': len(ranges),
+        'ms': round((time.perf_counter() - started) * 1000)
+    }
+    return clean, report
@@ -5,26 +5,12 @@ Pulls REAL supplier data from across the United States
 Covers all construction material categories
 """
 
-import os
+import csv
 import json
 import requests
 from datetime import datetime
 import time
 
-try:
-    from bs4 import BeautifulSoup
-    import pandas as pd
-except ImportError:
-    print("Installing required packages...")
-    os.system('pip install beautifulsoup4 requests pandas lxml')
-    from bs4 import BeautifulSoup
-    import pandas as pd
-
-print("\n" + "="*70)
-print("CONSTRUCTION MATERIAL SUPPLIERS WEB SCRAPER")
-print("Pulling REAL supplier data from USA sources")
-print("="*70 + "\n")
-
 # US States for iteration
 STATES = [
     'Alabama', 'Alaska', 'Arizona', 'Arkansas', 'California', 'Colorado',
@@ -91,6 +77,19 @@ CATEGORIES = {
     ]
 }
 
+def parse_html(content):
+    """
+    Parse a page with BeautifulSoup
+    bs4 is imported here so importing this module stays cheap
+    """
+    try:
+        from bs4 import BeautifulSoup
+    except ImportError:
+        print("ERROR: beautifulsoup4 is required for scraping")
+        print("Run: pip install beautifulsoup4")
+        raise
+    return BeautifulSoup(content, 'html.parser')
+
 class SupplierScraper:
     def __init__(self):
         self.suppliers = []
@@ -118,7 +117,7 @@ class SupplierScraper:
             response = self.session.get(url, params=params, timeout=10)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = parse_html(response.content)
             
             # Find business listings
             results = soup.find_all('div', class_='search-result')
@@ -187,7 +186,7 @@ class SupplierScraper:
             response = self.session.get(url, params=params, timeout=10)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = parse_html(response.content)
             
             # Find local results
             results = soup.find_all('div', class_='b_algo')
@@ -289,12 +288,21 @@ class SupplierScraper:
             print("No suppliers to save")
             return
         
-        df = pd.DataFrame(self.suppliers)
-        df.to_csv(filename, index=False)
+        # Union of all keys in first-seen order, like a DataFrame would produce
+        fieldnames = list(dict.fromkeys(key for supplier in self.suppliers for key in supplier))
+        with open(filename, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(self.suppliers)
         print(f"\nSaved {len(self.suppliers)} suppliers to {filename}")
 
 # Run scraper
 if __name__ == '__main__':
+    print("\n" + "="*70)
+    print("CONSTRUCTION MATERIAL SUPPLIERS WEB SCRAPER")
+    print("Pulling REAL supplier data from USA sources")
+    print("="*70 + "\n")
+
     scraper = SupplierScraper()
     
     print("\n[1/3] Starting web scraper...")
@@ -303,7 +311,7 @@ if __name__ == '__main__':
     print(f"\n[2/3] Found {len(suppliers)} suppliers")
     
     print("\n[3/3] Saving data...")
-    scraper.save_to_json('suppliers.json')
+    scraper.save_to_file('suppliers.json')
     scraper.save_to_csv('suppliers.csv')
     
     print("\n" + "="*70)
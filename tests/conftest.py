@@ -0,0 +1,86 @@
+"""
+Shared fixtures: app.py loaded once per session from a scratch copy of
+suppliers.json, with the journal, state snapshot and caches kept out of
+the working tree. Config is read at import, so the environment is set
+before app is first imported.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import textwrap
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SCRATCH = tempfile.mkdtemp(prefix='supplier-tests-')
+DATA_FILE = os.path.join(SCRATCH, 'suppliers.json')
+shutil.copy(os.path.join(ROOT, 'suppliers.json'), DATA_FILE)
+
+TEST_ENV = {
+    'DATA_FILE': DATA_FILE,
+    'JOURNAL_FILE': os.path.join(SCRATCH, 'suppliers.journal'),
+    'STATE_SNAPSHOT_FILE': os.path.join(SCRATCH, 'suppliers.snapshot'),
+    'NODE_ENV': 'test',
+    'RATE_LIMIT_PER_SECOND': '0',
+    'RESULT_CACHE_MAX_BYTES': '0',
+    'NORMALIZE_WORKERS': '1',
+    'JOURNAL_COMPACT_INTERVAL': '3600',
+    'ADMIN_TOKEN': 'test-admin-token',
+}
+os.environ.update(TEST_ENV)
+for name in ('SHARED_DATASET_DIR', 'RESULT_CACHE_SHARED_PATH', 'RATE_LIMIT_SHARED_PATH', 'ROUTE_BUDGETS'):
+    os.environ.pop(name, None)
+
+@pytest.fixture(scope='session')
+def backend():
+    import app
+    app.create_app()
+    return app
+
+@pytest.fixture
+def client(backend):
+    return backend.app.test_client()
+
+@pytest.fixture
+def admin():
+    """Headers for routes behind ADMIN_TOKEN"""
+    return {'Authorization': f"Bearer {TEST_ENV['ADMIN_TOKEN']}"}
+
+@pytest.fixture
+def records(backend):
+    """Every live supplier, decoded"""
+    return [backend.STORE.records[p] for p in backend.STORE.live_positions().tolist()]
+
+def ndjson(records):
+    return ''.join(json.dumps(r) + '\n' for r in records)
+
+def run_app(script, scratch, load=True, **env):
+    """
+    Run script in a fresh interpreter against its own journal and snapshot
+    in scratch (a separate process, so the session's app is untouched);
+    the script sees app imported (and loaded unless load=False) and its
+    last line of output, printed as JSON, is decoded and returned
+    """
+    data_file = env.pop('DATA_FILE', DATA_FILE)
+    environ = {
+        **os.environ, **TEST_ENV, 'DATA_FILE': data_file, 'PYTHONPATH': ROOT,
+        'JOURNAL_FILE': os.path.join(scratch, 'suppliers.journal'),
+        'STATE_SNAPSHOT_FILE': os.path.join(scratch, 'suppliers.snapshot'),
+        **env
+    }
+    prelude = 'import json, os, sys\nimport app\n'
+    if load:
+        prelude += 'app.create_app()\nclient = app.app.test_client()\n'
+    result = subprocess.run([sys.executable, '-c', prelude + textwrap.dedent(script)], env=environ,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr[-3000:]
+    return json.loads(result.stdout.splitlines()[-1])
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(SCRATCH, ignore_errors=True)
@@ -0,0 +1,83 @@
+"""Stock analytics: vectorized rollups against brute force over the records"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+def test_group_percentiles_match_numpy(backend):
+    rng = np.random.default_rng(7)
+    codes = rng.integers(0, 6, 400)
+    codes[codes == 4] = 5  # group 4 stays empty
+    values = rng.integers(0, 10000, 400)
+    result = backend.group_percentiles(codes, values, 6, (0, 10, 50, 90, 100))
+    for group in range(6):
+        members = values[codes == group]
+        for q, per_group in result.items():
+            if len(members):
+                assert per_group[group] == pytest.approx(np.percentile(members, q))
+            else:
+                assert np.isnan(per_group[group])
+
+def brute_totals(records, low_stock):
+    stock = [r.get('stockLevel') or 0 for r in records]
+    in_stock = sum(1 for r in records if r.get('inStock'))
+    return {
+        'suppliers': len(records),
+        'inStock': in_stock,
+        'outOfStock': len(records) - in_stock,
+        'lowStock': sum(1 for s in stock if s < low_stock),
+        'stockTotal': sum(stock),
+        'percentiles': {f"p{q}": round(float(np.percentile(stock, q)), 2) for q in (10, 25, 50, 75, 90, 99)},
+    }
+
+@pytest.mark.parametrize('query', [{}, {'category': 'Electrical', 'low_stock': 2500}])
+def test_totals_groups_and_lowest(client, records, query):
+    body = client.get('/api/suppliers/analytics/stock', query_string={**query, 'top': 5}).get_json()
+    low_stock = query.get('low_stock', 1000)
+    subset = [r for r in records if r['category'] == query.get('category', r['category'])]
+
+    totals = body['totals']
+    assert {k: totals[k] for k in brute_totals(subset, low_stock)} == brute_totals(subset, low_stock)
+
+    by_state = defaultdict(list)
+    for record in subset:
+        by_state[record['state']].append(record)
+    rows = {row['value']: row for row in body['groups']['state']}
+    assert set(rows) == set(by_state)
+    for state, members in by_state.items():
+        stock = [r.get('stockLevel') or 0 for r in members]
+        row = rows[state]
+        assert row['suppliers'] == len(members) and row['stockTotal'] == sum(stock)
+        assert row['inStock'] == sum(1 for r in members if r.get('inStock'))
+        assert row['lowStock'] == sum(1 for s in stock if s < low_stock)
+        assert row['stockMedian'] == round(float(np.median(stock)), 2)
+    assert [r['suppliers'] for r in body['groups']['state']] == sorted((len(m) for m in by_state.values()), reverse=True)
+
+    lowest = sorted(subset, key=lambda r: (r.get('stockLevel') or 0, r['id']))[:5]
+    assert [r['id'] for r in body['lowestStock']] == [r['id'] for r in lowest]
+
+@pytest.mark.parametrize('bucket', ['day', 'week', 'month'])
+def test_timeline_buckets(client, records, bucket):
+    counts = defaultdict(int)
+    unchecked = 0
+    for record in records:
+        try:
+            day = datetime.fromisoformat(record['lastStockCheck']).date()
+        except (KeyError, TypeError, ValueError):
+            unchecked += 1
+            continue
+        if bucket == 'week':
+            day -= timedelta(days=day.weekday())
+        elif bucket == 'month':
+            day = day.replace(day=1)
+        counts[day.isoformat()] += 1
+    body = client.get('/api/suppliers/analytics/stock', query_string={'bucket': bucket, 'buckets': 1000}).get_json()
+    timeline = body['timeline']
+    assert timeline['unchecked'] == unchecked
+    assert {row['start']: row['checks'] for row in timeline['buckets']} == dict(counts)
+
+@pytest.mark.parametrize('query', [{'group_by': 'color'}, {'bucket': 'year'}])
+def test_bad_parameters(client, query):
+    assert client.get('/api/suppliers/analytics/stock', query_string=query).status_code == 400
@@ -0,0 +1,41 @@
+"""Batch lookup by id: /api/suppliers/batch"""
+
+import pytest
+
+def test_results_follow_the_requested_order(client, records):
+    ids = [records[9]['id'], records[2]['id'], 999999999, records[9]['id'], records[40]['id']]
+    body = client.post('/api/suppliers/batch', json={'ids': ids}).get_json()
+    assert [r['id'] for r in body['results']] == [ids[0], ids[1], ids[3], ids[4]]
+    assert body['results'][0] == records[9]
+    assert body['missing'] == [999999999] and body['count'] == 4
+
+def test_fields_are_projected(client, records):
+    ids = [r['id'] for r in records[:5]]
+    body = client.post('/api/suppliers/batch', json={'ids': ids, 'fields': ['id', 'rating', 'nope']}).get_json()
+    assert body['results'] == [{'id': r['id'], 'rating': r['rating']} for r in records[:5]]
+
+def test_deleted_suppliers_are_missing(backend, client):
+    backend.STORE.apply_batch(upserts=[{'id': 880101, 'name': 'Gone Supply', 'category': 'Masonry'}])
+    assert client.post('/api/suppliers/batch', json={'ids': [880101]}).get_json()['count'] == 1
+    backend.STORE.apply_batch(deletes=[880101])
+    assert client.post('/api/suppliers/batch', json={'ids': [880101]}).get_json()['missing'] == [880101]
+
+def test_empty_batch(client):
+    body = client.post('/api/suppliers/batch', json={'ids': []}).get_json()
+    assert body['results'] == [] and body['missing'] == []
+
+@pytest.mark.parametrize('body', [
+    [1, 2, 3],
+    {},
+    {'ids': '1,2'},
+    {'ids': [1, '2']},
+    {'ids': [True]},
+    {'ids': [2 ** 63]},
+    {'ids': [1], 'fields': 'id'},
+])
+def test_bad_batches_are_rejected(client, body):
+    assert client.post('/api/suppliers/batch', json=body).status_code == 400
+
+def test_batch_size_is_capped(backend, client, monkeypatch):
+    monkeypatch.setattr(backend, 'BATCH_MAX_IDS', 3)
+    assert client.post('/api/suppliers/batch', json={'ids': [1, 2, 3, 4]}).status_code == 400
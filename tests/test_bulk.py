@@ -0,0 +1,103 @@
+"""NDJSON bulk upsert/delete, journaled after they apply, and the admin token guarding writes"""
+
+import json
+
+import pytest
+
+from conftest import ndjson
+
+GUARDED = [
+    ('POST', '/api/suppliers/bulk'),
+    ('POST', '/api/suppliers/bulk/delete'),
+    ('PATCH', '/api/suppliers/1/stock'),
+    ('POST', '/api/admin/reload'),
+    ('POST', '/api/admin/journal/compact'),
+    ('POST', '/api/admin/profile'),
+    ('POST', '/api/admin/memory/tracking'),
+    ('GET', '/api/admin/memory'),
+    ('GET', '/api/admin/profile'),
+    ('GET', '/api/admin/profile/flamegraph'),
+    ('GET', '/api/admin/deadlines'),
+    ('GET', '/api/admin/cache'),
+    ('GET', '/api/admin/data-quality'),
+    ('GET', '/api/admin/journal'),
+    ('GET', '/api/admin/ratelimit'),
+]
+
+@pytest.mark.parametrize('method, path', GUARDED)
+def test_admin_routes_need_the_token(backend, client, monkeypatch, method, path):
+    version = backend.STORE.version
+    for headers in ({}, {'Authorization': 'Bearer wrong'}, {'X-Admin-Token': 'wrong'}):
+        response = client.open(path, method=method, headers=headers, json={'stockLevel': 1})
+        assert response.status_code == 401 and response.headers['WWW-Authenticate'] == 'Bearer'
+    monkeypatch.setattr(backend, 'ADMIN_TOKEN', '')
+    assert client.open(path, method=method, headers={'Authorization': 'Bearer '}).status_code == 403
+    assert backend.STORE.version == version
+
+def test_x_admin_token_header_is_accepted(client, records):
+    response = client.patch(f"/api/suppliers/{records[0]['id']}/stock", json={'stockLevel': 5},
+                            headers={'X-Admin-Token': 'test-admin-token'})
+    assert response.status_code == 200
+
+def journal_lines(backend):
+    with open(backend.JOURNAL.path, 'rb') as f:
+        return [json.loads(line) for line in f]
+
+def test_bulk_upsert_and_delete(backend, client, admin, records):
+    existing = {**records[4], 'stockLevel': 777}
+    new = {'id': 880201, 'name': 'Bulk Lumber', 'category': 'Lumber & Wood', 'state': 'tx'}
+    body = ndjson([existing, new]) + '{"id": 880202}\nnot json\n' + ndjson([records[5]])
+    seq = backend.JOURNAL.seq
+    response = client.post('/api/suppliers/bulk', data=body, headers=admin)
+    result = response.get_json()
+    assert response.status_code == 200
+    assert (result['inserted'], result['updated'], result['unchanged']) == (1, 1, 1)
+    assert [r['line'] for r in result['rejected']] == [3, 4]
+    assert backend.STORE.find(880201)['state'] == 'Texas'
+    assert backend.STORE.find(existing['id'])['stockLevel'] == 777
+
+    # Acknowledged only once durable
+    assert backend.JOURNAL.durable_seq == backend.JOURNAL.seq == seq + 3
+    assert [e['data']['id'] for e in journal_lines(backend)[-3:]] == [existing['id'], 880201, records[5]['id']]
+
+    body = '{"id": 880201}\n880299\n{"id": "x"}\n'
+    result = client.post('/api/suppliers/bulk/delete', data=body, headers=admin).get_json()
+    assert result['deleted'] == 1 and result['missing'] == [880299]
+    assert result['rejected'] == [{'line': 3, 'error': 'expected {"id": <positive integer>}'}]
+    assert backend.STORE.find(880201) is None
+    assert [(e['op'], e['id']) for e in journal_lines(backend)[-2:]] == [('delete', 880201), ('delete', 880299)]
+
+def test_all_rejected_is_a_400(client, admin):
+    response = client.post('/api/suppliers/bulk', data='{"id": 1}\n', headers=admin)
+    assert response.status_code == 400 and response.get_json()['inserted'] == 0
+
+def test_batch_size_is_capped(backend, client, admin, monkeypatch):
+    monkeypatch.setattr(backend, 'BULK_MAX_RECORDS', 1)
+    assert client.post('/api/suppliers/bulk/delete', data='1\n2\n', headers=admin).status_code == 413
+
+@pytest.mark.parametrize('path, body', [
+    ('/api/suppliers/bulk', '{"id": 880301, "name": "Never Applied", "category": "Masonry"}\n'),
+    ('/api/suppliers/bulk/delete', '{"id": 1}\n'),
+])
+def test_failed_apply_is_not_journaled(backend, client, admin, monkeypatch, path, body):
+    def fail(*args, **kwargs):
+        raise RuntimeError('column update failed')
+
+    monkeypatch.setattr(backend.STORE, 'apply_batch', fail)
+    seq, size = backend.JOURNAL.seq, len(journal_lines(backend))
+    response = client.post(path, data=body, headers=admin)
+    assert response.status_code == 500
+    assert backend.JOURNAL.seq == seq and not backend.JOURNAL.buffer
+    assert len(journal_lines(backend)) == size
+
+def test_normalization_rejects_are_line_rejections(backend, client, admin):
+    # Passes validate_supplier (a string name) but normalizes to no name at all
+    body = '{"id": 880311, "name": "   ", "category": "X"}\n{"id": 880312, "name": "Kept Supply", "category": "X"}\n'
+    seq = backend.JOURNAL.seq
+    response = client.post('/api/suppliers/bulk', data=body, headers=admin)
+    result = response.get_json()
+    assert response.status_code == 200 and result['inserted'] == 1
+    assert result['rejected'] == [{'line': 1, 'error': 'missing name'}]
+    assert backend.STORE.find(880311) is None
+    assert backend.JOURNAL.seq == seq + 1 and journal_lines(backend)[-1]['data']['id'] == 880312
+    client.post('/api/suppliers/bulk/delete', data='880312\n', headers=admin)
@@ -0,0 +1,41 @@
+"""Versioned change log and /api/suppliers/changes delta sync"""
+
+def small_store(backend, records, max_changes=100):
+    store = backend.SupplierStore(max_changes=max_changes)
+    store.load([dict(r) for r in records])
+    return store
+
+def test_delta_sync_returns_latest_change_once(client, admin, records):
+    supplier_id = records[1]['id']
+    since = client.get('/api/suppliers/changes?since=0').get_json()['version']
+    client.patch(f"/api/suppliers/{supplier_id}/stock", json={'stockLevel': 11}, headers=admin)
+    client.patch(f"/api/suppliers/{supplier_id}/stock", json={'stockLevel': 12}, headers=admin)
+    body = client.get(f"/api/suppliers/changes?since={since}").get_json()
+    assert body['version'] == since + 2 and not body['reset']
+    assert [(c['id'], c['op']) for c in body['changes']] == [(supplier_id, 'upsert')]
+    assert body['changes'][0]['version'] == since + 2
+    assert body['changes'][0]['data']['stockLevel'] == 12
+    assert client.get(f"/api/suppliers/changes?since={body['version']}").get_json()['count'] == 0
+
+def test_reload_logs_only_differences(backend, records):
+    store = small_store(backend, records[:5])
+    start = store.version
+    changed = [dict(r) for r in records[:5]]
+    changed[2]['rating'] = 1.5
+    del changed[4]
+    changed.append(dict(records[5]))
+    store.load(changed)
+    changes, reset = store.changes_since(start)
+    assert not reset
+    assert sorted((c['id'], c['op']) for c in changes) == sorted([
+        (records[2]['id'], 'upsert'), (records[5]['id'], 'upsert'), (records[4]['id'], 'delete')])
+    assert next(c for c in changes if c['op'] == 'delete')['data'] is None
+
+def test_clients_behind_the_compacted_log_must_reset(backend, records):
+    store = small_store(backend, records[:5], max_changes=2)
+    start = store.version
+    for record in records[:3]:
+        store.update(record['id'], {'stockLevel': 1})
+    assert store.changes_since(start) == ([], True)
+    changes, reset = store.changes_since(store.version - 2)
+    assert not reset and [c['id'] for c in changes] == [records[1]['id'], records[2]['id']]
@@ -0,0 +1,76 @@
+"""Per-route time budgets: aborted plans, partial scans and /api/admin/deadlines"""
+
+import pytest
+
+from conftest import TEST_ENV, run_app
+
+ADMIN = {'Authorization': f"Bearer {TEST_ENV['ADMIN_TOKEN']}"}
+
+@pytest.fixture
+def no_time(backend, monkeypatch):
+    """Give route a budget that has already run out when the request starts"""
+    def expire(route):
+        monkeypatch.setitem(backend.ROUTE_BUDGETS_MS, route, 0)
+    return expire
+
+def route_stats(client, route):
+    return client.get('/api/admin/deadlines', headers=ADMIN).get_json()['deadlines']['routes'].get(route, {})
+
+def test_deadline_check_and_cut(backend):
+    deadline = backend.Deadline('GET /x', 60000)
+    deadline.check('plenty left')
+    assert not deadline.cut('plenty left') and deadline.outcome == 'ok'
+    spent = backend.Deadline('GET /x', 0)
+    assert spent.cut('scan') and (spent.outcome, spent.stage) == ('partial', 'scan')
+    with pytest.raises(backend.DeadlineExceeded, match='0 ms budget during plan'):
+        spent.check('plan')
+    assert spent.outcome == 'timeout' and spent.remaining_ms() == 0
+
+@pytest.mark.parametrize('path, body', [
+    ('/api/suppliers/query', {'where': {'state': 'Texas'}}),
+    ('/api/suppliers/filter', {'state': 'Texas'}),
+])
+def test_plans_past_their_budget_answer_503(client, no_time, path, body):
+    route = f"POST {path}"
+    before = route_stats(client, route).get('timeout', 0)
+    no_time(route)
+    response = client.post(path, json=body)
+    assert response.status_code == 503 and response.headers['Retry-After'] == '1'
+    data = response.get_json()
+    # Aborted at the first checkpoint, right after the index lookup
+    assert data['timeout'] and data['stage'] == 'index' and 'results' not in data
+    stats = route_stats(client, route)
+    assert stats['timeout'] == before + 1 and stats['stages']['index'] >= 1
+
+def test_stock_analytics_past_its_budget(client, no_time):
+    no_time('GET /api/suppliers/analytics/stock')
+    response = client.get('/api/suppliers/analytics/stock')
+    assert response.status_code == 503
+    assert response.get_json()['stage'].startswith(('group by', 'timeline'))
+
+def test_search_returns_what_it_found_in_time(client, no_time):
+    full = client.post('/api/suppliers/search', json={'q': 'a', 'fuzzy': False}).get_json()
+    assert len(full['results']) == 100 and 'truncated' not in full
+    no_time('POST /api/suppliers/search')
+    partial = client.post('/api/suppliers/search', json={'q': 'a', 'fuzzy': False}).get_json()
+    # The scan asks every 64 hits, so it stops at the first checkpoint
+    assert partial['truncated'] and len(partial['results']) == 64
+    assert [r['id'] for r in partial['results']] == [r['id'] for r in full['results'][:64]]
+    assert route_stats(client, 'POST /api/suppliers/search')['partial'] >= 1
+
+@pytest.mark.parametrize('header, budget', [('250', '250'), ('60000', '1000'), ('0', '1'), ('soon', '1000')])
+def test_clients_can_only_shorten_budgets(client, header, budget):
+    response = client.post('/api/suppliers/query', json={'where': {'state': 'Texas'}},
+                           headers={'X-Request-Timeout-Ms': header})
+    assert response.headers['X-Time-Budget-Ms'] == budget
+
+def test_unbudgeted_routes_are_left_alone(client):
+    assert 'X-Time-Budget-Ms' not in client.get('/api/suppliers?limit=1').headers
+
+def test_route_budgets_from_the_environment(tmp_path):
+    budgets = run_app("""
+        print(json.dumps(app.ROUTE_BUDGETS_MS))
+    """, str(tmp_path), load=False, ROUTE_BUDGETS='POST /api/suppliers/filter=300, GET /api/suppliers/stats=50')
+    assert budgets['POST /api/suppliers/filter'] == 300
+    assert budgets['GET /api/suppliers/stats'] == 50
+    assert budgets['POST /api/suppliers/search'] == 500
@@ -0,0 +1,64 @@
+"""leadTime/responseTime day columns and range filters over them"""
+
+import pytest
+
+@pytest.mark.parametrize('text, days', [
+    ('1-2 weeks', (7, 14)),
+    ('24 hours', (1, 1)),
+    ('2 business days', (2.8, 2.8)),
+    ('3 to 4 months', (90, 120)),
+    ('Same day', None),
+    (None, None),
+])
+def test_parse_duration_days(backend, text, days):
+    parsed = backend.parse_duration_days(text)
+    assert parsed == (None if days is None else pytest.approx(days))
+
+@pytest.fixture(scope='module')
+def unknown_lead_time(backend):
+    """A supplier with no leadTime at all, so its day columns are NaN"""
+    record = {'id': 880001, 'name': 'No Lead Time Supply', 'category': 'Electrical', 'state': 'Texas',
+              'rating': 4.0, 'stockLevel': 10}
+    backend.STORE.apply_batch(upserts=[record])
+    yield record
+    backend.STORE.apply_batch(deletes=[record['id']])
+
+def expected_ids(backend, records, column, low=None, high=None):
+    """Brute force: ids whose parsed duration for column lies in [low, high]"""
+    field, bound = column[:-len('MinDays')], int(column.endswith('MaxDays'))
+    ids = []
+    for record in records:
+        days = backend.parse_duration_days(record.get(field))
+        if days and (low is None or days[bound] >= low) and (high is None or days[bound] <= high):
+            ids.append(record['id'])
+    return sorted(ids)
+
+@pytest.mark.parametrize('body, column, low, high', [
+    ({'minLeadTimeDays': 30}, 'leadTimeMinDays', 30, None),
+    ({'minLeadTimeDays': 1000}, 'leadTimeMinDays', 1000, None),
+    ({'maxLeadTimeDays': 14}, 'leadTimeMaxDays', None, 14),
+    ({'minResponseTimeDays': 2}, 'responseTimeMinDays', 2, None),
+])
+def test_range_filters_skip_unknown_durations(backend, client, unknown_lead_time, records, body, column, low, high):
+    results = client.post('/api/suppliers/filter', json=body).get_json()['results']
+    ids = sorted(r['id'] for r in results)
+    assert unknown_lead_time['id'] not in ids
+    assert ids == expected_ids(backend, records, column, low, high)
+
+def test_planner_agrees_whichever_predicate_seeds(client, unknown_lead_time):
+    # Alone the range seeds the plan; with a rarer state it is applied as a mask instead
+    alone = client.post('/api/suppliers/query', json={'range': {'leadTimeMinDays': {'min': 1000}}}).get_json()
+    assert alone['total'] == 0
+    masked = client.post('/api/suppliers/query', json={
+        'where': {'state': 'Texas'}, 'range': {'leadTimeMinDays': {'min': 0}}, 'limit': 1000}).get_json()
+    assert unknown_lead_time['id'] not in [r['id'] for r in masked['results']]
+    unbounded = client.post('/api/suppliers/query', json={
+        'where': {'state': 'Texas'}, 'range': {'leadTimeMinDays': {}}, 'limit': 1000}).get_json()
+    assert unknown_lead_time['id'] not in [r['id'] for r in unbounded['results']]
+
+def test_sorting_by_lead_time_puts_unknown_last(backend, client, unknown_lead_time):
+    results = client.post('/api/suppliers/filter', json={'state': 'Texas', 'sortBy': 'leadTime'}).get_json()['results']
+    days = [backend.parse_duration_days(r.get('leadTime')) for r in results]
+    known = [d[0] for d in days if d]
+    assert known == sorted(known)
+    assert results[-1]['id'] == unknown_lead_time['id']
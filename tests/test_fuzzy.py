@@ -0,0 +1,73 @@
+"""Typo-tolerant search: the trigram index against brute force over every record"""
+
+import random
+
+import pytest
+
+def reference_distance(a, b):
+    """Plain optimal string alignment distance"""
+    d = [[i + j if i * j == 0 else 0 for j in range(len(b) + 1)] for i in range(len(a) + 1)]
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            d[i][j] = min(d[i - 1][j] + 1, d[i][j - 1] + 1, d[i - 1][j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                d[i][j] = min(d[i][j], d[i - 2][j - 2] + 1)
+    return d[-1][-1]
+
+def test_edit_distance_matches_reference(backend):
+    rng = random.Random(5)
+    for _ in range(2000):
+        a = ''.join(rng.choice('abc') for _ in range(rng.randint(0, 7)))
+        b = ''.join(rng.choice('abc') for _ in range(rng.randint(0, 7)))
+        limit = rng.randint(0, 3)
+        assert backend.edit_distance(a, b, limit) == min(reference_distance(a, b), limit + 1), (a, b, limit)
+    assert backend.edit_distance('steel', 'stele', 1) == 1
+
+def brute_force(backend, records, query, max_distance=2):
+    """[(distance, -rating, id)] for records whose name/category words cover every query word"""
+    found = []
+    for record in records:
+        words = backend.fuzzy_words(f"{record.get('name') or ''} {record.get('category') or ''}")
+        total = 0
+        for word in sorted(backend.fuzzy_words(query)):
+            edits = min(backend.max_edits(word), max_distance)
+            best = min(reference_distance(word, w) for w in words)
+            if best > edits:
+                break
+            total += best
+        else:
+            found.append((total, -(record.get('rating') or 0), record['id']))
+    return sorted(found)
+
+@pytest.mark.parametrize('query', ['consrete suply', 'plumbng', 'electricl', 'stele', 'lumbr wood', 'hvac', 'zzzzzz'])
+def test_search_matches_brute_force(backend, records, query):
+    positions, distances, corrections, truncated = backend.FUZZY_INDEX.search(query, 1000, budget_ms=10000)
+    expected = brute_force(backend, records, query)
+    ids = backend.STORE.columns['id'][positions].tolist()
+    assert not truncated
+    assert sorted(zip(distances.tolist(), ids)) == sorted((d, i) for d, _, i in expected)
+    # Ranked by distance, then rating
+    assert [(d, r) for d, r, _ in expected] == [
+        (d, -backend.STORE.records[p]['rating']) for d, p in zip(distances.tolist(), positions.tolist())]
+    assert set(corrections) == backend.fuzzy_words(query)
+
+def test_changed_records_are_matched(backend):
+    backend.STORE.apply_batch(upserts=[{'id': 880601, 'name': 'Quixotic Fabricators', 'category': 'Masonry'}])
+    try:
+        positions, distances, _, _ = backend.FUZZY_INDEX.search('quixotik', 10)
+        assert backend.STORE.records[int(positions[0])]['id'] == 880601 and distances[0] == 1
+    finally:
+        backend.STORE.apply_batch(deletes=[880601])
+    positions, _, _, _ = backend.FUZZY_INDEX.search('quixotik', 10)
+    assert 880601 not in backend.STORE.columns['id'][positions].tolist()
+
+def test_search_route(client):
+    body = client.post('/api/suppliers/search', json={'q': 'plumbng'}).get_json()
+    assert body['fuzzy'] is True and 'plumbing' in body['corrections']['plumbng']
+    assert all(r['category'] == 'Plumbing' or 'plumb' in r['name'].lower() for r in body['results'])
+    exact = client.post('/api/suppliers/search', json={'q': 'plumbng', 'fuzzy': False}).get_json()
+    assert exact['results'] == [] and 'fuzzy' not in exact
+
+@pytest.mark.parametrize('body', [{'q': 'x', 'fuzzy': 'yes'}, {'q': 'x', 'maxDistance': 3}, {'q': 5}, ['plumbing']])
+def test_bad_search_requests(client, body):
+    assert client.post('/api/suppliers/search', json=body).status_code == 400
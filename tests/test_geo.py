@@ -0,0 +1,69 @@
+"""Gazetteer, KD-tree nearest neighbours and /api/suppliers/nearby"""
+
+import math
+
+import numpy as np
+import pytest
+
+from gazetteer import geocode, haversine_miles, normalize_state, parse_city
+
+def test_gazetteer_lookups():
+    assert normalize_state('tx') == 'Texas' and normalize_state('New York') == 'New York'
+    assert normalize_state('Atlantis') is None
+    assert parse_city('239 Main St, Phoenix, Arizona 85776') == 'Phoenix'
+    assert parse_city('Dallas, TX') == 'Dallas'
+    assert geocode('Phoenix', 'AZ')[2] == 'city'
+    assert geocode('Nowhere', 'Arizona')[2] == 'state'
+    assert geocode(region='Midwest')[2] == 'region'
+    assert geocode('Nowhere') is None
+    # New York to Los Angeles is about 2,450 miles
+    assert haversine_miles(40.71, -74.01, 34.05, -118.24) == pytest.approx(2445, abs=10)
+
+@pytest.mark.parametrize('k', [1, 7, 40])
+def test_kdtree_matches_brute_force(backend, k):
+    rng = np.random.default_rng(k)
+    points = rng.normal(size=(1000, 3))
+    points /= np.linalg.norm(points, axis=1)[:, None]
+    positions = np.arange(1000) * 3
+    tree = backend.KDTree.build(points, positions)
+    for target in points[:20] + 0.01:
+        d2 = ((points - target) ** 2).sum(axis=1)
+        expected = sorted(zip(d2.tolist(), positions.tolist()))[:k]
+        got = tree.nearest(target.tolist(), k)
+        assert [p for _, p in got] == [p for _, p in expected]
+        radius = expected[-1][0]
+        assert len(tree.nearest(target.tolist(), 1000, radius)) == int((d2 <= radius).sum())
+
+def brute_force(backend, lat, lon, category=None):
+    columns = backend.STORE.columns
+    distances = []
+    for position in backend.STORE.live_positions().tolist():
+        s_lat, s_lon = float(columns['lat'][position]), float(columns['lon'][position])
+        if math.isnan(s_lat) or (category and backend.STORE.records[position]['category'] != category):
+            continue
+        distances.append(haversine_miles(lat, lon, s_lat, s_lon))
+    return sorted(distances)
+
+def test_nearby_matches_brute_force(backend, client, records):
+    body = client.get('/api/suppliers/nearby?lat=41.88&lon=-87.63&k=20').get_json()
+    expected = brute_force(backend, 41.88, -87.63)[:20]
+    assert [r['distanceMiles'] for r in body['results']] == [round(d, 1) for d in expected]
+
+    category = records[0]['category']
+    body = client.get('/api/suppliers/nearby', query_string={
+        'lat': 32.78, 'lon': -96.8, 'k': 5, 'radius': 800, 'category': category}).get_json()
+    expected = [d for d in brute_force(backend, 32.78, -96.8, category) if d <= 800][:5]
+    assert [r['distanceMiles'] for r in body['results']] == [round(d, 1) for d in expected]
+    assert all(r['category'] == category for r in body['results'])
+
+def test_nearby_geocodes_the_origin(client):
+    body = client.get('/api/suppliers/nearby?city=Dallas&state=TX&k=3').get_json()
+    assert body['origin']['precision'] == 'city' and body['count'] == 3
+    assert client.get('/api/suppliers/nearby?city=Nowhere').status_code == 400
+
+@pytest.mark.parametrize('query', ['radius=-500', 'radius=0', 'radius=nan', 'radius=inf', 'lat=nan&lon=0', 'lat=95&lon=0'])
+def test_nearby_rejects_bad_bounds(client, query):
+    if 'lat' not in query:
+        query += '&lat=41.88&lon=-87.63'
+    response = client.get(f"/api/suppliers/nearby?{query}")
+    assert response.status_code == 400 and 'results' not in response.get_json()
@@ -0,0 +1,21 @@
+"""Liveness and readiness probes"""
+
+def test_live_and_ready(backend, client):
+    assert client.get('/health/live').get_json() == {'status': 'ok'}
+    response = client.get('/health/ready')
+    body = response.get_json()
+    assert response.status_code == 200 and body['status'] == 'ready'
+    assert all(body['components'].values())
+    assert body['version'] == backend.STORE.version and body['suppliers_loaded'] == backend.STORE.size
+
+    health = client.get('/health').get_json()
+    assert health['data'] == 'ready' and health['loaded_at'] == backend.STORE.loaded_at
+
+def test_not_ready_while_loading(backend, client, monkeypatch):
+    monkeypatch.setitem(backend.LOAD_STATE, 'status', 'loading')
+    response = client.get('/health/ready')
+    assert response.status_code == 503
+    assert response.get_json()['status'] == 'loading' and response.get_json()['components']['load'] is False
+    # Liveness never depends on the data
+    assert client.get('/health/live').status_code == 200
+    assert client.get('/health').status_code == 200
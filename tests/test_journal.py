@@ -0,0 +1,182 @@
+"""Write-ahead journal: group commit, crash replay, compaction and the single owner"""
+
+import fcntl
+import json
+import shutil
+import threading
+
+from conftest import DATA_FILE, TEST_ENV, run_app
+
+ADMIN = {'Authorization': f"Bearer {TEST_ENV['ADMIN_TOKEN']}"}
+
+def test_group_commit_shares_fsyncs(backend, tmp_path):
+    journal = backend.Journal(str(tmp_path / 'group.journal'))
+    journal.open(0)
+    threads = [threading.Thread(target=journal.append,
+                                args=([backend.journal_entry('delete', id=n) for n in range(t * 10, t * 10 + 10)],))
+               for t in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert journal.durable_seq == journal.seq == journal.entries == 80
+    assert 1 <= journal.syncs <= 80
+    with open(journal.path, 'rb') as f:
+        lines = [json.loads(line) for line in f]
+    assert [e['seq'] for e in lines] == list(range(1, 81))
+    assert sorted(e['id'] for e in lines) == list(range(80))
+
+WRITE = f"""
+    headers = {ADMIN!r}
+    new = {{'id': 880401, 'name': 'Journal Supply', 'category': 'Masonry', 'state': 'Ohio'}}
+    assert client.post('/api/suppliers/bulk', data=json.dumps(new) + '\\n', headers=headers).status_code == 200
+    assert client.patch('/api/suppliers/1/stock', json={{'stockLevel': 4242}}, headers=headers).status_code == 200
+    assert client.post('/api/suppliers/bulk/delete', data='2\\n', headers=headers).status_code == 200
+    assert client.post('/api/auth/login', json={{'email': 'crash@example.com', 'name': 'Crash'}}).status_code == 201
+"""
+
+STATE = """
+    print(json.dumps({
+        'new': app.STORE.find(880401), 'stock': app.STORE.find(1)['stockLevel'], 'deleted': app.STORE.find(2) is None,
+        'name': app.STORE.find(3)['name'], 'users': [u['email'] for u in app.USERS_DB.values()],
+        'owner': app.JOURNAL.owner, 'seq': app.JOURNAL.seq,
+    }))
+"""
+
+def test_replay_after_a_crash(tmp_path):
+    # Exit without any shutdown, as a crash would, with a torn entry at the end
+    run_app(WRITE + "    print(json.dumps(app.JOURNAL.seq), flush=True)\n    os._exit(0)\n", tmp_path)
+    journal = tmp_path / 'suppliers.journal'
+    intact = journal.read_bytes()
+    with open(journal, 'ab') as f:
+        f.write(b'{"seq":99,"op":"delete","id":1')
+
+    state = run_app(STATE, tmp_path)
+    assert state['new']['name'] == 'Journal Supply' and state['new']['state'] == 'Ohio'
+    assert state['stock'] == 4242 and state['deleted'] and state['users'] == ['crash@example.com']
+    assert state['owner'] and state['seq'] == 4
+    assert journal.read_bytes() == intact
+
+def test_only_the_owner_cuts_a_torn_entry(tmp_path):
+    journal = tmp_path / 'suppliers.journal'
+    entry = {'seq': 1, 'op': 'upsert', 'data': {'id': 880403, 'name': 'Whole', 'category': 'X'}}
+    # Maybe still being appended by the owner, not necessarily a crash
+    journal.write_bytes(json.dumps(entry).encode() + b'\n{"seq":2,"op":"delete","id":1')
+    before = journal.read_bytes()
+    check = """
+        print(json.dumps({'owner': app.JOURNAL.owner, 'seq': app.JOURNAL.seq, 'found': app.STORE.find(880403) is not None}))
+    """
+    with open(str(journal) + '.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        assert run_app(check, tmp_path) == {'owner': False, 'seq': 1, 'found': True}
+        assert journal.read_bytes() == before
+    assert run_app(check, tmp_path) == {'owner': True, 'seq': 1, 'found': True}
+    assert journal.read_bytes() == before[:before.index(b'\n') + 1]
+
+def test_compaction_then_replay(tmp_path):
+    run_app(WRITE + f"""
+    assert client.post('/api/admin/journal/compact', headers={ADMIN!r}).get_json()['journal_seq'] == 4
+    client.patch('/api/suppliers/1/stock', json={{'stockLevel': 4343}}, headers={ADMIN!r})
+    print('{{}}')
+    """, tmp_path)
+    state = run_app(STATE, tmp_path)
+    assert state['new'] is not None and state['stock'] == 4343 and state['seq'] == 5
+    assert state['users'] == ['crash@example.com']
+
+def test_edited_data_file_wins_over_the_snapshot(tmp_path):
+    data_file = str(tmp_path / 'suppliers.json')
+    shutil.copy(DATA_FILE, data_file)
+    run_app(WRITE + f"""
+    client.post('/api/admin/journal/compact', headers={ADMIN!r})
+    print('{{}}')
+    """, tmp_path, DATA_FILE=data_file)
+
+    # Unchanged file: the snapshot and its journaled writes are kept
+    state = run_app(STATE, tmp_path, DATA_FILE=data_file)
+    assert state['new'] is not None and state['stock'] == 4242
+
+    with open(data_file) as f:
+        suppliers = json.load(f)
+    suppliers[2]['name'] = 'Edited By Hand'
+    with open(data_file, 'w') as f:
+        json.dump(suppliers, f)
+    state = run_app(STATE, tmp_path, DATA_FILE=data_file)
+    assert state['name'] == 'Edited By Hand'
+    assert state['new'] is None and not state['deleted'] and state['stock'] == suppliers[0]['stockLevel']
+    # Users are not in the data file, so they survive
+    assert state['users'] == ['crash@example.com']
+
+    # The snapshot was rewritten from the edited file, so the next start keeps it
+    assert run_app(STATE, tmp_path, DATA_FILE=data_file)['name'] == 'Edited By Hand'
+
+def journal_tail(backend):
+    with open(backend.JOURNAL.path, 'rb') as f:
+        return json.loads(f.readlines()[-1])
+
+def test_workers_without_the_journal_refuse_writes_but_forward_accounts(backend, tmp_path):
+    state = run_app(f"""
+    headers = {ADMIN!r}
+    responses = [
+        client.post('/api/suppliers/bulk', data='{{"id": 880402, "name": "X", "category": "Masonry"}}\\n', headers=headers),
+        client.patch('/api/suppliers/1/stock', json={{'stockLevel': 1}}, headers=headers),
+        client.post('/api/auth/login', json={{'email': 'forwarded@example.com', 'name': 'Forwarded'}}),
+    ]
+    print(json.dumps({{'owner': app.JOURNAL.owner, 'status': [r.status_code for r in responses],
+                      'retry': responses[0].headers.get('Retry-After'), 'reads': client.get('/api/suppliers/1').status_code,
+                      'found': app.STORE.find(880402) is not None, 'user': responses[2].get_json()['user_id']}}))
+    """, tmp_path, JOURNAL_FILE=backend.JOURNAL.path)
+    user = state.pop('user')
+    assert state == {'owner': False, 'status': [503, 503, 201], 'retry': str(backend.LOADING_RETRY_AFTER),
+                     'reads': 200, 'found': False}
+    # The owner (this process) created and journaled the account the other worker forwarded
+    assert backend.JOURNAL.owner and backend.get_user_by_email('forwarded@example.com')[0] == user
+    assert journal_tail(backend)['data']['id'] == user
+
+def test_followers_tail_resync_and_take_over(tmp_path):
+    # This worker's second handle on the lock stands in for another process owning the journal
+    result = run_app("""
+        import fcntl
+        holder = open(os.environ['JOURNAL_FILE'] + '.lock', 'w')
+        fcntl.flock(holder, fcntl.LOCK_EX)
+        app.create_app()
+        watcher, journal = app.JOURNAL_WATCHER, app.JOURNAL.path
+        entry = {'seq': 1, 'op': 'upsert', 'data': {'id': 880501, 'name': 'Followed', 'category': 'X'}}
+        with open(journal, 'ab') as f:
+            f.write(json.dumps(entry).encode() + b'\\n{"seq":2,"op":"del')
+        watcher.poll()
+        tail = {'seq': app.JOURNAL.seq, 'found': app.STORE.find(880501) is not None, 'bytes': os.path.getsize(journal)}
+
+        # A compaction by the owner: five suppliers as of seq 1
+        records = [app.STORE.records[p] for p in app.STORE.live_positions().tolist()[:5]]
+        arrays, meta = app.DatasetSnapshot.pack(records, 'compacted')
+        meta.update(journal_seq=1, users={}, source='compacted')
+        with open(app.STATE_SNAPSHOT_FILE + '.tmp', 'wb') as out:
+            app.write_segment(out, arrays, meta)
+        os.replace(app.STATE_SNAPSHOT_FILE + '.tmp', app.STATE_SNAPSHOT_FILE)
+        watcher.poll()
+        resync = {'size': app.STORE.size, 'resyncs': watcher.resyncs}
+
+        holder.close()
+        watcher.poll()
+        print(json.dumps({'tail': tail, 'resync': resync, 'owner': app.JOURNAL.owner,
+                          'seq': app.JOURNAL.seq, 'bytes': os.path.getsize(journal)}))
+    """, tmp_path, load=False, JOURNAL_FOLLOW_INTERVAL='3600')
+    whole = len(json.dumps({'seq': 1, 'op': 'upsert', 'data': {'id': 880501, 'name': 'Followed', 'category': 'X'}})) + 1
+    assert result['tail'] == {'seq': 1, 'found': True, 'bytes': whole + len('{"seq":2,"op":"del')}
+    assert result['resync'] == {'size': 5, 'resyncs': 1}
+    # Only on taking over is the torn entry cut off
+    assert result['owner'] and result['seq'] == 1 and result['bytes'] == whole
+
+def test_replay_skips_upserts_normalization_rejects(tmp_path):
+    # Journaled by an older build that accepted a blank name
+    entries = [
+        {'seq': 1, 'op': 'upsert', 'ts': '2024-01-01T00:00:00', 'data': {'id': 880411, 'name': '   ', 'category': 'X'}},
+        {'seq': 2, 'op': 'upsert', 'ts': '2024-01-01T00:00:00', 'data': {'id': 880412, 'name': 'Kept', 'category': 'X'}},
+    ]
+    (tmp_path / 'suppliers.journal').write_text(''.join(json.dumps(e) + '\n' for e in entries))
+    state = run_app("""
+        print(json.dumps({'rejected': app.STORE.find(880411), 'kept': app.STORE.find(880412),
+                          'journal': app.JOURNAL.report()}))
+    """, tmp_path)
+    assert state['rejected'] is None and state['kept']['name'] == 'Kept'
+    assert state['journal']['replay_rejected'] == 1 and state['journal']['seq'] == 2
@@ -0,0 +1,138 @@
+"""documents/legacy_python/backend_server.py: upstream cache, coalescing and circuit breaker"""
+
+import importlib.util
+import os
+import threading
+import time
+
+import pytest
+import requests
+
+from conftest import ROOT
+
+@pytest.fixture
+def proxy():
+    path = os.path.join(ROOT, 'documents', 'legacy_python', 'backend_server.py')
+    spec = importlib.util.spec_from_file_location('legacy_backend_server', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.prober_started = True  # no background health prober in tests
+    module.session = FakeSession()
+    return module
+
+class FakeResponse:
+    def __init__(self, data, status_code=200):
+        self.data = data
+        self.status_code = status_code
+
+    def json(self):
+        return self.data
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(str(self.status_code))
+
+class FakeSession:
+    """Counts upstream GETs; fails while down, answers slowly when delay is set"""
+    def __init__(self):
+        self.calls = 0
+        self.down = False
+        self.delay = 0
+        self.status = 200
+        self.lock = threading.Lock()
+
+    def get(self, url, timeout=None):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        if self.down:
+            raise requests.exceptions.ConnectionError('refused')
+        return FakeResponse({'success': self.status < 400, 'url': url, 'call': self.calls}, self.status)
+
+def test_fresh_responses_come_from_the_cache(proxy):
+    first = proxy.fetch_from_data_server('/api/suppliers')
+    assert proxy.fetch_from_data_server('/api/suppliers') == first
+    assert proxy.session.calls == 1
+
+def test_stale_responses_are_served_while_refreshing(proxy):
+    first = proxy.fetch_from_data_server('/api/stats')
+    data, fetched = proxy.cache['/api/stats']
+    proxy.cache['/api/stats'] = (data, fetched - proxy.CACHE_TTL - 1)
+    assert proxy.fetch_from_data_server('/api/stats') == first
+    deadline = time.monotonic() + 2
+    while proxy.session.calls < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert proxy.session.calls == 2
+
+def test_cached_data_is_the_fallback_on_errors(proxy):
+    first = proxy.fetch_from_data_server('/api/stats')
+    data, fetched = proxy.cache['/api/stats']
+    proxy.cache['/api/stats'] = (data, fetched - proxy.STALE_TTL - 1)
+    proxy.session.down = True
+    assert proxy.fetch_from_data_server('/api/stats') == first
+    assert 'Cannot connect' in proxy.fetch_from_data_server('/api/suppliers')['error']
+
+def test_concurrent_callers_share_one_fetch(proxy):
+    proxy.session.delay = 0.2
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(proxy.fetch_from_data_server('/api/suppliers/7')))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert proxy.session.calls == 1
+    assert len(results) == 8 and all(r == results[0] for r in results)
+
+def test_breaker_fails_fast_then_lets_one_trial_through(proxy):
+    proxy.session.down = True
+    for n in range(proxy.BREAKER_THRESHOLD):
+        proxy.fetch_from_data_server(f"/api/suppliers/{n}")
+    assert proxy.breaker.state == 'open'
+    calls = proxy.session.calls
+    assert 'circuit open' in proxy.fetch_from_data_server('/api/suppliers/99')['error']
+    assert proxy.session.calls == calls
+
+    proxy.breaker.opened_at -= proxy.BREAKER_RESET
+    assert proxy.breaker.state == 'half-open'
+    proxy.session.down = False
+    assert proxy.fetch_from_data_server('/api/suppliers/100')['success']
+    assert proxy.breaker.state == 'closed' and proxy.session.calls == calls + 1
+
+def test_server_errors_open_the_breaker(proxy):
+    proxy.session.status = 500
+    for n in range(proxy.BREAKER_THRESHOLD):
+        assert proxy.fetch_from_data_server(f"/api/suppliers/{n}")['success'] is False
+    assert proxy.breaker.state == 'open'
+    assert not proxy.cache
+
+def test_cache_keeps_the_most_recently_used(proxy):
+    proxy.CACHE_MAX_ENTRIES = 3
+    for n in range(4):
+        proxy.fetch_from_data_server(f"/api/suppliers/{n}")
+        if n == 2:
+            proxy.fetch_from_data_server('/api/suppliers/0')
+    assert list(proxy.cache) == ['/api/suppliers/2', '/api/suppliers/0', '/api/suppliers/3']
+
+def test_routes_answer_503_on_upstream_errors(proxy):
+    proxy.session.down = True
+    client = proxy.app.test_client()
+    assert client.get('/api/suppliers').status_code == 503
+    health = client.get('/health').get_json()
+    assert health['circuit'] == 'closed' and health['dataServer'] == 'unknown'
+
+def test_health_is_served_from_the_background_probe(proxy):
+    proxy.HEALTH_INTERVAL = 3600
+    client = proxy.app.test_client()
+    assert client.get('/health/ready').status_code == 503
+    assert proxy.session.calls == 0
+
+    threading.Thread(target=proxy.probe_data_server, daemon=True).start()
+    deadline = time.monotonic() + 2
+    while proxy.health_state['dataServer'] == 'unknown' and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert client.get('/health/ready').status_code == 200
+    for path in ('/health', '/health/live', '/health/ready'):
+        assert client.get(path).status_code == 200
+    assert proxy.session.calls == 1
+    assert client.get('/health').get_json()['dataServer'] == 'connected'
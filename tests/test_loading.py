@@ -0,0 +1,35 @@
+"""Background loading: data routes answer 503 + Retry-After until the store is ready"""
+
+import os
+
+from conftest import run_app
+
+def test_data_routes_wait_for_the_load(backend, client, monkeypatch):
+    monkeypatch.setitem(backend.LOAD_STATE, 'status', 'loading')
+    for path in ('/api/suppliers', '/api/suppliers/1', '/api/admin/data-quality', '/api/auth/user'):
+        response = client.get(path)
+        assert response.status_code == 503, path
+        assert response.headers['Retry-After'] == str(backend.LOADING_RETRY_AFTER)
+        assert response.get_json()['status'] == 'loading'
+    assert client.get('/health').status_code == 200
+
+def test_missing_data_fails_unless_degraded_mode_is_asked_for(tmp_path):
+    missing = os.path.join(tmp_path, 'missing.json')
+    state = run_app("""
+        app.start_background_load().join()
+        client = app.app.test_client()
+        failed = client.get('/api/suppliers')
+        print(json.dumps({'state': app.LOAD_STATE, 'status': failed.status_code, 'error': failed.get_json()['error']}))
+    """, tmp_path, load=False, DATA_FILE=missing)
+    assert state['state']['status'] == 'failed' and 'missing.json' in state['state']['error']
+    assert state['status'] == 503 and state['error'] == 'Supplier data failed to load'
+
+    (tmp_path / 'fallback').mkdir()
+    state = run_app("""
+        app.start_background_load(fallback=True).join()
+        client = app.app.test_client()
+        print(json.dumps({'state': app.LOAD_STATE, 'status': client.get('/api/suppliers').status_code,
+                          'size': app.STORE.size}))
+    """, tmp_path / 'fallback', load=False, DATA_FILE=missing)
+    assert state['state']['status'] == 'ready' and state['state']['degraded'] is True
+    assert state['status'] == 200 and state['size'] == 150
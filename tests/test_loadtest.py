@@ -0,0 +1,55 @@
+"""loadtest.py: metrics, argument parsing and one short run against the app"""
+
+import argparse
+import asyncio
+import threading
+
+import pytest
+from werkzeug.serving import make_server
+
+import loadtest
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 101))
+    assert [loadtest.percentile(values, p) for p in (50, 90, 99, 100)] == [50, 90, 99, 100]
+    assert loadtest.percentile([7], 99) == 7 and loadtest.percentile([], 50) is None
+
+def test_summarize():
+    samples = [(0, 'list', ms, ms < 40) for ms in (10, 20, 30, 40)]
+    assert loadtest.summarize(samples, 2) == {
+        'requests': 4, 'rps': 2.0, 'error_rate': 0.25, 'p50': 20, 'p90': 40, 'p99': 40, 'max': 40}
+    assert loadtest.summarize([], 0)['p99'] is None
+
+def test_parse_mix_and_ramp():
+    assert loadtest.parse_mix('list=5,search') == {'list': 5.0, 'search': 1.0}
+    with pytest.raises(argparse.ArgumentTypeError):
+        loadtest.parse_mix('list=1,teleport=2')
+    assert loadtest.parse_ramp('10:30,50') == [(10, 30.0), (50, 30.0)]
+
+def test_saturation_is_the_last_growing_stage_within_slo():
+    args = argparse.Namespace(slo_ms=500, max_error_rate=0.01)
+    stages = [
+        {'users': 10, 'rps': 100, 'p99': 50, 'error_rate': 0},
+        {'users': 25, 'rps': 240, 'p99': 90, 'error_rate': 0},
+        {'users': 50, 'rps': 245, 'p99': 400, 'error_rate': 0},  # throughput flat: queueing
+        {'users': 100, 'rps': 480, 'p99': 100, 'error_rate': 0},
+    ]
+    assert loadtest.saturation(stages, args)['users'] == 25
+    assert [s['saturated'] for s in stages[:3]] == [False, False, True] and 'saturated' not in stages[3]
+    assert loadtest.saturation([{'users': 1, 'rps': 5, 'p99': 900, 'error_rate': 0}], args) is None
+
+@pytest.fixture
+def server(backend):
+    server = make_server('127.0.0.1', 0, backend.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+
+def test_short_run_against_the_app(server):
+    args = argparse.Namespace(host='127.0.0.1', port=server.server_port, url=f"http://127.0.0.1:{server.server_port}",
+                              mix=loadtest.DEFAULT_MIX, ramp='2:1.5', think=0.05, timeout=5.0, interval=1.0, seed=3)
+    recorder, stages, elapsed = asyncio.run(loadtest.run(args))
+    assert len(stages) == 1 and stages[0]['users'] == 2 and stages[0]['requests'] > 0
+    assert recorder.errors == {}
+    assert {'login'} < {action for _, action, _, _ in recorder.samples}
@@ -0,0 +1,72 @@
+"""Memory breakdown, per-route allocation tracking and the benchmark scenarios"""
+
+import threading
+
+import pytest
+
+import benchmark
+from conftest import run_app
+
+def test_breakdown_separates_snapshot_views_from_private_arrays(client, admin):
+    body = client.get('/api/admin/memory', headers=admin).get_json()
+    store = body['store']
+    assert body['rss_bytes'] > 0 and store['snapshot']['bytes'] > 0
+    # Columns are views into the snapshot buffer until a write copies them
+    columns = store['columns'].values()
+    assert all(c['shared'] + c['private'] == c['bytes'] > 0 for c in columns)
+    assert store['arrays_shared_bytes'] + store['arrays_private_bytes'] >= sum(c['bytes'] for c in columns)
+
+def test_freshly_loaded_columns_are_snapshot_views(tmp_path):
+    columns = run_app("""
+        admin = {'Authorization': 'Bearer ' + os.environ['ADMIN_TOKEN']}
+        print(json.dumps(client.get('/api/admin/memory', headers=admin).get_json()['store']['columns']))
+    """, tmp_path)
+    assert all(c['shared'] == c['bytes'] for c in columns.values())
+
+@pytest.fixture
+def tracking(client, admin):
+    yield
+    client.post('/api/admin/memory/tracking', json={'enabled': False, 'reset': True}, headers=admin)
+
+def test_tracked_routes_report_allocations(client, admin, tracking):
+    body = client.post('/api/admin/memory/tracking', json={'routes': ['POST /api/suppliers/filter']},
+                       headers=admin).get_json()
+    assert body['allocations']['tracing'] and body['allocations']['tracking'] == ['POST /api/suppliers/filter']
+
+    tracked = client.post('/api/suppliers/filter', json={'minRating': 1})
+    assert int(tracked.headers['X-Alloc-Peak-Bytes']) > 0 and 'X-Alloc-Net-Bytes' in tracked.headers
+    assert 'X-Alloc-Peak-Bytes' not in client.get('/api/suppliers/1').headers
+    report = client.get('/api/admin/memory?top=3', headers=admin).get_json()
+    assert report['allocations']['routes']['POST /api/suppliers/filter']['requests'] == 1
+    assert len(report['top_sites']) == 3
+
+    body = client.post('/api/admin/memory/tracking', json={'enabled': False}, headers=admin).get_json()
+    assert body['allocations']['tracing'] is False
+
+@pytest.mark.parametrize('body', [{'routes': 'GET /x'}, {'routes': [1]}, ['*']])
+def test_bad_tracking_settings(client, admin, tracking, body):
+    assert client.post('/api/admin/memory/tracking', json=body, headers=admin).status_code == 400
+
+def test_overlapping_requests_are_skipped(backend):
+    tracker = backend.AllocationTracker()
+    tracker.track('*')
+    try:
+        tracker.begin('GET /a')
+        other = threading.Thread(target=lambda: (tracker.begin('GET /b'), tracker.end()))
+        other.start()
+        other.join()
+        held = [bytes(1000) for _ in range(100)]
+        tracker.end()
+        report = tracker.report()
+        assert report['skipped_overlapping'] == 1 and list(report['routes']) == ['GET /a']
+        assert report['routes']['GET /a']['net_max'] >= sum(map(len, held))
+    finally:
+        tracker.stop()
+
+def test_benchmark_scenarios_hit_working_routes(client, records):
+    sample = {'id': records[0]['id'], 'state': records[0]['state'], 'ids': [r['id'] for r in records]}
+    for name, method, path, body in benchmark.SCENARIOS:
+        response = client.open(benchmark.fill(path, sample), method=method, json=benchmark.fill(body, sample))
+        assert response.status_code == 200, name
+        if name == 'nearby':
+            assert response.get_json()['count'] == 20
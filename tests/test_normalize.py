@@ -0,0 +1,56 @@
+"""normalize.py: per-record fixes and rejections, duplicates and the worker pool"""
+
+import pytest
+
+import normalize
+from normalize import normalize_supplier, normalize_suppliers
+
+def test_clean_records_are_passed_through():
+    record = {'id': 7, 'name': 'Clean', 'category': 'Lumber', 'state': 'Texas', 'region': 'Southwest',
+              'rating': 4.5, 'reviews': 10, 'stockLevel': 3, 'inStock': True, 'walmartVerified': False,
+              'products': [], 'certifications': []}
+    clean, fixes, error = normalize_supplier(record)
+    assert clean is record and fixes == [] and error is None
+
+def test_messy_records_are_fixed():
+    clean, fixes, error = normalize_supplier({
+        'id': '12', 'name': ' Messy ', 'location': 'Dallas, TX 75201', 'rating': '9', 'reviews': '1,200',
+        'inStock': 'yes', 'products': 'nails, screws', 'lastUpdated': 0, 'phone': '   '})
+    assert error is None
+    assert (clean['id'], clean['name'], clean['state'], clean['region']) == (12, 'Messy', 'Texas', 'Southwest')
+    assert (clean['rating'], clean['reviews'], clean['stockLevel']) == (5, 1200, 0)
+    assert clean['inStock'] is True and clean['walmartVerified'] is False
+    assert clean['products'] == ['nails', 'screws'] and clean['category'] == normalize.DEFAULT_CATEGORY
+    assert clean['lastUpdated'] == '1970-01-01T00:00:00' and 'phone' not in clean
+    assert 'rating: out of range, clamped' in fixes
+
+@pytest.mark.parametrize('record, error', [
+    ([1, 2], 'record must be a JSON object'),
+    ({'id': 0, 'name': 'Zero'}, 'id must be a positive integer'),
+    ({'id': 1.5, 'name': 'Half'}, 'id must be a positive integer'),
+    ({'id': True, 'name': 'Bool'}, 'id must be a positive integer'),
+    ({'id': 3, 'name': '   '}, 'missing name'),
+])
+def test_unusable_records_are_rejected(record, error):
+    assert normalize_supplier(record) == (None, [], error)
+
+def test_duplicate_ids_keep_the_last_record():
+    records = [{'id': 1, 'name': 'First'}, {'id': 2, 'name': ''}, {'id': 1, 'name': 'Second'}]
+    clean, report = normalize_suppliers(records, workers=1)
+    assert [r['name'] for r in clean] == ['Second']
+    assert report['rejected'] == 2 and report['accepted'] == 1
+    assert [r['index'] for r in report['rejections']] == [0, 1]
+
+def test_pool_never_forks():
+    assert normalize.pool_context().get_start_method() in ('forkserver', 'spawn')
+
+def test_pool_matches_in_process(monkeypatch):
+    records = [{'id': n, 'name': f"Supplier {n}", 'state': 'tx', 'rating': str(n % 7)} for n in range(1, 401)]
+    records[10] = {'id': 11, 'name': ' '}
+    serial, serial_report = normalize_suppliers(records, workers=1, chunk_size=100)
+    monkeypatch.setattr(normalize, 'PARALLEL_MIN_RECORDS', 0)
+    pooled, pooled_report = normalize_suppliers(records, workers=2, chunk_size=100)
+    assert pooled_report['workers'] == 2 and pooled_report['chunks'] == 4
+    assert pooled == serial
+    drop = ('workers', 'ms')
+    assert {k: v for k, v in pooled_report.items() if k not in drop} == {k: v for k, v in serial_report.items() if k not in drop}
@@ -0,0 +1,74 @@
+"""Slow-request sampling profiler and its admin routes"""
+
+import threading
+import time
+
+import pytest
+
+def busy_wait_for_profiler(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+@pytest.fixture
+def profiler(backend):
+    profiler = backend.SlowRequestProfiler()
+    yield profiler
+    profiler.stop()
+
+def test_slow_requests_keep_their_stacks(profiler):
+    profiler.start(threshold_ms=20, interval_ms=1)
+    profiler.begin('GET /slow')
+    busy_wait_for_profiler(0.1)
+    profiler.end()
+    profiler.begin('GET /fast')
+    profiler.end()
+
+    report = profiler.report()
+    assert set(report['routes']) == {'GET /slow'}
+    stats = report['routes']['GET /slow']
+    assert stats['requests'] == 1 and stats['max_ms'] >= 100 and stats['samples'] > 0
+    folded = profiler.folded().splitlines()
+    assert all(line.startswith('GET /slow;') for line in folded)
+    assert any('busy_wait_for_profiler (test_profiler:' in line for line in folded)
+    assert sum(int(line.rsplit(' ', 1)[1]) for line in folded) == stats['samples']
+
+    profiler.reset()
+    assert profiler.folded() == '' and profiler.report()['routes'] == {}
+
+def test_only_request_threads_are_sampled(profiler):
+    profiler.start(threshold_ms=0, interval_ms=1)
+    stop = threading.Event()
+    background = threading.Thread(target=stop.wait)
+    background.start()
+    profiler.begin('GET /x')
+    time.sleep(0.05)
+    profiler.end()
+    stop.set()
+    background.join()
+    assert 'stop.wait' not in profiler.folded() and 'Event.wait' not in profiler.folded()
+
+@pytest.fixture
+def profiling(backend, client, admin):
+    yield
+    client.post('/api/admin/profile', json={'enabled': False, 'reset': True}, headers=admin)
+
+def test_profile_routes(backend, client, admin, profiling):
+    body = client.post('/api/admin/profile', json={'threshold_ms': 0, 'interval_ms': 1}, headers=admin).get_json()
+    assert body['profile']['enabled'] and body['profile']['threshold_ms'] == 0
+    client.post('/api/suppliers/filter', json={'state': 'Texas'})
+    routes = client.get('/api/admin/profile', headers=admin).get_json()['profile']['routes']
+    assert routes['POST /api/suppliers/filter']['requests'] == 1
+    flamegraph = client.get('/api/admin/profile/flamegraph', query_string={'route': 'POST /api/suppliers/filter'},
+                            headers=admin)
+    assert flamegraph.mimetype == 'text/plain'
+    assert all(line.startswith('POST /api/suppliers/filter;') for line in flamegraph.get_data(as_text=True).splitlines())
+
+    body = client.post('/api/admin/profile', json={'enabled': False}, headers=admin).get_json()
+    assert body['profile']['enabled'] is False
+
+@pytest.mark.parametrize('body', [
+    {'threshold_ms': -1}, {'threshold_ms': 'nan'}, {'threshold_ms': 'abc'}, {'interval_ms': 0.1}, [True],
+])
+def test_bad_profile_settings(client, admin, profiling, body):
+    assert client.post('/api/admin/profile', json=body, headers=admin).status_code == 400
@@ -0,0 +1,101 @@
+"""Structured queries: the planner returns exactly what a full scan would"""
+
+import math
+
+import pytest
+
+def full_scan(backend, records, query):
+    """Brute force over every live record, in catalog order, then a stable sort"""
+    def value(record, name):
+        return float(backend.NUMERIC_COLUMNS[name][1](record))
+
+    def matches(record):
+        for field, wanted in query.get('where', {}).items():
+            if field in backend.CATEGORICAL_COLUMNS:
+                if record.get(field) != wanted:
+                    return False
+            elif value(record, field) != float(wanted):
+                return False
+        for name, bounds in query.get('range', {}).items():
+            v = value(record, name)
+            if math.isnan(v) or v < bounds.get('min', -math.inf) or v > bounds.get('max', math.inf):
+                return False
+        terms = query.get('text', [])
+        terms = [terms] if isinstance(terms, str) else terms
+        return all(t.lower().encode() in backend.search_text(record) for t in terms)
+
+    found = [r for r in records if matches(r)]
+    sort = query.get('sort')
+    if sort:
+        by = backend.SORT_COLUMNS.get(sort['by'], sort['by'])
+        sign = -1 if sort.get('order') == 'desc' else 1
+        found.sort(key=lambda r: (math.isnan(value(r, by)), sign * value(r, by)))
+    return [r['id'] for r in found]
+
+QUERIES = [
+    {'where': {'state': 'Texas'}},
+    {'where': {'category': 'Electrical'}, 'range': {'rating': {'min': 4}}},
+    {'text': 'steel', 'range': {'stockLevel': {'max': 3000}}, 'sort': {'by': 'rating', 'order': 'desc'}},
+    {'text': ['supply', 'co'], 'where': {'region': 'Midwest'}},
+    {'where': {'inStock': True}, 'range': {'leadTimeMaxDays': {'max': 14}}, 'sort': {'by': 'leadTime'}},
+    {'range': {'reviews': {'min': 100, 'max': 200}, 'certifications': {'min': 1}}, 'sort': {'by': 'reviews'}},
+    {'where': {'walmartVerified': False}, 'text': 'co', 'sort': {'by': 'stockLevel', 'order': 'desc'}},
+]
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_planner_matches_a_full_scan(backend, client, records, query):
+    expected = full_scan(backend, records, query)
+    body = client.post('/api/suppliers/query?explain=true', json={**query, 'limit': 1000}).get_json()
+    assert body['total'] == len(expected)
+    assert [r['id'] for r in body['results']] == expected[:1000]
+    assert body['plan']['steps'][0]['step'] in ('index', 'scan')
+
+def test_paging_and_projection(backend, client, records):
+    query = {'where': {'state': 'Texas'}, 'sort': 'rating'}
+    expected = full_scan(backend, records, {**query, 'sort': {'by': 'rating'}})
+    body = client.post('/api/suppliers/query', json={**query, 'offset': 5, 'limit': 3, 'fields': ['id', 'name']}).get_json()
+    assert [r['id'] for r in body['results']] == expected[5:8]
+    assert all(set(r) == {'id', 'name'} for r in body['results'])
+
+@pytest.mark.parametrize('body', [
+    [{'where': {'state': 'Texas'}}],
+    'Texas',
+    {'where': [['state', 'Texas']]},
+    {'where': {'state': ['Texas', 'Ohio']}},
+    {'where': {'rating': 'nan'}},
+    {'where': {'color': 'red'}},
+    {'range': [1, 5]},
+    {'range': {'rating': {'min': 'high'}}},
+    {'range': {'rating': [1, 5]}},
+    {'sort': ['rating']},
+    {'sort': {'by': ['rating']}},
+    {'sort': {'by': 'name'}},
+    {'sort': {'by': 'rating', 'order': 'up'}},
+    {'text': 5},
+    {'fields': 'id'},
+    {'offset': True},
+    {'limit': False},
+    {'limit': 0},
+    {'offset': -1},
+    {'limit': 2.5},
+])
+def test_malformed_queries_are_rejected(client, body):
+    response = client.post('/api/suppliers/query', json=body)
+    assert response.status_code == 400, response.get_json()
+    assert response.get_json()['success'] is False
+
+@pytest.mark.parametrize('body', [
+    [{'state': 'Texas'}],
+    {'minRating': [4]},
+    {'minRating': 'nan'},
+    {'maxLeadTimeDays': {'days': 3}},
+    {'state': ['Texas']},
+    {'category': {'name': 'Lumber'}},
+    {'sortBy': ['rating']},
+    {'sortBy': 'name'},
+    {'sortBy': 'rating', 'order': 'up'},
+])
+def test_malformed_filters_are_rejected(client, body):
+    response = client.post('/api/suppliers/filter', json=body)
+    assert response.status_code == 400, response.get_json()
+    assert response.get_json()['success'] is False
@@ -0,0 +1,51 @@
+"""Composite ranking engine and /api/suppliers/ranked"""
+
+import pytest
+
+def brute_force(backend, weights, category=None):
+    """[(score, id)] best first over every live supplier"""
+    features = backend.ranking_features(backend.STORE.columns)
+    scores = sum(weight * features[name] for name, weight in weights.items()) * 100.0 / sum(weights.values())
+    records = backend.STORE.records
+    ranked = [(round(float(scores[p]), 2), records[p]['id']) for p in backend.STORE.live_positions().tolist()
+              if not category or records[p]['category'] == category]
+    return sorted(ranked, key=lambda item: -item[0])
+
+def assert_same_ranking(results, ranked):
+    # Equal scores may come back in either order: compare scores, then ids per score
+    assert [r['rankScore'] for r in results] == [score for score, _ in ranked[:len(results)]]
+    for result in results:
+        assert (result['rankScore'], result['id']) in ranked
+
+@pytest.mark.parametrize('query, weights', [
+    ('profile=balanced', 'balanced'),
+    ('profile=quality', 'quality'),
+    ('weights=rating:3,leadTime:2', {'rating': 3.0, 'leadTime': 2.0}),
+])
+def test_ranked_matches_brute_force(backend, client, query, weights):
+    weights = backend.RANKING_PROFILES[weights] if isinstance(weights, str) else weights
+    body = client.get(f"/api/suppliers/ranked?{query}&limit=25").get_json()
+    assert body['weights'] == weights and body['count'] == 25
+    assert_same_ranking(body['results'], brute_force(backend, weights))
+
+def test_ranked_by_category_beyond_cached_depth(backend, client, records):
+    category = records[0]['category']
+    body = client.get('/api/suppliers/ranked', query_string={'category': category, 'limit': 500}).get_json()
+    ranked = brute_force(backend, backend.RANKING_PROFILES['balanced'], category)
+    assert body['count'] == len(ranked)
+    assert_same_ranking(body['results'], ranked)
+
+def test_ranking_follows_store_changes(client, admin, records):
+    supplier = records[3]
+    client.patch(f"/api/suppliers/{supplier['id']}/stock", json={'stockLevel': 10 ** 9}, headers=admin)
+    body = client.get('/api/suppliers/ranked?weights=stockLevel&limit=1').get_json()
+    assert body['results'][0]['id'] == supplier['id']
+
+@pytest.mark.parametrize('weights', ['rating:nan', 'rating:inf', 'rating:-inf,reviews:1', 'rating:abc', 'speed:2'])
+def test_bad_weights_are_rejected(client, weights):
+    response = client.get('/api/suppliers/ranked', query_string={'weights': weights})
+    assert response.status_code == 400
+    assert 'results' not in response.get_json()
+
+def test_unknown_profile(client):
+    assert client.get('/api/suppliers/ranked?profile=nope').status_code == 400
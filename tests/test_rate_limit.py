@@ -0,0 +1,36 @@
+"""Rate limit buckets: keyed on login sessions and the (proxied) client address"""
+
+import pytest
+
+from conftest import run_app
+
+def test_buckets_follow_sessions_not_claimed_user_ids(tmp_path):
+    result = run_app("""
+        login = client.post('/api/auth/login', json={'email': 'limits@example.com', 'name': 'Limits'}).get_json()
+        page = '/api/suppliers?limit=1'
+        claimed = [client.get(page, headers={'X-User-Id': login['user_id']}).status_code for _ in range(6)]
+        query = [client.get(page + '&user_id=' + login['user_id']).status_code]
+        session = [client.get(page, headers={'X-Session-Id': login['session_id']}).status_code for _ in range(2)]
+        forged = client.get(page, headers={'X-Session-Id': 'not-issued'}).status_code
+        client.post('/api/auth/logout', json={'user_id': login['user_id']}, headers={'X-Session-Id': login['session_id']})
+        ended = client.get(page, headers={'X-Session-Id': login['session_id']}).status_code
+        print(json.dumps({'claimed': claimed, 'query': query, 'session': session, 'forged': forged, 'ended': ended}))
+    """, str(tmp_path), RATE_LIMIT_PER_SECOND='0.001', RATE_LIMIT_BURST='5')
+    # Claimed ids share the caller's address bucket, which login already drew from
+    assert result['claimed'][0] == 200 and result['claimed'][-1] == 429
+    assert result['query'] == [429]
+    assert result['session'] == [200, 200]
+    assert result['forged'] == 429 and result['ended'] == 429
+
+@pytest.mark.parametrize('hops, second', [(0, 429), (1, 200)])
+def test_forwarded_addresses_only_behind_trusted_proxies(tmp_path, hops, second):
+    result = run_app("""
+        page = '/api/suppliers?limit=1'
+        first = [client.get(page, headers={'X-Forwarded-For': '10.0.0.1'}).status_code for _ in range(4)]
+        second = client.get(page, headers={'X-Forwarded-For': '10.0.0.2'}).status_code
+        limited = client.get('/api/admin/ratelimit', headers={'Authorization': 'Bearer ' + os.environ['ADMIN_TOKEN']}).get_json()['ratelimit']['top_limited_clients']
+        print(json.dumps({'first': first, 'second': second, 'limited': [c['client'] for c in limited]}))
+    """, str(tmp_path), RATE_LIMIT_PER_SECOND='0.001', RATE_LIMIT_BURST='3', TRUSTED_PROXY_HOPS=str(hops))
+    assert result['first'][0] == 200 and result['first'][-1] == 429
+    assert result['second'] == second
+    assert result['limited'][0] == ('ip:10.0.0.1' if hops else 'ip:127.0.0.1')
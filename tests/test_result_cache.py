@@ -0,0 +1,48 @@
+"""Two-level result cache for search, filter, query and analytics"""
+
+import pytest
+
+def test_lru_is_bounded_by_bytes(backend):
+    cache = backend.ResultCache(max_bytes=10, shared_path=None)
+    for name in 'abc':
+        cache.put(name, name.encode() * 4)
+    assert list(cache.entries) == ['b', 'c'] and cache.bytes == 8
+    assert cache.get('a') is None and cache.get('b') == b'bbbb'
+    cache.put('d', b'dddd')
+    assert list(cache.entries) == ['b', 'd']
+    cache.put('huge', b'x' * 11)
+    assert 'huge' not in cache.entries
+    assert cache.report()['evictions'] == 2
+
+def test_shared_tier_is_seen_by_other_workers(backend, tmp_path):
+    path = str(tmp_path / 'results.sqlite3')
+    writer = backend.ResultCache(max_bytes=1000, shared_path=path)
+    reader = backend.ResultCache(max_bytes=1000, shared_path=path)
+    key = writer.key('search', {'q': 'steel'})
+    writer.put(key, b'{"results": []}')
+    assert reader.get(key) == b'{"results": []}'
+    assert reader.stats['l2_hits'] == 1
+    assert reader.get(key) == b'{"results": []}' and reader.stats['l1_hits'] == 1
+
+@pytest.fixture
+def cache(backend, monkeypatch):
+    cache = backend.ResultCache(max_bytes=1 << 20, shared_path=None)
+    monkeypatch.setattr(backend, 'RESULT_CACHE', cache)
+    return cache
+
+def test_responses_are_cached_until_the_store_changes(client, admin, records, cache):
+    body = {'category': records[0]['category']}
+    first = client.post('/api/suppliers/filter', json=body)
+    second = client.post('/api/suppliers/filter', json=body)
+    assert (first.headers['X-Cache'], second.headers['X-Cache']) == ('MISS', 'HIT')
+    assert first.data == second.data
+
+    client.patch(f"/api/suppliers/{records[0]['id']}/stock", json={'stockLevel': 4321}, headers=admin)
+    third = client.post('/api/suppliers/filter', json=body)
+    assert third.headers['X-Cache'] == 'MISS'
+    updated = next(r for r in third.get_json()['results'] if r['id'] == records[0]['id'])
+    assert updated['stockLevel'] == 4321
+
+def test_errors_are_not_cached(client, cache):
+    assert client.post('/api/suppliers/query', json={'where': {'state': 'Texas'}, 'limit': 'all'}).status_code == 400
+    assert not cache.entries
@@ -0,0 +1,68 @@
+"""Response serialization: sorted compact JSON, raw record splicing, backends agree"""
+
+import json
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+PAYLOAD = {'b': [1, 2.5, None, True], 'a': {'z': 'ü', 'y': [{}]}, 'when': datetime(2026, 1, 2, 3, 4, 5),
+           'big': 2 ** 70, 'count': np.int64(7)}
+
+@pytest.fixture(params=['stdlib', 'auto'])
+def serializer(backend, request):
+    return backend.JSONSerializer(request.param)
+
+def test_output_is_sorted_and_compact(serializer):
+    encoded = serializer.dumps({k: v for k, v in PAYLOAD.items() if k != 'count'})
+    assert encoded.startswith(b'{"a":{"y":[{}],"z":')
+    decoded = json.loads(encoded)
+    assert decoded['big'] == 2 ** 70 and decoded['b'] == [1, 2.5, None, True]
+    assert decoded['when'] == 'Fri, 02 Jan 2026 03:04:05 GMT'
+
+def test_backends_agree(backend, records):
+    stdlib, auto = backend.JSONSerializer('stdlib'), backend.JSONSerializer('auto')
+    payload = {'data': records[:50], 'success': True, 'when': PAYLOAD['when'], 'name': 'Müller Ü'}
+    assert json.loads(stdlib.dumps(payload)) == json.loads(auto.dumps(payload))
+    # Neither escapes non-ASCII text
+    assert 'Müller Ü'.encode() in stdlib.dumps(payload) and 'Müller Ü'.encode() in auto.dumps(payload)
+    assert json.loads(stdlib.dumps({'f': 1e16})) == json.loads(auto.dumps({'f': 1e16}))
+
+def test_result_cache_keys_name_the_backend(backend, monkeypatch):
+    stdlib = backend.JSONSerializer('stdlib')
+    monkeypatch.setattr(backend, 'SERIALIZER', stdlib)
+    key = backend.RESULT_CACHE.key('search', {'q': 'steel'})
+    monkeypatch.setattr(stdlib, 'name', 'orjson')
+    assert backend.RESULT_CACHE.key('search', {'q': 'steel'}) != key
+
+def test_raw_records_are_spliced_verbatim(backend, serializer, records):
+    positions = backend.STORE.live_positions()[:20]
+    payload = {'success': True, 'results': backend.STORE.records.encoded(positions), 'count': 20}
+    encoded = serializer.encode(payload)
+    assert json.loads(encoded) == {'success': True, 'results': records[:20], 'count': 20}
+    assert encoded == serializer.dumps({**payload, 'results': records[:20]})
+    assert serializer.encode({'results': backend.RawRecords()}) == b'{"results":[]}'
+
+def test_records_are_stored_unescaped(backend, serializer):
+    record = {'id': 1, 'name': 'Señor Supply'}
+    assert backend.encode_record(record) == serializer.dumps(record)
+
+def test_overlay_records_are_encoded_fresh(backend, serializer):
+    backend.STORE.apply_batch(upserts=[{'id': 880501, 'name': 'Overlay Supply', 'category': 'Masonry'}])
+    try:
+        position = backend.STORE.position_of(880501)
+        encoded = serializer.encode({'results': backend.STORE.records.encoded([position])})
+        assert json.loads(encoded)['results'][0]['name'] == 'Overlay Supply'
+    finally:
+        backend.STORE.apply_batch(deletes=[880501])
+
+def test_jsonify_goes_through_the_serializer(backend, client, records):
+    response = client.get(f"/api/suppliers/{records[0]['id']}")
+    assert response.data == backend.SERIALIZER.dumps({'data': records[0], 'success': True}) + b'\n'
+
+def test_backend_selection_without_orjson(backend, monkeypatch):
+    assert backend.JSONSerializer('stdlib').name == 'stdlib'
+    monkeypatch.setattr(backend, 'orjson', None)
+    assert backend.JSONSerializer('auto').name == 'stdlib'
+    with pytest.raises(RuntimeError):
+        backend.JSONSerializer('orjson')
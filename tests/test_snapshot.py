@@ -0,0 +1,60 @@
+"""Flat dataset snapshots and the segment file shared between workers"""
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+def test_snapshot_round_trips_records(backend, records):
+    sample = records[:200]
+    snapshot = backend.DatasetSnapshot.from_records(sample, 'sample')
+    assert snapshot.size == 200 and snapshot.meta['dataset_id'] == 'sample' and not snapshot.outdated
+    assert [json.loads(snapshot.blob('records', p)) for p in range(200)] == \
+        [json.loads(backend.encode_record(r)) for r in sample]
+    ids = [r['id'] for r in sample]
+    assert snapshot.position(ids[17]) == 17 and snapshot.position(-5) is None
+    assert snapshot.positions([ids[3], -5, ids[199]]).tolist() == [3, -1, 199]
+    assert np.array_equal(snapshot.arrays['col:rating'],
+                          np.array([backend.NUMERIC_COLUMNS['rating'][1](r) for r in sample]))
+
+def test_snapshot_search_matches_a_scan(backend, records):
+    snapshot = backend.DatasetSnapshot.from_records(records[:300])
+    needle = records[5]['category'].lower().encode()
+    expected = [p for p, r in enumerate(records[:300]) if needle in backend.search_text(r)]
+    assert snapshot.search(needle, 1000) == expected
+    assert snapshot.search(needle, 3, skip={expected[0]}) == expected[1:4]
+
+@pytest.fixture
+def shared_dir(backend, tmp_path, monkeypatch):
+    monkeypatch.setattr(backend, 'SHARED_DATASET_DIR', str(tmp_path))
+    return tmp_path
+
+def test_only_the_first_worker_loads_the_records(backend, records, shared_dir):
+    loads = []
+    def load():
+        loads.append(1)
+        return records[:50]
+
+    first = backend.shared_snapshot('v1', load)
+    second = backend.shared_snapshot('v1', load)
+    assert len(loads) == 1 and first.path == second.path
+    assert bytes(first.buffer) == bytes(second.buffer)
+
+    backend.shared_snapshot('v2', load)
+    assert len(loads) == 2
+    assert sorted(os.listdir(shared_dir)) == ['suppliers-v2.seg', 'suppliers.lock']
+
+def test_sharing_needs_a_fingerprint(backend, records, shared_dir):
+    assert backend.shared_snapshot(None, lambda: records[:5]) is None
+    assert backend.shared_snapshot('empty', lambda: []) is None
+    snapshot = backend.build_snapshot(records[:5])
+    assert snapshot.path is None and snapshot.size == 5
+
+def test_outdated_segments_are_rewritten(backend, records, shared_dir, monkeypatch):
+    backend.shared_snapshot('v1', lambda: records[:20])
+    monkeypatch.setattr(backend, 'NORMALIZE_VERSION', backend.NORMALIZE_VERSION + 1)
+    assert backend.DatasetSnapshot.attach(str(shared_dir / 'suppliers-v1.seg')).outdated
+    loads = []
+    snapshot = backend.shared_snapshot('v1', lambda: loads.append(1) or records[:20])
+    assert loads and not snapshot.outdated
@@ -0,0 +1,23 @@
+"""Importing app and scraper stays cheap: no data, numpy, pandas or bs4 until needed"""
+
+from conftest import run_app
+
+def test_import_does_no_work(tmp_path):
+    state = run_app("""
+        import scraper
+        print(json.dumps({
+            'np': app.np is None,
+            'status': app.LOAD_STATE['status'],
+            'size': app.STORE.size,
+            'heavy': sorted(set(sys.modules) & {'numpy', 'pandas', 'bs4'}),
+            'journal': os.path.exists(os.environ['JOURNAL_FILE']),
+        }))
+    """, tmp_path, load=False)
+    assert state == {'np': True, 'status': 'idle', 'size': 0, 'heavy': [], 'journal': False}
+
+def test_factory_loads_on_demand(tmp_path):
+    state = run_app("""
+        print(json.dumps({'status': app.LOAD_STATE['status'], 'np': app.np is not None,
+                          'ready': client.get('/health/ready').status_code}))
+    """, tmp_path)
+    assert state == {'status': 'ready', 'np': True, 'ready': 200}
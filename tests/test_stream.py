@@ -0,0 +1,70 @@
+"""SSE stock change stream: subscriber coalescing/overflow and PATCH /stock"""
+
+def test_subscriber_coalesces_updates_per_supplier(backend):
+    subscriber = backend.UpdateSubscriber()
+    subscriber.offer({'op': 'update', 'id': 1, 'version': 1, 'changes': {'stockLevel': 5}})
+    subscriber.offer({'op': 'update', 'id': 2, 'version': 2, 'changes': {'stockLevel': 7}})
+    subscriber.offer({'op': 'update', 'id': 1, 'version': 3, 'changes': {'inStock': False}})
+    events, overflowed = subscriber.drain(0)
+    assert not overflowed
+    assert [e['id'] for e in events] == [1, 2]
+    assert events[0]['version'] == 3
+    assert events[0]['changes'] == {'stockLevel': 5, 'inStock': False}
+
+def test_subscriber_overflow_asks_for_resync(backend):
+    subscriber = backend.UpdateSubscriber(max_pending=2)
+    for supplier_id in (1, 2, 3):
+        subscriber.offer({'op': 'delete', 'id': supplier_id, 'version': supplier_id})
+    assert subscriber.drain(0) == ([], True)
+    # The next drain starts clean
+    subscriber.offer({'op': 'delete', 'id': 4, 'version': 4})
+    events, overflowed = subscriber.drain(0)
+    assert [e['id'] for e in events] == [4] and not overflowed
+
+def test_subscriber_filters(backend):
+    subscriber = backend.UpdateSubscriber(categories={'Electrical'}, states={'Texas'})
+    assert subscriber.matches({'category': 'Electrical', 'state': 'Texas'})
+    assert not subscriber.matches({'category': 'Electrical', 'state': 'Ohio'})
+    assert not subscriber.matches(None)
+
+def test_stock_patch_publishes_diff(backend, client, admin, records):
+    supplier = records[0]
+    subscriber = backend.UpdateSubscriber()
+    with backend.SUBSCRIBERS_LOCK:
+        backend.SUBSCRIBERS.add(subscriber)
+    try:
+        response = client.patch(f"/api/suppliers/{supplier['id']}/stock",
+                                json={'stockLevel': supplier['stockLevel'] + 17}, headers=admin)
+        assert response.status_code == 200
+        data = response.get_json()['data']
+        assert data['stockLevel'] == supplier['stockLevel'] + 17 and data['inStock'] is True
+        events, _ = subscriber.drain(0)
+    finally:
+        with backend.SUBSCRIBERS_LOCK:
+            backend.SUBSCRIBERS.discard(subscriber)
+    assert events[-1]['op'] == 'update' and events[-1]['id'] == supplier['id']
+    assert events[-1]['changes']['stockLevel'] == supplier['stockLevel'] + 17
+    assert 'name' not in events[-1]['changes']
+
+def test_stock_patch_validation(client, admin, records):
+    supplier_id = records[0]['id']
+    assert client.patch(f"/api/suppliers/{supplier_id}/stock", json={'stockLevel': -1}, headers=admin).status_code == 400
+    assert client.patch(f"/api/suppliers/{supplier_id}/stock", json={'inStock': 'yes'}, headers=admin).status_code == 400
+    assert client.patch(f"/api/suppliers/{supplier_id}/stock", json={}, headers=admin).status_code == 400
+    for body in ({'stockLevel': True}, {'stockLevel': False}, {'lastStockCheck': {'a': 1}},
+                 {'lastStockCheck': 'yesterday'}, [{'stockLevel': 1}]):
+        assert client.patch(f"/api/suppliers/{supplier_id}/stock", json=body, headers=admin).status_code == 400
+    response = client.patch(f"/api/suppliers/{supplier_id}/stock", json={'lastStockCheck': 0}, headers=admin)
+    assert response.get_json()['data']['lastStockCheck'] == '1970-01-01T00:00:00'
+    assert client.patch('/api/suppliers/999999999/stock', json={'stockLevel': 1}, headers=admin).status_code == 404
+
+def test_stream_starts_with_ready_event(backend, client):
+    response = client.get('/api/suppliers/stream?category=Electrical', buffered=False)
+    try:
+        assert response.mimetype == 'text/event-stream'
+        chunks = iter(response.response)
+        assert next(chunks).startswith(b'retry:')
+        ready = next(chunks).decode()
+        assert ready.startswith('event: ready') and f'"total": {backend.STORE.size}' in ready
+    finally:
+        response.close()
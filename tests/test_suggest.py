@@ -0,0 +1,67 @@
+"""Typeahead suggestions against brute force over the snapshot"""
+
+import json
+
+import pytest
+
+def brute_force(backend, prefix, limit, kinds=None):
+    snapshot = backend.STORE.snapshot
+    live = backend.STORE.columns.live
+    terms = {}
+    for position in range(snapshot.size):
+        supplier = json.loads(snapshot.blob('records', position))
+        values = [('name', supplier.get('name')), ('category', supplier.get('category')),
+                  ('city', backend.supplier_city(supplier))]
+        values += [('product', p) for p in supplier.get('products') or []]
+        for kind, text in values:
+            if not isinstance(text, str) or not text.strip():
+                continue
+            score, count, _, positions = terms.get((kind, text), (0.0, 0, len(terms), []))
+            terms[(kind, text)] = (max(score, backend.popularity(supplier)), count + 1, _, positions + [position])
+
+    prefix = ' '.join(prefix.lower().split())
+    ranked = sorted(terms.items(), key=lambda item: (-item[1][0], -item[1][1], item[1][2]))
+    results, seen = [], set()
+    for (kind, text), (_, count, _, positions) in ranked:
+        lowered = text.lower()
+        starts = [m.start() for m in backend.WORD_START.finditer(lowered)][:backend.SUGGEST_WORD_STARTS]
+        if kinds and kind not in kinds or lowered in seen or not any(lowered.startswith(prefix, s) for s in starts):
+            continue
+        # A term from a single, since deleted supplier is gone
+        if count == 1 and live is not None and not live[positions[0]]:
+            continue
+        seen.add(lowered)
+        results.append({'text': text, 'type': kind, 'suppliers': count})
+    return results[:limit]
+
+CASES = [('s', 8, None), ('co', 20, None), ('steel', 5, None), ('  Lumber   &', 8, None), ('wood', 8, None),
+         ('p', 10, ['product']), ('ch', 8, ['city', 'name']), ('xq', 8, None)]
+
+@pytest.mark.parametrize('prefix, limit, kinds', CASES)
+def test_suggest_matches_brute_force(backend, prefix, limit, kinds):
+    assert backend.SUGGEST_INDEX.suggest(prefix, limit, kinds) == brute_force(backend, prefix, limit, kinds)
+
+def test_wide_prefixes_use_precomputed_lists(backend, monkeypatch):
+    monkeypatch.setattr(backend, 'SUGGEST_SCAN_KEYS', 40)
+    index = backend.SuggestIndex()
+    index.ensure_built()
+    assert b's' in index.wide and b'co' in index.wide
+    for prefix, limit, kinds in CASES:
+        assert index.suggest(prefix, limit, kinds) == brute_force(backend, prefix, limit, kinds), prefix
+
+def test_deleted_suppliers_drop_out(backend, records):
+    supplier = records[7]
+    prefix = supplier['name'].lower()
+    assert supplier['name'] in [s['text'] for s in backend.SUGGEST_INDEX.suggest(prefix, 20, ['name'])]
+    backend.STORE.apply_batch(deletes=[supplier['id']])
+    try:
+        names = [s['text'] for s in backend.SUGGEST_INDEX.suggest(prefix, 20, ['name'])]
+        assert names == [s['text'] for s in brute_force(backend, prefix, 20, ['name'])]
+    finally:
+        backend.STORE.apply_batch(upserts=[supplier])
+
+def test_suggest_route(client):
+    body = client.get('/api/suppliers/suggest?q=con&limit=3&types=category').get_json()
+    assert len(body['suggestions']) <= 3 and all(s['type'] == 'category' for s in body['suggestions'])
+    assert client.get('/api/suppliers/suggest?q=').get_json()['suggestions'] == []
+    assert client.get('/api/suppliers/suggest?q=co&types=color').status_code == 400